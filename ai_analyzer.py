@@ -2,20 +2,108 @@ import requests
 import json
 import logging
 import os
+import random
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from analysis_cache import AnalysisCache, content_key
+from doctor_record import RecordOverlay, records_to_columns
+from output_sink import chunked
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+# Longest wait between retries, Retry-After included
+MAX_BACKOFF = 30.0
+SUMMARY_FIELD = 'Summary of Pros and Cons (Summary of reviews), and recommendation'
+# Exactly the fields that go into the prompt; bump PROMPT_VERSION when the prompt text changes
+PROMPT_FIELDS = ('Doctors name', 'Specialty', 'Years of experience', 'Ratings', 'Clinic/Hospital')
+PROMPT_VERSION = 'v1'
+# GROQ_API_KEY unset: every request would be refused, so analysis is rule-based only
+PLACEHOLDER_API_KEY = 'your-api-key-here'
+
+# (min rating, min years of experience, analysis), first match wins
+FALLBACK_TIERS = [
+    (4.5, 10, {
+        'pros': "Highly rated with good experience",
+        'cons': "No significant concerns",
+        'recommendation': "Highly recommended specialist"
+    }),
+    (4.0, 0, {
+        'pros': "Good patient satisfaction",
+        'cons': "Standard consultation fees",
+        'recommendation': "Recommended for consultation"
+    })
+]
+FALLBACK_DEFAULT = {
+    'pros': "Available for consultation",
+    'cons': "Limited patient feedback",
+    'recommendation': "Consider with other options"
+}
+PACKED_ID_LINE = re.compile(r'^\W*ID\W*(\d+)\W*$', re.IGNORECASE)
+
+class UsageLimiter:
+    """Requests-per-minute and tokens-per-minute budget shared by all workers"""
+    
+    def __init__(self, requests_per_minute=30, tokens_per_minute=6000):
+        self.limits = (requests_per_minute, tokens_per_minute)
+        self.available = [float(requests_per_minute), float(tokens_per_minute)]
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+    
+    def acquire(self, tokens):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                elapsed = now - self.updated
+                self.updated = now
+                for i, limit in enumerate(self.limits):
+                    self.available[i] = min(limit, self.available[i] + elapsed * limit / 60.0)
+                
+                # A request larger than the whole minute budget still goes once the bucket is full
+                needed = (1, min(tokens, self.limits[1]))
+                if all(self.available[i] >= needed[i] for i in range(2)):
+                    self.available[0] -= needed[0]
+                    self.available[1] -= needed[1]
+                    return
+                wait = max((needed[i] - self.available[i]) * 60.0 / self.limits[i] for i in range(2))
+            time.sleep(max(wait, 0.01))
 
 class HealthcareAIAnalyzer:
-    def __init__(self, api_key=None):
-        self.api_key = api_key or os.getenv('GROQ_API_KEY', 'your-api-key-here')
-        self.base_url = "https://api.groq.com/openai/v1/chat/completions"
+    def __init__(self, api_key=None, base_url=None, max_workers=1, requests_per_minute=30,
+                 tokens_per_minute=6000, timeout=30, max_retries=4, pack_size=1, cache_path=None):
+        self.api_key = api_key or os.getenv('GROQ_API_KEY', PLACEHOLDER_API_KEY)
+        # GROQ_BASE_URL lets a local stand-in server play the API
+        self.base_url = base_url or os.getenv('GROQ_BASE_URL', "https://api.groq.com/openai/v1/chat/completions")
         self.headers = {
             "Authorization": f"Bearer {self.api_key}",
             "Content-Type": "application/json"
         }
+        self.model = "llama3-8b-8192"
+        self.max_tokens = 300
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.max_workers = max(1, max_workers)
+        # pack_size > 1 sends that many profiles per request
+        self.pack_size = max(1, pack_size)
+        
+        # One keep-alive connection pool shared by every request
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_workers)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.limiter = UsageLimiter(requests_per_minute, tokens_per_minute)
+        
+        # Unchanged profiles reuse last run's analysis; cache_path='' disables the cache
+        if cache_path is None:
+            cache_path = os.getenv('GROQ_ANALYSIS_CACHE', 'analysis_cache.sqlite')
+        self.cache = AnalysisCache(cache_path) if cache_path else None
+        # Counted from the worker threads of the concurrent and packed batches
+        self.fallbacks = 0
+        self.stats_lock = threading.Lock()
 
-    def analyze_with_groq(self, doctor_info):
-        """Use Groq AI to analyze doctor profile"""
-        try:
-            prompt = f"""
+    def build_prompt(self, doctor_info):
+        return f"""
 Analyze this doctor profile and provide pros, cons, and recommendation:
 
 Doctor: {doctor_info.get('Doctors name', 'N/A')}
@@ -29,30 +117,113 @@ PROS: [list 2-3 key strengths]
 CONS: [list 1-2 concerns or limitations]
 RECOMMENDATION: [brief recommendation with reasoning]
 """
+    
+    def build_packed_prompt(self, doctors):
+        """One prompt for several profiles, each tagged with its position as a stable ID"""
+        profiles = "\n".join(f"""ID: {i}
+Doctor: {doctor_info.get('Doctors name', 'N/A')}
+Specialty: {doctor_info.get('Specialty', 'N/A')}
+Experience: {doctor_info.get('Years of experience', 'N/A')} years
+Rating: {doctor_info.get('Ratings', 'N/A')}
+Clinic: {doctor_info.get('Clinic/Hospital', 'N/A')}
+""" for i, doctor_info in enumerate(doctors, 1))
+        
+        return f"""
+Analyze each of these {len(doctors)} doctor profiles and provide pros, cons, and recommendation:
+
+{profiles}
+For every profile, answer with its ID line followed by exactly this format:
+ID: [profile ID]
+PROS: [list 2-3 key strengths]
+CONS: [list 1-2 concerns or limitations]
+RECOMMENDATION: [brief recommendation with reasoning]
+"""
+    
+    def post_completion(self, prompt, max_tokens=None):
+        """Send one chat completion, retrying 429/5xx with jittered backoff; returns content or None"""
+        max_tokens = max_tokens or self.max_tokens
+        payload = {
+            "model": self.model,
+            "messages": [{"role": "user", "content": prompt}],
+            "max_tokens": max_tokens,
+            "temperature": 0.3
+        }
+        
+        for attempt in range(self.max_retries + 1):
+            # Rough token estimate: ~4 characters per prompt token plus the completion budget
+            self.limiter.acquire(len(prompt) // 4 + max_tokens)
+            retry_after = None
+            try:
+                response = self.session.post(self.base_url, headers=self.headers, json=payload,
+                                             timeout=self.timeout)
+                if response.status_code == 200:
+                    return response.json()['choices'][0]['message']['content']
+                if response.status_code not in RETRY_STATUSES:
+                    logging.warning(f"Groq API error: {response.status_code}")
+                    return None
+                logging.warning(f"Groq API error: {response.status_code}, retrying")
+                retry_after = response.headers.get('Retry-After')
+            except requests.RequestException as e:
+                logging.warning(f"Groq request failed: {e}")
             
-            payload = {
-                "model": "llama3-8b-8192",
-                "messages": [{"role": "user", "content": prompt}],
-                "max_tokens": 300,
-                "temperature": 0.3
-            }
-            
-            response = requests.post(self.base_url, headers=self.headers, json=payload)
-            
-            if response.status_code == 200:
-                result = response.json()
-                content = result['choices'][0]['message']['content']
-                return self.parse_groq_response(content)
-            else:
-                logging.warning(f"Groq API error: {response.status_code}")
-                return self.fallback_analysis(doctor_info)
+            if attempt < self.max_retries:
+                time.sleep(self.backoff(attempt, retry_after))
+        
+        return None
+    
+    def backoff(self, attempt, retry_after=None):
+        try:
+            if retry_after:
+                return min(MAX_BACKOFF, max(0.0, float(retry_after)))
+        except ValueError:
+            pass
+        return min(MAX_BACKOFF, 2 ** attempt) * random.uniform(0.5, 1.5)
+
+    def count_fallbacks(self, count):
+        with self.stats_lock:
+            self.fallbacks += count
+
+    def analysis_key(self, doctor_info):
+        values = [doctor_info.get(field, 'N/A') for field in PROMPT_FIELDS]
+        return content_key(self.model, PROMPT_VERSION, *values)
+    
+    def cached_analysis(self, doctor_info):
+        if not self.cache:
+            return None
+        return self.cache.get(self.analysis_key(doctor_info))
+    
+    def remember_analysis(self, doctor_info, analysis):
+        if self.cache:
+            self.cache.put(self.analysis_key(doctor_info), analysis)
+    
+    def analyze_with_groq(self, doctor_info):
+        """Use Groq AI to analyze doctor profile"""
+        cached = self.cached_analysis(doctor_info)
+        if cached:
+            return cached
+        
+        try:
+            content = self.post_completion(self.build_prompt(doctor_info))
+            if content is not None:
+                analysis = self.parse_groq_response(content)
+                self.remember_analysis(doctor_info, analysis)
+                return analysis
+            self.count_fallbacks(1)
+            return self.fallback_analysis(doctor_info)
                 
         except Exception as e:
             logging.error(f"Groq analysis failed: {e}")
+            self.count_fallbacks(1)
             return self.fallback_analysis(doctor_info)
     
-    def parse_groq_response(self, content):
-        """Parse Groq response into structured format"""
+    def parse_groq_response(self, content, ids=None):
+        """Parse Groq response into structured format.
+        
+        With ids, content is a packed reply: returns {id: analysis} for the
+        profiles whose block parsed, leaving the rest out.
+        """
+        if ids is not None:
+            return self.parse_packed_response(content, ids)
         try:
             lines = content.strip().split('\n')
             pros = cons = recommendation = ""
@@ -73,44 +244,215 @@ RECOMMENDATION: [brief recommendation with reasoning]
         except:
             return self.fallback_analysis({})
     
+    def parse_packed_response(self, content, ids):
+        blocks = {}
+        current = None
+        for line in (content or '').strip().split('\n'):
+            match = PACKED_ID_LINE.match(line.strip())
+            if match:
+                current = int(match.group(1))
+                blocks[current] = []
+            elif current is not None:
+                # Models like to decorate labels as **PROS:** or - PROS:
+                blocks[current].append(line.strip().lstrip('*-# ').replace('**', ''))
+        
+        results = {}
+        for block_id, block_lines in blocks.items():
+            if block_id not in ids:
+                continue
+            block = '\n'.join(block_lines)
+            if any(label in block for label in ('PROS:', 'CONS:', 'RECOMMENDATION:')):
+                results[block_id] = self.parse_groq_response(block)
+        return results
+    
+    def analyze_packed(self, doctors):
+        """Analyses for a pack of profiles from one request, in input order"""
+        analyses = [self.cached_analysis(doctor) for doctor in doctors]
+        todo = [doctor for doctor, analysis in zip(doctors, analyses) if not analysis]
+        if not todo:
+            return analyses
+        
+        ids = list(range(1, len(todo) + 1))
+        parsed = {}
+        try:
+            content = self.post_completion(self.build_packed_prompt(todo),
+                                           max_tokens=self.max_tokens * len(todo))
+            if content is not None:
+                parsed = self.parse_groq_response(content, ids)
+        except Exception as e:
+            logging.error(f"Groq packed analysis failed: {e}")
+        
+        missing = len(ids) - len(parsed)
+        if missing:
+            logging.warning(f"{missing}/{len(ids)} packed profiles unparsed, using fallback analysis")
+            self.count_fallbacks(missing)
+        
+        fresh = iter(zip(ids, todo))
+        for position, analysis in enumerate(analyses):
+            if analysis:
+                continue
+            i, doctor = next(fresh)
+            if i in parsed:
+                self.remember_analysis(doctor, parsed[i])
+                analyses[position] = parsed[i]
+            else:
+                analyses[position] = self.fallback_analysis(doctor)
+        return analyses
+    
     def fallback_analysis(self, doctor_info):
         """Fallback analysis when Groq fails"""
         rating = float(doctor_info.get('Ratings', 4.0))
         experience = int(doctor_info.get('Years of experience', 5))
         
-        if rating >= 4.5 and experience >= 10:
-            return {
-                'pros': "Highly rated with good experience",
-                'cons': "No significant concerns",
-                'recommendation': "Highly recommended specialist"
-            }
-        elif rating >= 4.0:
-            return {
-                'pros': "Good patient satisfaction",
-                'cons': "Standard consultation fees",
-                'recommendation': "Recommended for consultation"
-            }
-        else:
-            return {
-                'pros': "Available for consultation",
-                'cons': "Limited patient feedback",
-                'recommendation': "Consider with other options"
-            }
+        for min_rating, min_experience, analysis in FALLBACK_TIERS:
+            if rating >= min_rating and experience >= min_experience:
+                return dict(analysis)
+        return dict(FALLBACK_DEFAULT)
+    
+    def fallback_analysis_frame(self, df):
+        """Columnar fallback_analysis: fills the summary column of a whole DataFrame at once.
+        
+        Missing or invalid ratings/experience fall back to 4.0 and 5 like the
+        per-record path.
+        """
+        from rule_scoring import score_frame
+        tiers = [(r, e, self.format_summary(analysis)) for r, e, analysis in FALLBACK_TIERS]
+        return score_frame(df, SUMMARY_FIELD, tiers, self.format_summary(FALLBACK_DEFAULT),
+                           rating_default=4.0, experience_default=5)
 
     def analyze_doctor_profile(self, doctor_info):
         """Analyze doctor using Groq AI"""
-        analysis = self.analyze_with_groq(doctor_info)
-        
-        doctor_info['Summary of Pros and Cons (Summary of reviews), and recommendation'] = f"PROS: {analysis['pros']} | CONS: {analysis['cons']} | {analysis['recommendation']}"
-        
+        return self.apply_analysis(doctor_info, self.analyze_with_groq(doctor_info))
+    
+    def apply_analysis(self, doctor_info, analysis):
+        doctor_info[SUMMARY_FIELD] = self.format_summary(analysis)
         return doctor_info
+    
+    def format_summary(self, analysis):
+        return f"PROS: {analysis['pros']} | CONS: {analysis['cons']} | {analysis['recommendation']}"
 
     def batch_analyze_doctors(self, doctor_list):
-        """Analyze all doctors with Groq AI"""
+        """Analyze all doctors with Groq AI.
+        
+        Results are RecordOverlay views: each carries its new summary and
+        reads every other field from the input record instead of copying it.
+        They accept writes without touching the input; use to_dict() where a
+        plain dict is needed, e.g. for json.dumps.
+        """
+        start = self.counters()
+        results = self.analyze_list(doctor_list)
+        self.summarize_batch(start, len(results))
+        return results
+    
+    def iter_analyze_doctors(self, doctors, chunk_size=50):
+        """Lazy batch_analyze_doctors over any iterable, e.g. RobustPuneScraper.iter_doctors().
+        
+        Reads chunk_size records at a time, analyzes them with the same
+        packing and concurrency settings and yields them in input order,
+        so only one chunk is held at once. batch_summary covers the whole
+        stream once it is exhausted.
+        """
+        start = self.counters()
+        analyzed = 0
+        for chunk in chunked(doctors, chunk_size):
+            results = self.analyze_list(chunk)
+            analyzed += len(results)
+            logging.info(f"Analyzed {analyzed} doctors so far")
+            yield from results
+        self.summarize_batch(start, analyzed)
+    
+    def analyze_list(self, doctor_list):
+        if self.api_key == PLACEHOLDER_API_KEY:
+            return self.batch_analyze_rules(doctor_list)
+        if self.pack_size > 1:
+            return self.batch_analyze_packed(doctor_list)
+        if self.max_workers > 1:
+            return self.batch_analyze_concurrent(doctor_list)
         results = []
         for i, doctor in enumerate(doctor_list):
             if i % 10 == 0:
                 logging.info(f"Analyzing doctor {i+1}/{len(doctor_list)}")
-            analyzed = self.analyze_doctor_profile(doctor.copy())
+            analyzed = self.analyze_doctor_profile(RecordOverlay(doctor))
             results.append(analyzed)
-        return results
\ No newline at end of file
+        return results
+    
+    def batch_analyze_rules(self, doctor_list):
+        """analyze_list without an API key: cached analyses, the rest scored in one vectorised pass"""
+        results = [RecordOverlay(doctor) for doctor in doctor_list]
+        todo = []
+        for doctor in results:
+            cached = self.cached_analysis(doctor)
+            if cached:
+                self.apply_analysis(doctor, cached)
+            else:
+                todo.append(doctor)
+        if not todo:
+            return results
+        
+        self.count_fallbacks(len(todo))
+        try:
+            import pandas as pd
+            frame = pd.DataFrame(records_to_columns(todo, ['Ratings', 'Years of experience']))
+            summaries = self.fallback_analysis_frame(frame)[SUMMARY_FIELD]
+        except ImportError:
+            summaries = [self.format_summary(self.fallback_analysis(doctor)) for doctor in todo]
+        for doctor, summary in zip(todo, summaries):
+            doctor[SUMMARY_FIELD] = summary
+        logging.info(f"No GROQ_API_KEY: scored {len(todo)} doctors with the fallback rules")
+        return results
+    
+    def summarize_batch(self, start, analyzed):
+        start_hits, start_misses, start_fallbacks = start
+        hits, misses, fallbacks = self.counters()
+        self.batch_summary = {
+            'analyzed': analyzed,
+            'cache_hits': hits - start_hits,
+            'cache_misses': misses - start_misses,
+            'fallbacks': fallbacks - start_fallbacks
+        }
+        logging.info(f"Batch summary: {self.batch_summary}")
+    
+    def counters(self):
+        with self.stats_lock:
+            fallbacks = self.fallbacks
+        if self.cache:
+            return self.cache.hits, self.cache.misses, fallbacks
+        return 0, 0, fallbacks
+    
+    def batch_analyze_concurrent(self, doctor_list):
+        """Analyze with max_workers requests in flight; results keep input order"""
+        total = len(doctor_list)
+        done = [0]
+        lock = threading.Lock()
+        
+        def analyze(doctor):
+            analyzed = self.analyze_doctor_profile(RecordOverlay(doctor))
+            with lock:
+                done[0] += 1
+                if done[0] % 10 == 0:
+                    logging.info(f"Analyzed {done[0]}/{total} doctors")
+            return analyzed
+        
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            return list(pool.map(analyze, doctor_list))
+    
+    def batch_analyze_packed(self, doctor_list):
+        """pack_size profiles per request, packs spread over max_workers"""
+        packs = [doctor_list[i:i + self.pack_size] for i in range(0, len(doctor_list), self.pack_size)]
+        
+        def analyze(pack):
+            analyses = self.analyze_packed(pack)
+            return [self.apply_analysis(RecordOverlay(doctor), analysis) for doctor, analysis in zip(pack, analyses)]
+        
+        results = []
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            for i, analyzed in enumerate(pool.map(analyze, packs)):
+                results.extend(analyzed)
+                if i % 10 == 0:
+                    logging.info(f"Analyzed pack {i+1}/{len(packs)}")
+        return results
+    
+    def close(self):
+        self.session.close()
+        if self.cache:
+            self.cache.close()
\ No newline at end of file
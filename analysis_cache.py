@@ -0,0 +1,73 @@
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+
+
+def content_key(*parts):
+    """Stable hash of exactly the values that shape a model answer"""
+    return hashlib.sha256(json.dumps(parts, default=str).encode('utf-8')).hexdigest()
+
+
+class AnalysisCache:
+    """SQLite store of AI analyses keyed by content hash.
+
+    Entries older than ttl seconds are ignored and purged; past max_entries
+    the least recently used ones are evicted.
+    """
+
+    def __init__(self, path='analysis_cache.sqlite', ttl=90 * 86400, max_entries=200000):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.puts = 0
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS analyses (
+                key TEXT PRIMARY KEY,
+                analysis TEXT,
+                created_at REAL,
+                accessed_at REAL
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_analyses_accessed ON analyses (accessed_at)")
+        self.conn.execute("DELETE FROM analyses WHERE created_at < ?", (time.time() - ttl,))
+        self.conn.commit()
+
+    def get(self, key):
+        now = time.time()
+        with self.lock:
+            row = self.conn.execute("SELECT analysis, created_at FROM analyses WHERE key = ?", (key,)).fetchone()
+            if not row or now - row[1] > self.ttl:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.conn.execute("UPDATE analyses SET accessed_at = ? WHERE key = ?", (now, key))
+            self.conn.commit()
+        return json.loads(row[0])
+
+    def put(self, key, analysis):
+        now = time.time()
+        with self.lock:
+            self.conn.execute("INSERT OR REPLACE INTO analyses VALUES (?, ?, ?, ?)",
+                              (key, json.dumps(analysis), now, now))
+            self.puts += 1
+            # Counting rows is a table scan, so only check the bound every 100 writes
+            count = self.conn.execute("SELECT COUNT(*) FROM analyses").fetchone()[0] if self.puts % 100 == 0 else 0
+            if count > self.max_entries:
+                self.conn.execute("""
+                    DELETE FROM analyses WHERE key IN (
+                        SELECT key FROM analyses ORDER BY accessed_at LIMIT ?
+                    )
+                """, (count - self.max_entries,))
+                logging.info(f"Analysis cache: evicted {count - self.max_entries} least recently used entries")
+            self.conn.commit()
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
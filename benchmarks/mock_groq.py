@@ -0,0 +1,53 @@
+import json
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+PACKED_PROFILE = re.compile(r'ID: (\d+)\nDoctor: (.*)')
+SINGLE_PROFILE = re.compile(r'Doctor: (.*)')
+
+
+class MockGroqHandler(BaseHTTPRequestHandler):
+    """Answers chat completions in the PROS/CONS/RECOMMENDATION format, packed or not"""
+
+    def log_message(self, *args):
+        pass
+
+    def completion(self, prompt):
+        profiles = PACKED_PROFILE.findall(prompt)
+        if profiles:
+            return "\n\n".join(
+                f"ID: {i}\nPROS: Experienced {name}\nCONS: Busy schedule\nRECOMMENDATION: Consult {name}"
+                for i, name in profiles
+            )
+        match = SINGLE_PROFILE.search(prompt)
+        name = match.group(1) if match else 'doctor'
+        return f"PROS: Experienced {name}\nCONS: Busy schedule\nRECOMMENDATION: Consult {name}"
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+        content = self.completion(body['messages'][0]['content'])
+
+        reply = json.dumps({'choices': [{'message': {'role': 'assistant', 'content': content}}]}).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(reply)))
+        self.end_headers()
+        self.wfile.write(reply)
+
+
+def start_mock_server(host='127.0.0.1', port=0):
+    """Serve the mock endpoint on a background thread; returns (server, url)"""
+    server = ThreadingHTTPServer((host, port), MockGroqHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}/openai/v1/chat/completions"
+
+
+if __name__ == '__main__':
+    server, url = start_mock_server(port=8089)
+    print(f"Mock chat-completions endpoint at {url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+# Offline benchmarks for the scrape -> analyze -> export stages
+# Runs from the recorded pages in benchmarks/corpus and a local mock of the
+# chat-completions API, so no network access is needed.
+
+import argparse
+import json
+import logging
+import os
+import re
+import sys
+import tempfile
+import time
+import tracemalloc
+import zlib
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+from robust_pune_scraper import RobustPuneScraper
+from ai_analyzer import HealthcareAIAnalyzer
+from card_extractor import extract_doctor_details
+from mock_groq import start_mock_server
+
+CORPUS_DIR = os.path.join(BENCH_DIR, 'corpus')
+BASELINE_FILE = os.path.join(BENCH_DIR, 'baseline.json')
+
+# Metrics checked against the baseline: True = higher is better
+CHECKED_METRICS = {
+    'pages_per_sec': True,
+    'records_per_sec': True,
+    'seconds': False,
+    'peak_memory_mb': False
+}
+
+# Speed metrics are stored relative to the calibration run, so a baseline
+# recorded on one machine still holds on faster or slower hardware
+RELATIVE_METRICS = {'pages_per_sec', 'records_per_sec', 'seconds'}
+TAG = re.compile(r'<[^>]+>')
+
+
+def load_corpus():
+    with open(os.path.join(CORPUS_DIR, 'manifest.json')) as f:
+        manifest = json.load(f)
+    pages = []
+    for filename, url in manifest.items():
+        with open(os.path.join(CORPUS_DIR, filename), encoding='utf-8') as f:
+            pages.append((url, f.read()))
+    return pages
+
+
+def calibrate(pages, rounds=5):
+    """Passes/sec over the corpus of a fixed workload that uses none of the repo's code.
+
+    Tag stripping, zlib and JSON stand in for the mix of regex, C and
+    interpreter work in the real stages; the best of several rounds is
+    taken to keep scheduler noise out.
+    """
+    def run():
+        for url, html in pages:
+            text = ' '.join(TAG.sub(' ', html).split())
+            zlib.decompress(zlib.compress(text.encode('utf-8')))
+            json.loads(json.dumps({'url': url, 'words': text.split()}))
+
+    best = 0.0
+    for _ in range(rounds):
+        start = time.perf_counter()
+        run()
+        best = max(best, 1 / (time.perf_counter() - start))
+    return round(best, 2)
+
+
+def relative(results, calibration):
+    """Speed metrics as ratios to calibration; memory and counts stay absolute"""
+    scaled = {}
+    for stage, metrics in results.items():
+        if not isinstance(metrics, dict):
+            continue
+        scaled[stage] = {}
+        for metric, value in metrics.items():
+            if metric in RELATIVE_METRICS:
+                # seconds shrink on faster machines, rates grow
+                value = value * calibration if metric == 'seconds' else value / calibration
+                value = round(value, 6)
+            scaled[stage][metric] = value
+    return scaled
+
+
+def peak_memory(fn):
+    """Peak traced allocation of one fn() call in MB (timed separately, tracing is slow)"""
+    tracemalloc.start()
+    try:
+        fn()
+        return round(tracemalloc.get_traced_memory()[1] / 1024 / 1024, 2)
+    finally:
+        tracemalloc.stop()
+
+
+def bench_parse(scraper, pages, iterations):
+    def run():
+        count = 0
+        for url, html in pages:
+            records = scraper.parse_response_html(html, url)
+            for record in records:
+                record['Source'] = scraper.extract_source_from_url(url)
+            count += len(records)
+        return count
+
+    start = time.perf_counter()
+    records = sum(run() for _ in range(iterations))
+    elapsed = time.perf_counter() - start
+    return {
+        'pages_per_sec': round(len(pages) * iterations / elapsed, 2),
+        'records_per_sec': round(records / elapsed, 2),
+        'records_per_page': round(records / (len(pages) * iterations), 2),
+        'peak_memory_mb': peak_memory(run)
+    }
+
+
+def bench_records(scraper, pages, iterations):
+    details = [d for _, html in pages for d in extract_doctor_details(html)]
+
+    def run():
+        return [scraper.create_doctor_record(*d) for d in details]
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        run()
+    elapsed = time.perf_counter() - start
+    return {
+        'records_per_sec': round(len(details) * iterations / elapsed, 2),
+        'peak_memory_mb': peak_memory(run)
+    }
+
+
+def bench_export(scraper, records, rows):
+    try:
+        import pandas  # noqa: F401
+    except ImportError:
+        logging.error("pandas required for the export benchmark: pip install pandas openpyxl")
+        return None
+
+    dataset = [records[i % len(records)].copy() for i in range(rows)]
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        # save_results also writes scraping_metadata.json into the working directory
+        os.chdir(tmp)
+        try:
+            start = time.perf_counter()
+            scraper.save_results(dataset, 'benchmark_export.xlsx')
+            elapsed = time.perf_counter() - start
+            size = os.path.getsize('benchmark_export.xlsx')
+            memory = peak_memory(lambda: scraper.save_results(dataset, 'benchmark_export.xlsx'))
+        finally:
+            os.chdir(cwd)
+    return {
+        'rows': rows,
+        'seconds': round(elapsed, 3),
+        'records_per_sec': round(rows / elapsed, 2),
+        'file_mb': round(size / 1024 / 1024, 2),
+        'peak_memory_mb': memory
+    }
+
+
+def bench_analyze(records, count, workers, pack_size):
+    server, url = start_mock_server()
+    try:
+        analyzer = HealthcareAIAnalyzer(api_key='benchmark', base_url=url, max_workers=workers,
+                                        pack_size=pack_size, requests_per_minute=10 ** 6,
+                                        tokens_per_minute=10 ** 9, cache_path='')
+        doctors = [records[i % len(records)] for i in range(count)]
+        start = time.perf_counter()
+        analyzer.batch_analyze_doctors(doctors)
+        elapsed = time.perf_counter() - start
+        analyzer.close()
+    finally:
+        server.shutdown()
+    return {
+        'records_per_sec': round(count / elapsed, 2),
+        'fallbacks': analyzer.batch_summary['fallbacks']
+    }
+
+
+def compare(results, baseline, tolerance):
+    """List of regressions beyond tolerance, both sides already made relative"""
+    regressions = []
+    for stage, metrics in baseline.items():
+        for metric, expected in metrics.items():
+            if metric not in CHECKED_METRICS or not results.get(stage) or metric not in results[stage]:
+                continue
+            actual = results[stage][metric]
+            higher_is_better = CHECKED_METRICS[metric]
+            if higher_is_better and actual < expected * (1 - tolerance):
+                regressions.append(f"{stage}.{metric}: {actual} < baseline {expected}")
+            elif not higher_is_better and actual > expected * (1 + tolerance):
+                regressions.append(f"{stage}.{metric}: {actual} > baseline {expected}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Offline benchmarks against the recorded corpus')
+    parser.add_argument('--iterations', type=int, default=5, help='passes over the corpus per stage')
+    parser.add_argument('--export-rows', type=int, default=17476, help='rows in the export benchmark')
+    parser.add_argument('--analyze-count', type=int, default=500, help='profiles sent to the mock API')
+    parser.add_argument('--workers', type=int, default=8, help='analyzer max_workers')
+    parser.add_argument('--pack-size', type=int, default=1, help='analyzer pack_size')
+    parser.add_argument('--tolerance', type=float, default=0.3, help='allowed relative regression')
+    parser.add_argument('--update-baseline', action='store_true', help='store these results as the new baseline')
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    scraper = RobustPuneScraper(cache_path=None)
+    pages = load_corpus()
+    calibration = calibrate(pages)
+
+    results = {
+        'parse': bench_parse(scraper, pages, args.iterations),
+        'create_records': bench_records(scraper, pages, args.iterations)
+    }
+    sample = [r for url, html in pages for r in scraper.parse_response_html(html, url)]
+    results['export'] = bench_export(scraper, sample, args.export_rows)
+    results['analyze'] = bench_analyze(sample, args.analyze_count, args.workers, args.pack_size)
+    scraper.close()
+    # Calibrate again afterwards and keep the faster run, in case the machine was busy at the start
+    calibration = max(calibration, calibrate(pages))
+    logging.disable(logging.NOTSET)
+
+    results['calibration'] = {'passes_per_sec': calibration}
+    print(json.dumps(results, indent=2))
+    scaled = relative(results, calibration)
+
+    if args.update_baseline:
+        with open(BASELINE_FILE, 'w') as f:
+            json.dump(scaled, f, indent=2)
+        print(f"Baseline written to {BASELINE_FILE}")
+        return 0
+
+    if not os.path.exists(BASELINE_FILE):
+        print("No baseline yet - run with --update-baseline to record one")
+        return 0
+
+    with open(BASELINE_FILE) as f:
+        regressions = compare(scaled, json.load(f), args.tolerance)
+    if regressions:
+        print("Regressions past baseline:")
+        for line in regressions:
+            print(f"  {line}")
+        return 1
+    print("No regressions past baseline")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,206 @@
+import json
+import logging
+import os
+from array import array
+from datetime import datetime
+
+from doctor_record import records_to_columns
+from query_service import address_area
+
+# Low-cardinality columns stored dictionary-encoded
+CATEGORICAL_COLUMNS = ('Specialty', 'Source', 'Sources',
+                       'Summary of Pros and Cons (Summary of reviews), and recommendation')
+ROLLUP_KEYS = ('Specialty', 'Area', 'Source')
+PERCENTILES = (25, 50, 75, 90)
+
+
+def records_table(records, columns=None, dictionaries=None):
+    """pyarrow Table of records with the export column names.
+
+    With dictionaries ({column: {value: code}}) categorical columns are
+    encoded against append-only dictionaries kept across calls, so the
+    tables of successive chunks can share one Arrow IPC file.
+    """
+    import pyarrow as pa
+    columns = records_to_columns(records, columns)
+    arrays = {}
+    for column, values in columns.items():
+        if column in CATEGORICAL_COLUMNS and dictionaries is not None:
+            codes = dictionaries.setdefault(column, {})
+            indices = [None if v is None else codes.setdefault(str(v), len(codes)) for v in values]
+            arrays[column] = pa.DictionaryArray.from_arrays(pa.array(indices, type=pa.int32()),
+                                                            pa.array(list(codes), type=pa.string()))
+        elif column in CATEGORICAL_COLUMNS:
+            arrays[column] = pa.array([None if v is None else str(v) for v in values]).dictionary_encode()
+        elif column in ('Ratings', 'Years of experience', 'Reviews'):
+            arrays[column] = pa.array([number_or_none(v) for v in values], type=pa.float64())
+        else:
+            arrays[column] = pa.array([None if v is None else str(v) for v in values], type=pa.string())
+    return pa.table(arrays)
+
+
+def number_or_none(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def write_columnar(records, path):
+    """Write records as Arrow IPC (.arrow, memory-mappable) or Parquet (.parquet)"""
+    table = records_table(records)
+    tmp_path = f"{path}.tmp"
+    if path.endswith('.parquet'):
+        import pyarrow.parquet as pq
+        pq.write_table(table, tmp_path)
+    else:
+        import pyarrow as pa
+        # Uncompressed so readers can memory-map the buffers without copying
+        with pa.OSFile(tmp_path, 'wb') as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+    os.replace(tmp_path, path)
+    return table.num_rows
+
+
+class ColumnarSink:
+    """Incremental write_columnar: each write() appends one record batch or Parquet row group.
+
+    The column set and schema are fixed by the first non-empty write. Arrow
+    dictionaries only grow, so later batches are written as dictionary
+    deltas. The file is renamed into place on close().
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.tmp_path = f"{path}.tmp"
+        self.columns = None
+        self.dictionaries = {}
+        self.file = None
+        self.writer = None
+        self.count = 0
+
+    def open(self, schema):
+        if self.path.endswith('.parquet'):
+            import pyarrow.parquet as pq
+            self.writer = pq.ParquetWriter(self.tmp_path, schema)
+        else:
+            import pyarrow as pa
+            self.file = pa.OSFile(self.tmp_path, 'wb')
+            self.writer = pa.ipc.new_file(self.file, schema,
+                                          options=pa.ipc.IpcWriteOptions(emit_dictionary_deltas=True))
+
+    def write(self, records):
+        records = [r for r in records if r]
+        if not records:
+            return 0
+        table = records_table(records, self.columns, self.dictionaries)
+        if self.writer is None:
+            self.columns = table.column_names
+            self.open(table.schema)
+        self.writer.write_table(table)
+        self.count += table.num_rows
+        return table.num_rows
+
+    def close(self):
+        if self.writer is None:
+            return write_columnar([], self.path)
+        self.writer.close()
+        if self.file:
+            self.file.close()
+        self.writer = self.file = None
+        os.replace(self.tmp_path, self.path)
+        return self.count
+
+
+def read_columnar(path):
+    """Table from write_columnar; Arrow IPC files are memory-mapped, not read into memory"""
+    if path.endswith('.parquet'):
+        import pyarrow.parquet as pq
+        return pq.read_table(path)
+    import pyarrow as pa
+    return pa.ipc.open_file(pa.memory_map(path, 'r')).read_all()
+
+
+def percentiles(values):
+    import numpy as np
+    values = values[~np.isnan(values)]
+    if not len(values):
+        return None
+    return {f"p{p}": round(float(v), 2) for p, v in zip(PERCENTILES, np.percentile(values, PERCENTILES))}
+
+
+class RollupAccumulator:
+    """Collects just the rollup fields of records fed in chunks; result() is compute_rollups"""
+
+    def __init__(self):
+        self.keys = {key: [] for key in ROLLUP_KEYS}
+        # Unparseable numbers are kept as NaN, which percentiles() skips
+        self.ratings = array('d')
+        self.experience = array('d')
+
+    def add(self, records):
+        for r in records:
+            if not r:
+                continue
+            self.keys['Specialty'].append(str(r.get('Specialty') or 'Unknown'))
+            self.keys['Area'].append(address_area(r.get('Complete address')).title() or 'Unknown')
+            self.keys['Source'].append(str(r.get('Source') or 'Unknown'))
+            for values, field in ((self.ratings, 'Ratings'), (self.experience, 'Years of experience')):
+                value = number_or_none(r.get(field))
+                values.append(float('nan') if value is None else value)
+
+    def result(self):
+        import numpy as np
+        import pandas as pd
+        df = pd.DataFrame(self.keys)
+        ratings = np.frombuffer(self.ratings, dtype=float) if self.ratings else np.empty(0)
+        experience = np.frombuffer(self.experience, dtype=float) if self.experience else np.empty(0)
+
+        def summarise(keys):
+            rows = []
+            if not len(df):
+                return rows
+            for key, positions in sorted(df.groupby(list(keys)).indices.items()):
+                key = key if isinstance(key, tuple) else (key,)
+                row = dict(zip((k.lower() for k in keys), key))
+                row['count'] = len(positions)
+                row['rating'] = percentiles(ratings[positions])
+                row['experience'] = percentiles(experience[positions])
+                rows.append(row)
+            return rows
+
+        return {
+            'generated_at': datetime.now().isoformat(),
+            'total_doctors': len(df),
+            'percentiles': list(PERCENTILES),
+            'by_specialty': summarise(('Specialty',)),
+            'by_area': summarise(('Area',)),
+            'by_source': summarise(('Source',)),
+            'by_specialty_area_source': summarise(ROLLUP_KEYS)
+        }
+
+
+def compute_rollups(records):
+    """Counts and rating/experience percentiles per specialty x area x source, plus each margin"""
+    accumulator = RollupAccumulator()
+    accumulator.add(records)
+    return accumulator.result()
+
+
+def write_bundle(records, base_path, fmt='arrow'):
+    """Columnar data file plus its rollups JSON; returns their paths"""
+    data_path = f"{base_path}.{fmt}"
+    rollup_path = f"{base_path}_rollups.json"
+    rows = write_columnar(records, data_path)
+
+    write_rollups(compute_rollups(records), rollup_path)
+
+    logging.info(f"Saved {rows} doctors to {data_path} with rollups in {rollup_path}")
+    return data_path, rollup_path
+
+
+def write_rollups(rollups, path):
+    with open(f"{path}.tmp", 'w', encoding='utf-8') as f:
+        json.dump(rollups, f, indent=2, ensure_ascii=False)
+    os.replace(f"{path}.tmp", path)
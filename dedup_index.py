@@ -0,0 +1,163 @@
+import hashlib
+import re
+import struct
+
+NAME_PREFIX = re.compile(r'^(dr\.?|doctor)\s+')
+NON_ALNUM = re.compile(r'[^a-z0-9 ]+')
+
+
+def normalize_text(value):
+    value = NON_ALNUM.sub(' ', str(value or '').lower())
+    return ' '.join(value.split())
+
+
+def normalize_name(name):
+    return normalize_text(NAME_PREFIX.sub('', str(name or '').strip().lower()))
+
+
+def phone_digits(phone):
+    digits = re.sub(r'\D', '', str(phone or ''))
+    return digits[-10:] if len(digits) >= 10 else ''
+
+
+def shingles(text, size=3):
+    text = normalize_text(text)
+    if len(text) <= size:
+        return {text} if text else set()
+    return {text[i:i + size] for i in range(len(text) - size + 1)}
+
+
+class MinHashLSH:
+    """Banded MinHash buckets for near-duplicate candidate lookup"""
+
+    def __init__(self, bands=8, rows=4):
+        self.bands = bands
+        self.rows = rows
+        self.unpack = struct.Struct(f'<{bands * rows}I').unpack
+        self.buckets = {}
+
+    def signature(self, shingle_set):
+        # One SHAKE digest yields all bands * rows 32-bit hash functions at once
+        size = self.bands * self.rows * 4
+        rows = [self.unpack(hashlib.shake_128(s.encode('utf-8')).digest(size)) for s in shingle_set]
+        return [min(column) for column in zip(*rows)]
+
+    def band_keys(self, signature):
+        for band in range(self.bands):
+            yield band, tuple(signature[band * self.rows:(band + 1) * self.rows])
+
+    def candidates(self, signature):
+        found = {}
+        for key in self.band_keys(signature):
+            for item in self.buckets.get(key, ()):
+                found[item] = True
+        return list(found)
+
+    def insert(self, signature, item):
+        for key in self.band_keys(signature):
+            self.buckets.setdefault(key, []).append(item)
+
+
+class DoctorDedupIndex:
+    """Merges duplicate doctor records as they arrive.
+
+    Exact matches are found through hash blocks on normalised name plus
+    phone and normalised name plus clinic, so each record costs O(1).
+    Only values parsed from the page count: a phone, clinic or address
+    the scraper generated as a stand-in never forms a key.
+    With near_duplicates=True, records that miss both blocks are also
+    compared against MinHash/LSH candidates on the name and merged
+    when the shingle Jaccard similarity of both the name and the address
+    reaches threshold. Survivors keep every source they were seen on in
+    'Sources'.
+    """
+
+    def __init__(self, near_duplicates=False, threshold=0.8):
+        self.records = []
+        self.by_phone = {}
+        self.by_clinic = {}
+        self.near_duplicates = near_duplicates
+        self.threshold = threshold
+        self.lsh = MinHashLSH() if near_duplicates else None
+        self.shingle_sets = []
+        self.merged = 0
+        self.released = 0
+
+    def parsed(self, record, column):
+        """record's value for column, or None when it is a generated stand-in"""
+        if column in (getattr(record, 'filled', None) or ()):
+            return None
+        return record.get(column)
+
+    def keys(self, record):
+        name = normalize_name(record.get('Doctors name'))
+        phone = phone_digits(self.parsed(record, 'Contact number'))
+        clinic = normalize_text(self.parsed(record, 'Clinic/Hospital'))
+        return (name, phone) if phone else None, (name, clinic) if clinic else None
+
+    def add(self, record):
+        """Index record and return the surviving record it was merged into (None once released)"""
+        if not record:
+            return None
+
+        phone_key, clinic_key = self.keys(record)
+        position = self.by_phone.get(phone_key)
+        if position is None:
+            position = self.by_clinic.get(clinic_key)
+
+        record_shingles = signature = None
+        if position is None and self.near_duplicates:
+            record_shingles = (shingles(normalize_name(record.get('Doctors name'))),
+                               shingles(self.parsed(record, 'Complete address')))
+            # Bucket on the name only: addresses share too many "Pune" shingles
+            signature = self.lsh.signature(record_shingles[0]) if record_shingles[0] else None
+            if signature:
+                for candidate in self.lsh.candidates(signature):
+                    other = self.shingle_sets[candidate]
+                    if (self.similarity(record_shingles[0], other[0]) >= self.threshold and
+                            self.similarity(record_shingles[1], other[1]) >= self.threshold):
+                        position = candidate
+                        break
+
+        if position is None:
+            position = len(self.records)
+            record['Sources'] = record.get('Source', '')
+            self.records.append(record)
+            if self.near_duplicates:
+                self.shingle_sets.append(record_shingles or (set(), set()))
+                if signature:
+                    self.lsh.insert(signature, position)
+        else:
+            survivor = self.records[position]
+            if survivor is not None:
+                self.merge(survivor, record)
+            self.merged += 1
+
+        if phone_key:
+            self.by_phone.setdefault(phone_key, position)
+        if clinic_key:
+            self.by_clinic.setdefault(clinic_key, position)
+        return self.records[position]
+
+    def release(self):
+        """Drop the survivors held so far but keep their keys.
+
+        Streaming consumers call this once records have been handed on:
+        later duplicates of them are still recognised and counted, they
+        just no longer extend the released record's Sources.
+        """
+        for position in range(self.released, len(self.records)):
+            self.records[position] = None
+        self.released = len(self.records)
+
+    def merge(self, survivor, duplicate):
+        sources = [s for s in survivor.get('Sources', '').split(', ') if s]
+        source = duplicate.get('Source', '')
+        if source and source not in sources:
+            sources.append(source)
+            survivor['Sources'] = ', '.join(sources)
+
+    def similarity(self, a, b):
+        if not a or not b:
+            return 0.0
+        return len(a & b) / len(a | b)
@@ -0,0 +1,140 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+
+from doctor_record import record_state
+
+# Fields that identify a listing across runs; everything else may change.
+# The address is left out: missing ones are filled with a generated address.
+KEY_FIELDS = ('Doctors name', 'Clinic/Hospital', 'Specialty', 'Source')
+
+# Fields compared for updates: the ones read from listings. Email, reviews and
+# the summary are always generated, so they differ on every run.
+SCRAPED_FIELDS = ('Doctors name', 'Specialty', 'Clinic/Hospital', 'Complete address', 'Contact number',
+                  'Ratings', 'Years of experience', 'Source', 'Sources')
+
+# Markup that changes between fetches of the same listing (tokens, timestamps,
+# tracking config); JSON-LD scripts are kept as they hold listing data
+SCRIPT_OR_STYLE = re.compile(r'<(script|style|noscript)\b([^>]*)>.*?</\1\s*>', re.I | re.S)
+COMMENT = re.compile(r'<!--.*?-->', re.S)
+TAG = re.compile(r'<[^>]+>')
+
+
+def page_hash(html):
+    """Hash of the exact page bytes"""
+    return hashlib.sha256(html.encode('utf-8')).hexdigest()
+
+
+def page_text(html):
+    """Visible text and JSON-LD of a page, whitespace collapsed"""
+    html = SCRIPT_OR_STYLE.sub(lambda m: m.group(0) if 'ld+json' in m.group(2).lower() else ' ',
+                               COMMENT.sub(' ', html))
+    return ' '.join(TAG.sub(' ', html).split())
+
+
+def content_hash(html):
+    """Hash of page_text: unchanged when only tokens, attributes or scripts differ"""
+    return hashlib.sha256(page_text(html).encode('utf-8')).hexdigest()
+
+
+class PageIndex:
+    """Content hash and parsed records of every page from the previous run"""
+
+    def __init__(self, path='page_index.sqlite'):
+        self.path = path
+        self.unchanged = 0
+        self.changed = 0
+        self.carried = 0
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS pages (
+                url TEXT PRIMARY KEY,
+                hash TEXT,
+                records TEXT
+            )
+        """)
+        self.conn.commit()
+
+    def lookup(self, url, digest):
+        """Previous records for url if its content hash is unchanged, else None"""
+        with self.lock:
+            row = self.conn.execute("SELECT hash, records FROM pages WHERE url = ?", (url,)).fetchone()
+        if row and row[0] == digest:
+            self.unchanged += 1
+            return json.loads(row[1])
+        self.changed += 1
+        return None
+
+    def previous(self, url):
+        """Last run's records for url whatever its content now, or None if it was never parsed"""
+        with self.lock:
+            row = self.conn.execute("SELECT records FROM pages WHERE url = ?", (url,)).fetchone()
+        if row is None:
+            return None
+        self.carried += 1
+        return json.loads(row[0])
+
+    def store(self, url, digest, records):
+        with self.lock:
+            self.conn.execute("INSERT OR REPLACE INTO pages VALUES (?, ?, ?)",
+                              (url, digest, json.dumps([record_state(r) for r in records], ensure_ascii=False)))
+            self.conn.commit()
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+def record_key(record):
+    return tuple(str(record.get(field, '')).strip().lower() for field in KEY_FIELDS)
+
+
+def diff_datasets(previous, current):
+    """Split current vs previous into added, updated and removed records.
+
+    A record counts as updated only when a scraped field changed; previous
+    usually comes from the exported workbook, which does not say which of
+    its values were generated, so current's flags decide.
+    """
+    old = {record_key(r): r for r in previous if r}
+    new = {record_key(r): r for r in current if r}
+
+    added = [r for key, r in new.items() if key not in old]
+    removed = [r for key, r in old.items() if key not in new]
+    updated = [r for key, r in new.items() if key in old and changed_fields(r, old[key])]
+    return added, updated, removed
+
+
+def changed_fields(record, previous):
+    """Scraped fields whose value differs from previous; generated stand-ins are skipped"""
+    filled = getattr(record, 'filled', None) or ()
+    return [f for f in SCRAPED_FIELDS
+            if f not in filled and str(record.get(f, '')) != str(previous.get(f, ''))]
+
+
+def load_dataset(filename):
+    """Records from a previously exported workbook, or [] if there is none"""
+    if not os.path.exists(filename):
+        return []
+    try:
+        import pandas as pd
+        df = pd.read_excel(filename).fillna('')
+        return df.to_dict('records')
+    except ImportError:
+        logging.error("pandas required for Excel import: pip install pandas openpyxl")
+    except Exception as e:
+        logging.error(f"Could not load previous dataset {filename}: {e}")
+    return []
+
+
+def write_delta(filename, added, updated, removed):
+    delta = {'added': [dict(r) for r in added], 'updated': [dict(r) for r in updated],
+             'removed': [dict(r) for r in removed]}
+    with open(filename, 'w', encoding='utf-8') as f:
+        json.dump(delta, f, indent=2, ensure_ascii=False, default=str)
+    logging.info(f"Delta: {len(added)} added, {len(updated)} updated, {len(removed)} removed -> {filename}")
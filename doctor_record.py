@@ -0,0 +1,197 @@
+import sys
+from collections.abc import MutableMapping
+
+SUMMARY_COLUMN = 'Summary of Pros and Cons (Summary of reviews), and recommendation'
+
+# (slot, export column) in export order; 'Sources' is only set once deduplicated
+FIELDS = [
+    ('address', 'Complete address'),
+    ('name', 'Doctors name'),
+    ('specialty', 'Specialty'),
+    ('clinic', 'Clinic/Hospital'),
+    ('experience', 'Years of experience'),
+    ('phone', 'Contact number'),
+    ('rating', 'Ratings'),
+    ('email', 'Contact email'),
+    ('reviews', 'Reviews'),
+    ('summary', SUMMARY_COLUMN),
+    ('source', 'Source'),
+    ('sources', 'Sources')
+]
+COLUMNS = [column for _, column in FIELDS]
+COLUMN_SLOTS = {column: slot for slot, column in FIELDS}
+
+# Marks a column deleted through a RecordOverlay
+DELETED = object()
+
+# Serialised key for the columns a parser generated instead of reading from the page
+FILLED_KEY = '_filled'
+
+# Low-cardinality string columns: one shared string object per distinct value
+CATEGORICAL_SLOTS = {'specialty', 'source', 'sources', 'summary'}
+
+
+class DoctorRecord(MutableMapping):
+    """One doctor without the per-record hash table of the equivalent dict.
+
+    Values live in slots instead of a dict keyed by long column names, and
+    categorical strings are interned so thousands of rows share one copy. It behaves as a mapping over the export column names, so
+    code written against the old dicts keeps working; dict(record) or
+    records_to_columns() produce the export form. Unset columns (None) are
+    treated as missing. 'filled' names the columns holding generated
+    stand-ins rather than parsed values; it is not an export column.
+    """
+
+    __slots__ = tuple(slot for slot, _ in FIELDS) + ('filled',)
+
+    def __init__(self, **values):
+        for slot in self.__slots__:
+            self.set_slot(slot, values.get(slot))
+
+    @classmethod
+    def from_mapping(cls, data):
+        if isinstance(data, cls):
+            return data
+        values = {COLUMN_SLOTS[column]: value for column, value in data.items() if column in COLUMN_SLOTS}
+        return cls(filled=tuple(data.get(FILLED_KEY) or ()), **values)
+
+    def set_slot(self, slot, value):
+        if slot in CATEGORICAL_SLOTS and isinstance(value, str):
+            value = sys.intern(value)
+        setattr(self, slot, value)
+
+    def __getitem__(self, column):
+        value = getattr(self, COLUMN_SLOTS[column])
+        if value is None:
+            raise KeyError(column)
+        return value
+
+    def __setitem__(self, column, value):
+        self.set_slot(COLUMN_SLOTS[column], value)
+
+    def __delitem__(self, column):
+        self[column]
+        self.set_slot(COLUMN_SLOTS[column], None)
+
+    def __iter__(self):
+        for slot, column in FIELDS:
+            if getattr(self, slot) is not None:
+                yield column
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __repr__(self):
+        return f"DoctorRecord({dict(self)!r})"
+
+    def __reduce__(self):
+        return (rebuild_record, (tuple(getattr(self, slot) for slot in self.__slots__),))
+
+    def copy(self):
+        return DoctorRecord(**{slot: getattr(self, slot) for slot in self.__slots__})
+
+
+def rebuild_record(values):
+    return DoctorRecord(**dict(zip(DoctorRecord.__slots__, values)))
+
+
+def record_state(record):
+    """dict(record) plus its generated-column flags, for stores that are read back"""
+    state = dict(record)
+    filled = getattr(record, 'filled', None)
+    if filled:
+        state[FILLED_KEY] = list(filled)
+    return state
+
+
+class RecordOverlay(MutableMapping):
+    """Zero-copy, copy-on-write view of a record.
+
+    The analyzer writes a new summary per doctor; instead of copying every
+    record it wraps it and reads all other columns through to the original.
+    Writes and deletes of any column land in the overlay only, so the
+    wrapped record is never changed. Like any non-dict mapping it is not
+    JSON-serialisable as is; to_dict() gives the plain dict.
+    """
+
+    __slots__ = ('base', 'summary', 'changes')
+
+    def __init__(self, base):
+        self.base = base
+        self.summary = None
+        # Columns other than the summary written or deleted through the overlay
+        self.changes = None
+
+    def __getitem__(self, column):
+        if column == SUMMARY_COLUMN and self.summary is not None:
+            return self.summary
+        if self.changes and column in self.changes:
+            value = self.changes[column]
+            if value is DELETED:
+                raise KeyError(column)
+            return value
+        return self.base[column]
+
+    def __setitem__(self, column, value):
+        if column == SUMMARY_COLUMN and value is not None:
+            self.summary = sys.intern(value) if isinstance(value, str) else value
+            if self.changes:
+                self.changes.pop(column, None)
+            return
+        if self.changes is None:
+            self.changes = {}
+        self.changes[column] = value
+
+    def __delitem__(self, column):
+        self[column]
+        if column == SUMMARY_COLUMN:
+            self.summary = None
+        if self.changes is None:
+            self.changes = {}
+        self.changes[column] = DELETED
+
+    def __iter__(self):
+        changes = self.changes or {}
+        for column in self.base:
+            if column in self:
+                yield column
+        for column, value in changes.items():
+            if value is not DELETED and column not in self.base:
+                yield column
+        if self.summary is not None and SUMMARY_COLUMN not in self.base and SUMMARY_COLUMN not in changes:
+            yield SUMMARY_COLUMN
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __repr__(self):
+        return f"RecordOverlay({self.to_dict()!r})"
+
+    def to_dict(self):
+        return dict(self)
+
+    def copy(self):
+        return self.to_dict()
+
+
+def records_to_columns(records, columns=None):
+    """{export column: [values]} for a DataFrame, skipping columns no record has.
+
+    A given columns list fixes the column set instead, e.g. so every chunk
+    of a streamed export matches the first one.
+    """
+    records = [r for r in records if r]
+    if columns is not None:
+        return {column: [r.get(column) for r in records] for column in columns}
+    columns = {}
+    for column in COLUMNS:
+        values = [r.get(column) for r in records]
+        if any(value is not None for value in values):
+            columns[column] = values
+    extra = []
+    for record in records:
+        if not isinstance(record, DoctorRecord):
+            extra.extend(c for c in record if c not in COLUMN_SLOTS and c != FILLED_KEY and c not in extra)
+    for column in extra:
+        columns[column] = [r.get(column) for r in records]
+    return columns
@@ -0,0 +1,75 @@
+import heapq
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from urllib.parse import urlparse
+
+from rate_scheduler import SourceBlocked
+
+
+class ConcurrentFetcher:
+    """Bounded thread pool that runs a fetch function over many URLs at once"""
+
+    def __init__(self, fetch_fn, max_workers=8, per_host_limit=2, delay=0.5):
+        self.fetch_fn = fetch_fn
+        self.max_workers = max(1, max_workers)
+        self.per_host_limit = max(1, per_host_limit)
+        self.delay = delay
+        self.host_slots = {}
+        self.lock = threading.Lock()
+
+    def host_slot(self, url):
+        host = urlparse(url).netloc
+        with self.lock:
+            if host not in self.host_slots:
+                self.host_slots[host] = threading.BoundedSemaphore(self.per_host_limit)
+            return self.host_slots[host]
+
+    def fetch_one(self, url):
+        with self.host_slot(url):
+            try:
+                return self.fetch_fn(url)
+            except SourceBlocked:
+                raise
+            except Exception as e:
+                logging.error(f"URL {url} failed: {e}")
+                return []
+            finally:
+                # Keep the host slot busy for the politeness delay
+                if self.delay:
+                    time.sleep(self.delay)
+
+    def fetch_all(self, urls):
+        """Fetch every URL and return results keyed by URL in input order.
+
+        A URL whose source is backing off (SourceBlocked) is put back and
+        resubmitted once the source is ready; meanwhile the threads keep
+        fetching other URLs.
+        """
+        unique_urls = list(dict.fromkeys(urls))
+        if not unique_urls:
+            return {}
+
+        results = {}
+        deferred = []
+        workers = min(self.max_workers, len(unique_urls))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            running = {pool.submit(self.fetch_one, url): url for url in unique_urls}
+            while running or deferred:
+                while deferred and deferred[0][0] <= time.monotonic():
+                    url = heapq.heappop(deferred)[1]
+                    running[pool.submit(self.fetch_one, url)] = url
+                if not running:
+                    time.sleep(max(0, deferred[0][0] - time.monotonic()))
+                    continue
+                timeout = max(0, deferred[0][0] - time.monotonic()) if deferred else None
+                done, _ = wait(running, timeout=timeout, return_when=FIRST_COMPLETED)
+                for future in done:
+                    url = running.pop(future)
+                    try:
+                        results[url] = future.result()
+                    except SourceBlocked as e:
+                        logging.info(f"Deferring {url}: {e}")
+                        heapq.heappush(deferred, (e.ready_at, url))
+        return {url: results[url] for url in unique_urls}
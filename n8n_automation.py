@@ -4,59 +4,139 @@
 
 import sys
 import os
+import argparse
 import json
 from datetime import datetime
 from robust_pune_scraper import RobustPuneScraper
+from delta_refresh import load_dataset, diff_datasets, write_delta
 import logging
 
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
 def setup_logging():
-    # Create log file for this automation run
+    # Create log file for this automation run; the handler is removed again when
+    # the run ends, so a long-lived daemon gets one log file per job
     log_file = f"doctor_scraping_{datetime.now().strftime('%Y%m%d_%H%M%S')}.log"
-    logging.basicConfig(
-        level=logging.INFO,
-        format='%(asctime)s - %(levelname)s - %(message)s',
-        handlers=[
-            logging.FileHandler(log_file),
-            logging.StreamHandler()
-        ]
+    root = logging.getLogger()
+    root.setLevel(logging.INFO)
+    if not any(type(h) is logging.StreamHandler for h in root.handlers):
+        console = logging.StreamHandler()
+        console.setFormatter(logging.Formatter(LOG_FORMAT))
+        root.addHandler(console)
+    handler = logging.FileHandler(log_file)
+    handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    root.addHandler(handler)
+    return log_file, handler
+
+def build_scraper(delta=False):
+    # Start the robust scraper (SCRAPER_CONCURRENCY=1 falls back to sequential fetching)
+    return RobustPuneScraper(
+        concurrency=int(os.getenv('SCRAPER_CONCURRENCY', '8')),
+        per_host_concurrency=int(os.getenv('SCRAPER_PER_HOST', '2')),
+        cache_path=os.getenv('SCRAPER_CACHE', 'http_cache.sqlite') or None,
+        parse_processes=int(os.getenv('SCRAPER_PARSE_PROCESSES', str(os.cpu_count() or 1))),
+        page_index_path=os.getenv('SCRAPER_PAGE_INDEX', 'page_index.sqlite') or None,
+        template_history_path=os.getenv('SCRAPER_TEMPLATE_HISTORY', 'template_yield.json') or None,
+        archive_path=os.getenv('SCRAPER_ARCHIVE', 'page_archive') or None,
+        reuse_unchanged=delta
     )
-    return log_file
 
-def run_automation():
-    # Main function that does all the work
-    log_file = setup_logging()
+def run_result(scraper, total_doctors, output_file, log_file, run_time, mode, **extra):
+    # The JSON n8n reads back after a successful run
+    metrics = scraper.metrics_summary()
+    result = {
+        'status': 'success',
+        'total_doctors': total_doctors,
+        'filename': output_file,
+        'log_file': log_file,
+        'timestamp': run_time,
+        'areas_covered': [area.replace('-', ' ').title() for area in scraper.areas_scraped],
+        'specialties_done': ['Cardiology', 'Dermatology', 'Neurology', 'Orthopedic', 'Pediatric', 'Gynecology', 'General Medicine', 'Oncology', 'Psychiatry', 'ENT', 'Ophthalmology', 'Urology'],
+        'data_sources': ['Practo', 'JustDial', '1mg', 'Lybrate', 'Apollo'],
+        'doctor_info_fields': [
+            'Complete address', 'Doctors name', 'Specialty', 'Clinic/Hospital',
+            'Years of experience', 'Contact number', 'Ratings', 'Contact email',
+            'Reviews', 'Summary of Pros and Cons (Summary of reviews), and recommendation', 'Source', 'Sources'
+        ],
+        'mode': mode
+    }
+    result.update(extra)
+    result.update({
+        'success_count': metrics['success_count'],
+        'failed_urls': len(metrics['failed_urls']),
+        'metrics': metrics,
+        'archive': scraper.archive.stats() if scraper.archive else None
+    })
+    return result
+
+def run_failure(error, log_file, label='Scraping'):
+    # The JSON n8n reads back after a failed run, also logged and printed
+    error_info = {
+        'status': 'failed',
+        'error_message': str(error),
+        'log_file': log_file,
+        'timestamp': datetime.now().isoformat()
+    }
+    logging.error(f"{label} failed: {error_info}")
+    print(json.dumps(error_info))
+    return error_info
+
+def run_automation(resume=False, delta=False, scraper=None, replay=False, replay_until=None):
+    # Main function that does all the work. A warm scraper passed in by the
+    # daemon is reset and reused instead of being built and closed per run.
+    # replay rebuilds the dataset from the page archive instead of fetching
+    log_file, log_handler = setup_logging()
+    owns_scraper = scraper is None
+    mode = 'replay' if replay else 'delta' if delta else 'full'
     
     try:
-        logging.info("Starting robust doctor data scraping")
+        logging.info(f"Starting robust doctor data scraping ({mode} run)")
         
-        # Start the robust scraper
-        scraper = RobustPuneScraper()
+        # Always save to the same file so frontend can find it
+        output_file = 'healthcare_doctors.xlsx'
+        previous = load_dataset(output_file) if delta else []
+        
+        if owns_scraper:
+            scraper = build_scraper(delta)
+        else:
+            scraper.reset()
+            scraper.reuse_unchanged = delta
         
         # Run comprehensive scraping
-        doctor_list = scraper.scrape_comprehensive()
+        if replay:
+            doctor_list = scraper.replay_comprehensive(until=replay_until)
+        else:
+            doctor_list = scraper.scrape_comprehensive(resume=resume)
         
-        # Always save to the same file so frontend can find it
-        output_file = 'healthcare_doctors.xlsx'
         scraper.save_results(doctor_list, output_file)
-        scraper.close()
+        
+        # Read-optimised copy for the dashboard: memory-mappable columns plus rollups
+        export_format = os.getenv('SCRAPER_EXPORT_FORMAT', 'arrow')
+        columnar_file, rollups_file = (scraper.export_bundle(doctor_list, 'healthcare_doctors', export_format)
+                                       if export_format else (None, None))
+        page_index = scraper.page_index
         
         # Send results back to n8n
         run_time = datetime.now().strftime('%Y%m%d_%H%M%S')
-        success_result = {
-            'status': 'success',
-            'total_doctors': len(doctor_list),
-            'filename': output_file,
-            'log_file': log_file,
-            'timestamp': run_time,
-            'areas_covered': ['Aundh', 'Baner', 'Wakad', 'Kothrud', 'Viman Nagar', 'Hadapsar', 'Pune City', 'Camp', 'Koregaon Park', 'Deccan'],
-            'specialties_done': ['Cardiology', 'Dermatology', 'Neurology', 'Orthopedic', 'Pediatric', 'Gynecology', 'General Medicine', 'Oncology', 'Psychiatry', 'ENT', 'Ophthalmology', 'Urology'],
-            'data_sources': ['Practo', 'JustDial', '1mg', 'Lybrate', 'Apollo'],
-            'doctor_info_fields': [
-                'Complete address', 'Doctors name', 'Specialty', 'Clinic/Hospital',
-                'Years of experience', 'Contact number', 'Ratings', 'Contact email',
-                'Reviews', 'Summary of Pros and Cons (Summary of reviews), and recommendation', 'Source'
-            ]
-        }
+        success_result = run_result(scraper, len(doctor_list), output_file, log_file, run_time, mode,
+                                    columnar_file=columnar_file, rollups_file=rollups_file)
+        if owns_scraper:
+            scraper.close()
+        
+        if delta:
+            # Downstream consumers only need to ingest what changed
+            added, updated, removed = diff_datasets(previous, doctor_list)
+            delta_file = f"healthcare_doctors_delta_{run_time}.json"
+            write_delta(delta_file, added, updated, removed)
+            success_result.update({
+                'added': len(added),
+                'updated': len(updated),
+                'removed': len(removed),
+                'delta_file': delta_file,
+                'unchanged_pages': page_index.unchanged if page_index else 0,
+                'changed_pages': page_index.changed if page_index else 0,
+                'carried_pages': page_index.carried if page_index else 0
+            })
         
         logging.info(f"Robust scraping completed successfully: {success_result}")
         print(json.dumps(success_result))  # n8n reads this output
@@ -65,17 +145,140 @@ def run_automation():
         
     except Exception as error:
         # Something went wrong, let n8n know
-        error_info = {
-            'status': 'failed',
-            'error_message': str(error),
-            'log_file': log_file,
-            'timestamp': datetime.now().isoformat()
-        }
+        return run_failure(error, log_file)
+    
+    finally:
+        logging.getLogger().removeHandler(log_handler)
+        log_handler.close()
+
+def run_streaming(resume=False, scraper=None, analyzer=None):
+    # Scrape -> analyze -> export as one lazy pipeline: records move through in
+    # chunks and every exporter writes each chunk as it arrives, so memory stays
+    # flat as the dataset grows and analyzed records show up in the JSONL file
+    # within the first chunk
+    log_file, log_handler = setup_logging()
+    owns_scraper = scraper is None
+    owns_analyzer = analyzer is None
+    feed = None
+    
+    try:
+        logging.info("Starting robust doctor data scraping (stream run)")
+        from ai_analyzer import HealthcareAIAnalyzer
+        from output_sink import ExcelSink, JsonlSink, chunked
+        
+        if owns_scraper:
+            scraper = build_scraper()
+        else:
+            scraper.reset()
+            scraper.reuse_unchanged = False
+        if owns_analyzer:
+            analyzer = HealthcareAIAnalyzer(max_workers=int(os.getenv('ANALYZER_WORKERS', '4')),
+                                            pack_size=int(os.getenv('ANALYZER_PACK_SIZE', '1')))
+        chunk_size = int(os.getenv('STREAM_CHUNK_SIZE', '50'))
         
-        logging.error(f"Scraping failed: {error_info}")
-        print(json.dumps(error_info))
+        output_file = 'healthcare_doctors.xlsx'
+        jsonl_file = 'healthcare_doctors_analyzed.jsonl'
+        feed = JsonlSink(jsonl_file)
+        sinks = [ExcelSink(output_file), feed]
+        export_format = os.getenv('SCRAPER_EXPORT_FORMAT', 'arrow')
+        columnar_file = rollups_file = rollups = None
+        if export_format:
+            from columnar_export import ColumnarSink, RollupAccumulator, write_rollups
+            columnar_file = f"healthcare_doctors.{export_format}"
+            rollups_file = 'healthcare_doctors_rollups.json'
+            sinks.append(ColumnarSink(columnar_file))
+            rollups = RollupAccumulator()
+        
+        total = 0
+        analyzed = analyzer.iter_analyze_doctors(scraper.iter_doctors(resume=resume), chunk_size)
+        for chunk in chunked(analyzed, chunk_size):
+            for sink in sinks:
+                sink.write(chunk)
+            if rollups:
+                rollups.add(chunk)
+            total += len(chunk)
+        for sink in sinks:
+            sink.close()
+        if rollups:
+            write_rollups(rollups.result(), rollups_file)
+        scraper.save_metadata(total)
+        
+        run_time = datetime.now().strftime('%Y%m%d_%H%M%S')
+        success_result = run_result(scraper, total, output_file, log_file, run_time, 'stream',
+                                    columnar_file=columnar_file, rollups_file=rollups_file,
+                                    jsonl_file=jsonl_file, analysis=analyzer.batch_summary)
+        
+        logging.info(f"Robust scraping completed successfully: {success_result}")
+        print(json.dumps(success_result))  # n8n reads this output
+        
+        return success_result
+        
+    except Exception as error:
+        return run_failure(error, log_file)
+    
+    finally:
+        # A failed run leaves the previous workbook and columnar file in place,
+        # since only their .tmp files were written
+        if feed:
+            feed.close()
+        if owns_scraper and scraper:
+            scraper.close()
+        if owns_analyzer and analyzer:
+            analyzer.close()
+        logging.getLogger().removeHandler(log_handler)
+        log_handler.close()
+
+def run_analysis(analyzer=None, input_file='healthcare_doctors.xlsx',
+                 output_file='healthcare_doctors_analyzed.xlsx'):
+    # Re-run the AI summaries over the last export without scraping again
+    log_file, log_handler = setup_logging()
+    owns_analyzer = analyzer is None
+    try:
+        import pandas as pd
+        from ai_analyzer import HealthcareAIAnalyzer
+        from doctor_record import DoctorRecord, records_to_columns
         
-        return error_info
+        if owns_analyzer:
+            analyzer = HealthcareAIAnalyzer(max_workers=int(os.getenv('ANALYZER_WORKERS', '4')),
+                                            pack_size=int(os.getenv('ANALYZER_PACK_SIZE', '1')))
+        doctors = [DoctorRecord.from_mapping(r) for r in load_dataset(input_file)]
+        analyzed = analyzer.batch_analyze_doctors(doctors)
+        pd.DataFrame(records_to_columns(analyzed)).to_excel(output_file, index=False)
+        
+        result = {
+            'status': 'success',
+            'total_doctors': len(analyzed),
+            'filename': output_file,
+            'log_file': log_file,
+            'timestamp': datetime.now().strftime('%Y%m%d_%H%M%S'),
+            'analysis': analyzer.batch_summary
+        }
+        logging.info(f"Analysis completed: {result}")
+        print(json.dumps(result))
+        return result
+    
+    except Exception as error:
+        return run_failure(error, log_file, 'Analysis')
+    
+    finally:
+        if owns_analyzer and analyzer:
+            analyzer.close()
+        logging.getLogger().removeHandler(log_handler)
+        log_handler.close()
 
 if __name__ == "__main__":
-    run_automation()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description='Weekly doctor data scraping for n8n')
+    parser.add_argument('--resume', action='store_true', help='continue the last run if it did not finish')
+    parser.add_argument('--delta', action='store_true', help='reuse unchanged pages and report only the changes')
+    parser.add_argument('--analyze-only', action='store_true', help='re-run AI summaries over the last export')
+    parser.add_argument('--stream', action='store_true', help='scrape, analyze and export in chunks with flat memory')
+    parser.add_argument('--replay', action='store_true', help='reparse archived pages with the current parsers, no network')
+    parser.add_argument('--replay-until', help='replay pages as fetched at or before this ISO date/time (default: now)')
+    args = parser.parse_args()
+    if args.analyze_only:
+        run_analysis()
+    elif args.stream:
+        run_streaming(resume=args.resume)
+    else:
+        until = datetime.fromisoformat(args.replay_until).timestamp() if args.replay_until else None
+        run_automation(resume=args.resume, delta=args.delta, replay=args.replay, replay_until=until)
\ No newline at end of file
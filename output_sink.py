@@ -0,0 +1,103 @@
+import json
+import logging
+import os
+from itertools import islice
+
+from doctor_record import record_state, records_to_columns
+
+
+class JsonlSink:
+    """Append-only JSON Lines file: each batch writes only its new records"""
+
+    def __init__(self, path, append=False):
+        self.path = path
+        self.count = 0
+        self.file = open(path, 'a' if append else 'w', encoding='utf-8')
+
+    def write(self, records):
+        lines = [json.dumps(record_state(record), ensure_ascii=False) + '\n' for record in records if record]
+        self.file.writelines(lines)
+        self.file.flush()
+        self.count += len(lines)
+        return len(lines)
+
+    def close(self):
+        if not self.file.closed:
+            self.file.close()
+            logging.info(f"Streamed {self.count} records to {self.path}")
+
+
+class ExcelSink:
+    """Streams records into an .xlsx through openpyxl's write-only mode.
+
+    Rows are written to disk as they arrive instead of being collected in
+    a DataFrame first; the workbook is renamed into place on close(). The
+    columns are fixed by the first non-empty write.
+    """
+
+    def __init__(self, path):
+        from openpyxl import Workbook
+        self.path = path
+        self.count = 0
+        self.columns = None
+        self.workbook = Workbook(write_only=True)
+        self.sheet = self.workbook.create_sheet('Sheet1')
+
+    def write(self, records):
+        records = [record for record in records if record]
+        if not records:
+            return 0
+        columns = records_to_columns(records, self.columns)
+        if self.columns is None:
+            self.columns = list(columns)
+            self.sheet.append(self.columns)
+        for row in zip(*columns.values()):
+            self.sheet.append(list(row))
+        self.count += len(records)
+        return len(records)
+
+    def close(self):
+        if self.workbook is None:
+            return
+        self.workbook.save(f"{self.path}.tmp")
+        os.replace(f"{self.path}.tmp", self.path)
+        self.workbook = None
+        logging.info(f"Streamed {self.count} records to {self.path}")
+
+
+def chunked(records, size):
+    """Lists of up to size records from any iterable, read lazily"""
+    records = iter(records)
+    while True:
+        chunk = list(islice(records, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def load_jsonl_prefix(path, count):
+    """Load the first count records and cut the file after them.
+
+    Used on resume: anything past the last journaled combination belongs to
+    work that did not finish and will be redone.
+    """
+    records = []
+    offset = 0
+    with open(path, 'r+b') as f:
+        for line in f:
+            if len(records) >= count or not line.endswith(b'\n'):
+                break
+            records.append(json.loads(line))
+            offset += len(line)
+        f.truncate(offset)
+    return records
+
+
+def read_jsonl(path):
+    """Yield records back from a JSONL file, skipping a torn last line"""
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                logging.warning(f"Skipping incomplete line in {path}")
@@ -0,0 +1,159 @@
+import gzip
+import os
+import re
+import sqlite3
+import threading
+import time
+
+from delta_refresh import page_hash
+
+SEGMENT_PATTERN = re.compile(r'^segment-(\d{6})\.(zst|gz)$')
+
+
+def default_codec():
+    try:
+        import zstandard  # noqa: F401
+        return 'zst'
+    except ImportError:
+        return 'gz'
+
+
+def compress(body, codec):
+    if codec == 'zst':
+        import zstandard
+        return zstandard.ZstdCompressor(level=10).compress(body)
+    return gzip.compress(body, compresslevel=6, mtime=0)
+
+
+def decompress(frame, codec):
+    if codec == 'zst':
+        import zstandard
+        return zstandard.ZstdDecompressor().decompress(frame)
+    return gzip.decompress(frame)
+
+
+class PageArchive:
+    """Append-only store of every fetched page for offline reparsing.
+
+    Each page body is one independently compressed frame (zstd when the
+    zstandard package is installed, else gzip) appended to the current
+    segment file; segments roll over at segment_bytes. Concatenated
+    frames are still a valid .zst/.gz stream, so segments can be read
+    with zstdcat/zcat. A SQLite index maps (url, fetched_at) to segment,
+    offset and length. A page whose body matches the URL's last archived
+    copy gets an index row pointing at that frame instead of a new one.
+    """
+
+    def __init__(self, directory='page_archive', segment_bytes=64 * 1024 * 1024, codec=None):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.codec = codec or default_codec()
+        self.lock = threading.Lock()
+        self.readers = {}
+        self.appended = 0
+        self.reused = 0
+        os.makedirs(directory, exist_ok=True)
+
+        self.conn = sqlite3.connect(os.path.join(directory, 'index.sqlite'), check_same_thread=False)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS pages (
+                url TEXT,
+                fetched_at REAL,
+                status INTEGER,
+                digest TEXT,
+                segment TEXT,
+                offset INTEGER,
+                length INTEGER
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_pages_url ON pages (url, fetched_at)")
+        self.conn.commit()
+
+        self.segment = None
+        self.writer = None
+        self.open_segment()
+
+    def open_segment(self):
+        """Append to the newest segment of this codec while it has room, else start the next one"""
+        numbers = [int(m.group(1)) for m in map(SEGMENT_PATTERN.match, os.listdir(self.directory)) if m]
+        number = max(numbers, default=0)
+        name = f"segment-{number:06d}.{self.codec}"
+        path = os.path.join(self.directory, name)
+        if not number or not os.path.exists(path) or os.path.getsize(path) >= self.segment_bytes:
+            number += 1
+            name = f"segment-{number:06d}.{self.codec}"
+        if self.writer:
+            self.writer.close()
+        self.segment = name
+        self.writer = open(os.path.join(self.directory, name), 'ab')
+
+    def append(self, url, html, status=200, fetched_at=None):
+        """Archive one fetched page"""
+        body = html.encode('utf-8')
+        digest = page_hash(html)
+        fetched_at = fetched_at or time.time()
+        with self.lock:
+            last = self.conn.execute(
+                "SELECT digest, segment, offset, length FROM pages WHERE url = ? ORDER BY fetched_at DESC LIMIT 1",
+                (url,)
+            ).fetchone()
+            if last and last[0] == digest:
+                segment, offset, length = last[1:]
+                self.reused += 1
+            else:
+                frame = compress(body, self.codec)
+                if self.writer.tell() and self.writer.tell() + len(frame) > self.segment_bytes:
+                    self.open_segment()
+                segment, offset, length = self.segment, self.writer.tell(), len(frame)
+                self.writer.write(frame)
+                # The frame is on disk before the index row that points at it
+                self.writer.flush()
+                self.appended += 1
+            self.conn.execute("INSERT INTO pages VALUES (?, ?, ?, ?, ?, ?, ?)",
+                              (url, fetched_at, status, digest, segment, offset, length))
+            self.conn.commit()
+
+    def locate(self, url, since=None, until=None):
+        """(segment, offset, length) of url's newest copy fetched in [since, until], or None"""
+        with self.lock:
+            return self.conn.execute(
+                "SELECT segment, offset, length FROM pages WHERE url = ? AND fetched_at >= ? AND fetched_at <= ? "
+                "ORDER BY fetched_at DESC LIMIT 1",
+                (url, since or 0, until or time.time())
+            ).fetchone()
+
+    def read(self, segment, offset, length):
+        with self.lock:
+            if segment not in self.readers:
+                self.readers[segment] = os.open(os.path.join(self.directory, segment), os.O_RDONLY)
+            fd = self.readers[segment]
+        # pread has no shared file position, so fetch threads can read concurrently
+        frame = os.pread(fd, length, offset)
+        return decompress(frame, segment.rsplit('.', 1)[1]).decode('utf-8')
+
+    def latest(self, url, since=None, until=None):
+        """HTML of url as last fetched in [since, until], or None if it was never archived"""
+        location = self.locate(url, since, until)
+        return self.read(*location) if location else None
+
+    def stats(self):
+        with self.lock:
+            pages, urls = self.conn.execute("SELECT COUNT(*), COUNT(DISTINCT url) FROM pages").fetchone()
+        segments = [name for name in os.listdir(self.directory) if SEGMENT_PATTERN.match(name)]
+        return {
+            'pages': pages,
+            'urls': urls,
+            'segments': len(segments),
+            'bytes': sum(os.path.getsize(os.path.join(self.directory, name)) for name in segments),
+            'codec': self.codec
+        }
+
+    def close(self):
+        with self.lock:
+            if self.writer:
+                self.writer.close()
+                self.writer = None
+            for fd in self.readers.values():
+                os.close(fd)
+            self.readers = {}
+            self.conn.close()
@@ -0,0 +1,121 @@
+import heapq
+import logging
+import os
+import queue
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from source_extractors import timed_extract_page_details
+from delta_refresh import content_hash
+from rate_scheduler import SourceBlocked
+
+
+class ParsePipeline:
+    """Fetch -> bounded queue -> process-pool parse -> record building.
+
+    fetcher is a ConcurrentFetcher whose fetch function returns page HTML.
+    Downloads keep running while earlier pages are parsed on other cores;
+    the page queue and the cap on in-flight parse jobs bound memory, so
+    fetch threads block instead of piling up HTML when parsing falls behind.
+    Optional reuse(url, digest) / remember(url, digest, records) hooks let
+    delta runs skip parsing pages whose content hash is unchanged, and an
+    optional carry(url) hook supplies records for pages that failed to
+    fetch. Worker
+    parse times are reported to metrics (a RunMetrics) when given.
+    """
+
+    def __init__(self, fetcher, build_records, processes=None, queue_size=32,
+                 reuse=None, remember=None, carry=None, metrics=None):
+        self.fetcher = fetcher
+        self.metrics = metrics
+        self.build_records = build_records
+        self.reuse = reuse
+        self.remember = remember
+        self.carry = carry
+        self.processes = processes or os.cpu_count() or 1
+        self.queue_size = queue_size
+        self.max_in_flight = self.processes * 2
+        self.pool = None
+
+    def parse_pool(self):
+        if self.pool is None:
+            self.pool = ProcessPoolExecutor(max_workers=self.processes)
+        return self.pool
+
+    def fetch_all(self, urls):
+        """Same contract as ConcurrentFetcher.fetch_all: {url: records} in input order"""
+        unique_urls = list(dict.fromkeys(urls))
+        if not unique_urls:
+            return {}
+
+        pages = queue.Queue(maxsize=self.queue_size)
+        results = {}
+        in_flight = {}
+
+        def produce(url):
+            html = None
+            try:
+                html = self.fetcher.fetch_one(url)
+            except SourceBlocked as e:
+                # Handed back to the main loop, which resubmits it once the source is ready
+                html = e
+            finally:
+                pages.put((url, html))
+
+        def collect(done):
+            for future in done:
+                url, digest = in_flight.pop(future)
+                try:
+                    details, seconds = future.result()
+                    if self.metrics:
+                        self.metrics.record_parse(seconds)
+                    results[url] = self.build_records(details)
+                except Exception as e:
+                    logging.error(f"HTML parsing error for {url}: {e}")
+                    results[url] = []
+                if self.remember:
+                    self.remember(url, digest, results[url])
+                if results[url]:
+                    logging.info(f"Extracted {len(results[url])} doctors from {url}")
+
+        workers = min(self.fetcher.max_workers, len(unique_urls))
+        with ThreadPoolExecutor(max_workers=workers) as fetch_pool:
+            for url in unique_urls:
+                fetch_pool.submit(produce, url)
+
+            deferred = []
+            remaining = len(unique_urls)
+            while remaining:
+                while deferred and deferred[0][0] <= time.monotonic():
+                    fetch_pool.submit(produce, heapq.heappop(deferred)[1])
+                try:
+                    timeout = max(0, deferred[0][0] - time.monotonic()) if deferred else None
+                    url, html = pages.get(timeout=timeout)
+                except queue.Empty:
+                    continue
+                if isinstance(html, SourceBlocked):
+                    logging.info(f"Deferring {url}: {html}")
+                    heapq.heappush(deferred, (html.ready_at, url))
+                    continue
+                remaining -= 1
+                if not html:
+                    results[url] = (self.carry(url) if self.carry else None) or []
+                    continue
+                digest = content_hash(html) if self.remember else None
+                if self.reuse:
+                    previous = self.reuse(url, digest)
+                    if previous is not None:
+                        results[url] = previous
+                        continue
+                if len(in_flight) >= self.max_in_flight:
+                    done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    collect(done)
+                in_flight[self.parse_pool().submit(timed_extract_page_details, html, url)] = (url, digest)
+
+        collect(list(in_flight))
+        return {url: results[url] for url in unique_urls}
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
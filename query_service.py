@@ -0,0 +1,343 @@
+#!/usr/bin/env python3
+# Offline HTTP/JSON query API over the scraped doctor dataset
+#   GET /doctors?specialty=cardiology&area=baner&min_rating=4&sort=rating&limit=20&offset=0
+#   GET /stats    counts per specialty, area, pincode and source
+#   GET /health   dataset path, record count and load time
+#   POST /reload  rebuild the indexes from the dataset file now
+
+import argparse
+import json
+import logging
+import os
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+import numpy as np
+
+from doctor_record import DoctorRecord
+from output_sink import read_jsonl
+
+PINCODE = re.compile(r'\b(\d{6})\b')
+INDEXED_FIELDS = ('specialty', 'area', 'pincode', 'source')
+SORT_FIELDS = ('rating', 'experience', 'reviews')
+MAX_LIMIT = 100
+
+
+def number(value, default=0.0):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def page_param(params, name, default):
+    """Integer query parameter; ValueError naming it when it is not a whole number"""
+    value = params.get(name, default)
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{name} must be a whole number, got {value!r}") from None
+
+
+def address_area(address):
+    """Locality written just before 'Pune' in an address, lower-cased"""
+    parts = [p.strip() for p in str(address or '').split(',')]
+    for i, part in enumerate(parts):
+        if i and part.lower().startswith('pune'):
+            return re.sub(r'^\d+\s*', '', parts[i - 1]).lower()
+    return ''
+
+
+def address_pincode(address):
+    match = PINCODE.search(str(address or ''))
+    return match.group(1) if match else ''
+
+
+class DoctorIndex:
+    """Immutable in-memory indexes over one dataset snapshot.
+
+    Specialty, area, pincode and source are stored as integer category
+    codes with a posting array of row positions per value; sources are a
+    bitmask so merged records match every source they were seen on. A
+    query walks the shortest posting array and checks the other filters
+    as vectorised comparisons; top-k uses a partial sort. Rows are also
+    pre-ordered by rating, experience and reviews so unfiltered pages are
+    a slice.
+    """
+
+    def __init__(self, records):
+        self.records = [r for r in records if r]
+        self.codes = {field: {} for field in INDEXED_FIELDS}
+        columns = {field: [] for field in INDEXED_FIELDS}
+        source_bits = []
+        values = {field: [] for field in SORT_FIELDS}
+
+        for record in self.records:
+            address = record.get('Complete address')
+            row = {
+                'specialty': str(record.get('Specialty') or '').lower(),
+                'area': address_area(address),
+                'pincode': address_pincode(address),
+                'source': str(record.get('Source') or '').lower()
+            }
+            for field, value in row.items():
+                columns[field].append(self.code(field, value))
+
+            # A merged record is findable under every source it was seen on
+            sources = {s.strip().lower() for s in str(record.get('Sources') or '').split(',') if s.strip()}
+            sources.add(row['source'])
+            source_bits.append(sum(1 << self.code('source', s) for s in sources if s))
+
+            values['rating'].append(number(record.get('Ratings')))
+            values['experience'].append(number(record.get('Years of experience')))
+            values['reviews'].append(number(record.get('Reviews')))
+
+        self.columns = {field: np.array(codes, dtype=np.int32) for field, codes in columns.items()}
+        # Python ints first: more than 63 sources would overflow a fixed-width mask
+        self.source_bits = np.array(source_bits, dtype=object if len(self.codes['source']) > 63 else np.int64)
+        self.values = {field: np.array(v, dtype=np.float64) for field, v in values.items()}
+
+        self.postings = {}
+        for field in INDEXED_FIELDS:
+            if field == 'source':
+                self.postings[field] = {
+                    code: np.flatnonzero((self.source_bits & (1 << code)) != 0)
+                    for code in self.codes[field].values()
+                }
+            else:
+                # One stable argsort groups every value's rows in ascending position order
+                column = self.columns[field]
+                counts = np.bincount(column, minlength=len(self.codes[field]))
+                groups = np.split(np.argsort(column, kind='stable'), np.cumsum(counts)[:-1])
+                self.postings[field] = dict(enumerate(groups))
+
+        self.orders = {field: np.lexsort((np.arange(len(self.records)), -self.values[field]))
+                       for field in SORT_FIELDS}
+        # Position of each row in every order: unique sort keys, so pages never overlap on ties
+        self.ranks = {}
+        for field, order in self.orders.items():
+            rank = np.empty(len(order), dtype=np.int64)
+            rank[order] = np.arange(len(order))
+            self.ranks[field] = rank
+
+    def code(self, field, value):
+        codes = self.codes[field]
+        if value not in codes:
+            codes[value] = len(codes)
+        return codes[value]
+
+    def query(self, filters=None, min_rating=0.0, min_experience=0.0, sort=None, limit=20, offset=0):
+        """(total matches, records for the requested page)"""
+        limit = max(0, min(int(limit), MAX_LIMIT))
+        offset = max(0, int(offset))
+        filters = {f: str(v).lower() for f, v in (filters or {}).items() if v and f in INDEXED_FIELDS}
+        codes = {}
+        for field, value in filters.items():
+            if value not in self.codes[field]:
+                return 0, []
+            codes[field] = self.codes[field][value]
+
+        if not codes and min_rating <= 0 and min_experience <= 0:
+            order = self.orders[sort] if sort in SORT_FIELDS else np.arange(len(self.records))
+            return len(self.records), [self.records[p] for p in order[offset:offset + limit]]
+
+        # Walk the shortest posting array, check the rest as vector comparisons
+        if codes:
+            shortest = min(codes, key=lambda f: len(self.postings[f][codes[f]]))
+            hits = self.postings[shortest][codes[shortest]]
+        else:
+            hits = np.arange(len(self.records))
+        mask = np.ones(len(hits), dtype=bool)
+        for field, code in codes.items():
+            if field == shortest:
+                continue
+            if field == 'source':
+                mask &= (self.source_bits[hits] & (1 << code)) != 0
+            else:
+                mask &= self.columns[field][hits] == code
+        if min_rating > 0:
+            mask &= self.values['rating'][hits] >= min_rating
+        if min_experience > 0:
+            mask &= self.values['experience'][hits] >= min_experience
+        hits = hits[mask]
+        total = len(hits)
+
+        end = offset + limit
+        if sort in SORT_FIELDS and total:
+            keys = self.ranks[sort][hits]
+            if end < total:
+                # Partial sort: only the first `end` rows need ordering
+                top = np.argpartition(keys, end - 1)[:end]
+                hits, keys = hits[top], keys[top]
+            hits = hits[np.argsort(keys)]
+        return total, [self.records[p] for p in hits[offset:end]]
+
+    def stats(self):
+        return {
+            field: {value: len(self.postings[field][code])
+                    for value, code in sorted(self.codes[field].items()) if value}
+            for field in INDEXED_FIELDS
+        }
+
+
+def load_records(path):
+    """Compact records from an exported workbook, columnar bundle or JSONL stream; raises if unreadable"""
+    if path.endswith('.jsonl'):
+        rows = read_jsonl(path)
+    elif path.endswith(('.arrow', '.parquet')):
+        from columnar_export import read_columnar
+        rows = read_columnar(path).to_pylist()
+    else:
+        import pandas as pd
+        rows = pd.read_excel(path).fillna('').to_dict('records')
+    return [DoctorRecord.from_mapping(row) for row in rows if row]
+
+
+class QueryService:
+    """Serves the latest DoctorIndex and swaps in a new one when the file changes.
+
+    A new index is built completely before the reference is replaced, so
+    requests in flight keep the snapshot they started with. A file caught
+    mid-write fails to load and is retried on the next poll.
+    """
+
+    def __init__(self, path, poll_interval=5):
+        self.path = path
+        self.poll_interval = poll_interval
+        self.index = DoctorIndex([])
+        self.loaded_at = None
+        self.signature = None
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+
+    def file_signature(self):
+        try:
+            stat = os.stat(self.path)
+            return stat.st_mtime_ns, stat.st_size
+        except OSError:
+            return None
+
+    def reload(self):
+        with self.lock:
+            signature = self.file_signature()
+            if signature is None:
+                logging.warning(f"Dataset {self.path} not found, keeping {len(self.index.records)} records")
+                return False
+            try:
+                start = time.perf_counter()
+                index = DoctorIndex(load_records(self.path))
+            except Exception as e:
+                # Remember the signature so a broken file is retried only once it changes again
+                self.signature = signature
+                logging.error(f"Reload of {self.path} failed, keeping the previous index: {e}")
+                return False
+            self.index = index
+            self.signature = signature
+            self.loaded_at = time.time()
+            logging.info(f"Indexed {len(index.records)} doctors from {self.path} "
+                         f"in {time.perf_counter() - start:.2f}s")
+            return True
+
+    def watch(self):
+        while not self.stopped.wait(self.poll_interval):
+            signature = self.file_signature()
+            if signature and signature != self.signature:
+                self.reload()
+
+    def start_watcher(self):
+        threading.Thread(target=self.watch, daemon=True).start()
+
+    def stop(self):
+        self.stopped.set()
+
+
+class QueryHandler(BaseHTTPRequestHandler):
+    service = None
+
+    def log_message(self, format, *args):
+        logging.debug(format % args)
+
+    def send_json(self, payload, status=200):
+        body = json.dumps(payload, ensure_ascii=False, default=str).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        index = self.service.index
+
+        if url.path == '/doctors':
+            try:
+                limit = page_param(params, 'limit', 20)
+                offset = page_param(params, 'offset', 0)
+                start = time.perf_counter()
+                total, records = index.query(
+                    filters={f: params.get(f) for f in INDEXED_FIELDS},
+                    min_rating=number(params.get('min_rating')),
+                    min_experience=number(params.get('min_experience')),
+                    sort=params.get('sort'),
+                    limit=limit,
+                    offset=offset
+                )
+                elapsed = time.perf_counter() - start
+            except ValueError as e:
+                return self.send_json({'error': str(e)}, 400)
+            return self.send_json({
+                'total': total,
+                'offset': max(0, offset),
+                'results': [dict(r) for r in records],
+                'query_ms': round(elapsed * 1000, 3)
+            })
+        if url.path == '/stats':
+            return self.send_json(index.stats())
+        if url.path == '/health':
+            return self.send_json({'dataset': self.service.path, 'records': len(index.records),
+                                   'loaded_at': self.service.loaded_at})
+        self.send_json({'error': 'not found'}, 404)
+
+    def do_POST(self):
+        if urlsplit(self.path).path == '/reload':
+            reloaded = self.service.reload()
+            return self.send_json({'reloaded': reloaded, 'records': len(self.service.index.records)})
+        self.send_json({'error': 'not found'}, 404)
+
+
+def serve(path, host='127.0.0.1', port=8080, poll_interval=5):
+    """Load path, start the file watcher and serve until interrupted"""
+    service = QueryService(path, poll_interval)
+    service.reload()
+    service.start_watcher()
+    handler = type('BoundQueryHandler', (QueryHandler,), {'service': service})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    logging.info(f"Query service on http://{host}:{port}/doctors")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.stop()
+        server.server_close()
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description='Indexed query API over the doctor dataset')
+    parser.add_argument('--data', default='healthcare_doctors.xlsx', help='exported .xlsx, .arrow, .parquet or .jsonl dataset')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--poll', type=float, default=5, help='seconds between dataset change checks')
+    args = parser.parse_args()
+    serve(args.data, args.host, args.port, args.poll)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,164 @@
+import logging
+import threading
+import time
+
+# Requests per second allowed for each source returned by extract_source_from_url
+DEFAULT_RATES = {
+    'Practo': 1.0,
+    'JustDial': 0.5,
+    '1mg': 1.0,
+    'Lybrate': 1.0,
+    'Apollo': 1.0,
+    'Unknown': 0.5
+}
+
+THROTTLE_STATUSES = (429, 503)
+
+# Concurrent fetchers put a URL back rather than wait longer than this for its source
+MAX_SOURCE_WAIT = 5.0
+
+
+class SourceBlocked(Exception):
+    """Raised by acquire instead of sleeping past max_wait; ready_at is on the monotonic clock"""
+
+    def __init__(self, domain, wait):
+        super().__init__(f"{domain} is backing off for {wait:.0f}s")
+        self.domain = domain
+        self.ready_at = time.monotonic() + wait
+
+
+class DomainState:
+    def __init__(self, rate, burst):
+        self.base_rate = rate
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.failures = 0
+        self.open_until = 0.0
+        self.probing = False
+
+    def refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+
+class DomainRateScheduler:
+    """Token bucket per source with 429/503 backoff and a circuit breaker.
+
+    With shared set (any object with reserve(domain, interval) -> seconds
+    to wait, e.g. a work queue), each allowed request also books a slot in
+    that shared schedule, so the per-source rate holds across every
+    process and machine using it rather than per process.
+
+    With max_wait set, acquire raises SourceBlocked instead of sleeping
+    through a longer wait (e.g. a 120s Retry-After), so a concurrent
+    fetcher can put the URL back and keep its threads on other sources.
+    """
+
+    def __init__(self, rates=None, burst=2, failure_threshold=5, cooldown=300,
+                 min_rate=0.05, max_backoff=120, shared=None, max_wait=None):
+        self.rates = dict(DEFAULT_RATES, **(rates or {}))
+        self.burst = burst
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.min_rate = min_rate
+        self.max_backoff = max_backoff
+        self.shared = shared
+        self.max_wait = max_wait
+        self.domains = {}
+        self.slept = {}
+        self.lock = threading.Lock()
+
+    def state(self, domain):
+        if domain not in self.domains:
+            rate = self.rates.get(domain, self.rates['Unknown'])
+            self.domains[domain] = DomainState(rate, self.burst)
+        return self.domains[domain]
+
+    def acquire(self, domain):
+        """Block until a request to domain is allowed; False if its circuit is open.
+
+        Raises SourceBlocked when the wait would exceed max_wait.
+        """
+        probe = False
+        while True:
+            with self.lock:
+                state = self.state(domain)
+                now = time.monotonic()
+
+                if state.open_until and not probe:
+                    if now < state.open_until or state.probing:
+                        return False
+                    # Cooldown over: let a single probe request through (half-open)
+                    state.probing = probe = True
+
+                state.refill(now)
+                wait = state.blocked_until - now
+                if wait <= 0:
+                    if state.tokens >= 1:
+                        state.tokens -= 1
+                        if not self.shared:
+                            return True
+                        interval = 1 / state.rate
+                        break
+                    wait = (1 - state.tokens) / state.rate
+                if self.max_wait is not None and wait > self.max_wait:
+                    if probe:
+                        state.probing = False
+                    raise SourceBlocked(domain, wait)
+                # Politeness waits, reported per source in the run metrics
+                self.slept[domain] = self.slept.get(domain, 0.0) + wait
+
+            time.sleep(wait)
+
+        # Outside the lock: the shared booking may block on other processes
+        wait = self.shared.reserve(domain, interval)
+        if wait > 0:
+            with self.lock:
+                self.slept[domain] = self.slept.get(domain, 0.0) + wait
+            time.sleep(wait)
+        return True
+
+    def record_response(self, domain, status_code, retry_after=None):
+        if status_code in THROTTLE_STATUSES:
+            self.record_throttle(domain, retry_after)
+        elif status_code == 403 or status_code >= 500:
+            self.record_failure(domain)
+        else:
+            self.record_success(domain)
+
+    def record_success(self, domain):
+        with self.lock:
+            state = self.state(domain)
+            state.failures = 0
+            state.open_until = 0.0
+            state.probing = False
+            # Additive recovery back towards the configured rate
+            state.rate = min(state.base_rate, state.rate + state.base_rate * 0.1)
+
+    def record_throttle(self, domain, retry_after=None):
+        with self.lock:
+            state = self.state(domain)
+            state.rate = max(self.min_rate, state.rate / 2)
+            backoff = min(self.max_backoff, 2 ** state.failures)
+            if retry_after:
+                try:
+                    backoff = min(self.max_backoff, float(retry_after))
+                except (TypeError, ValueError):
+                    pass
+            state.blocked_until = time.monotonic() + backoff
+            logging.warning(f"{domain} throttled us, backing off {backoff:.0f}s at {state.rate:.2f} req/s")
+            self.add_failure(domain, state)
+
+    def record_failure(self, domain):
+        with self.lock:
+            self.add_failure(domain, self.state(domain))
+
+    def add_failure(self, domain, state):
+        state.failures += 1
+        if state.probing or state.failures >= self.failure_threshold:
+            state.open_until = time.monotonic() + self.cooldown
+            state.probing = False
+            logging.warning(f"Circuit open for {domain} after {state.failures} failures, pausing {self.cooldown}s")
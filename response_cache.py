@@ -0,0 +1,136 @@
+import logging
+import sqlite3
+import threading
+import time
+import zlib
+
+
+class ResponseCache:
+    """SQLite-backed store of fetched pages for conditional revalidation.
+
+    Bodies are kept zlib-compressed together with their ETag/Last-Modified
+    validators. Entries older than ttl seconds are dropped, and the least
+    recently used ones are evicted once the store grows past max_bytes;
+    the stored size is tracked in total_bytes rather than summed per store.
+    """
+
+    def __init__(self, path='http_cache.sqlite', ttl=30 * 86400, max_bytes=200 * 1024 * 1024):
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                url TEXT PRIMARY KEY,
+                body BLOB,
+                etag TEXT,
+                last_modified TEXT,
+                fetched_at REAL,
+                accessed_at REAL,
+                size INTEGER
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_accessed ON responses (accessed_at)")
+        self.conn.commit()
+        self.purge_expired()
+        self.total_bytes = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    def lookup(self, url):
+        """Return (body, etag, last_modified) for url, or None"""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT body, etag, last_modified, fetched_at FROM responses WHERE url = ?", (url,)
+            ).fetchone()
+        if not row:
+            return None
+        if time.time() - row[3] > self.ttl:
+            self.delete(url)
+            return None
+        return zlib.decompress(row[0]).decode('utf-8'), row[1], row[2]
+
+    def conditional_headers(self, url):
+        """If-None-Match/If-Modified-Since for url, read without touching the body"""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT etag, last_modified, fetched_at FROM responses WHERE url = ?", (url,)
+            ).fetchone()
+        if not row or time.time() - row[2] > self.ttl:
+            return {}
+        headers = {}
+        if row[0]:
+            headers['If-None-Match'] = row[0]
+        if row[1]:
+            headers['If-Modified-Since'] = row[1]
+        return headers
+
+    def revalidated(self, url):
+        """Body of a cached page after the server answered 304 Not Modified"""
+        entry = self.lookup(url)
+        if entry is None:
+            return None
+        self.hits += 1
+        with self.lock:
+            now = time.time()
+            self.conn.execute("UPDATE responses SET fetched_at = ?, accessed_at = ? WHERE url = ?",
+                              (now, now, url))
+            self.conn.commit()
+        return entry[0]
+
+    def store(self, url, response):
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+        self.misses += 1
+        body = zlib.compress(response.text.encode('utf-8'))
+        now = time.time()
+        with self.lock:
+            previous = self.conn.execute("SELECT size FROM responses WHERE url = ?", (url,)).fetchone()
+            self.conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (url, body, etag, last_modified, now, now, len(body))
+            )
+            self.conn.commit()
+            self.total_bytes += len(body) - (previous[0] if previous else 0)
+        self.evict()
+
+    def delete(self, url):
+        with self.lock:
+            previous = self.conn.execute("SELECT size FROM responses WHERE url = ?", (url,)).fetchone()
+            self.conn.execute("DELETE FROM responses WHERE url = ?", (url,))
+            self.conn.commit()
+            if previous:
+                self.total_bytes -= previous[0]
+
+    def purge_expired(self):
+        with self.lock:
+            cursor = self.conn.execute("DELETE FROM responses WHERE fetched_at < ?", (time.time() - self.ttl,))
+            self.conn.commit()
+        if cursor.rowcount:
+            logging.info(f"Response cache: purged {cursor.rowcount} expired pages")
+
+    def evict(self):
+        """Drop least recently used pages until the cache fits in max_bytes"""
+        with self.lock:
+            if self.total_bytes <= self.max_bytes:
+                return
+            target = self.max_bytes * 0.9
+            rows = self.conn.execute("SELECT url, size FROM responses ORDER BY accessed_at")
+            victims = []
+            for url, size in rows:
+                if self.total_bytes <= target:
+                    break
+                victims.append((url,))
+                self.total_bytes -= size
+            self.conn.executemany("DELETE FROM responses WHERE url = ?", victims)
+            self.conn.commit()
+        logging.info(f"Response cache: evicted {len(victims)} pages to stay under {self.max_bytes} bytes")
+
+    def stats(self):
+        """Revalidation hits and full-download misses since the counters were reset"""
+        return {'hits': self.hits, 'misses': self.misses, 'bytes': self.total_bytes}
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
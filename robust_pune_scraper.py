@@ -1,25 +1,127 @@
+import argparse
 import requests
-from fake_useragent import UserAgent
 import logging
 import json
 import os
 from datetime import datetime
 import re
-from bs4 import BeautifulSoup
 import time
 import random
+import threading
+from requests.adapters import HTTPAdapter
+from fetch_engine import ConcurrentFetcher
+from rate_scheduler import DomainRateScheduler, MAX_SOURCE_WAIT
+from url_frontier import UrlFrontier
+from response_cache import ResponseCache
+from page_archive import PageArchive
+from source_extractors import extract_page_details, source_for_url
+from parse_pipeline import ParsePipeline
+from output_sink import JsonlSink, load_jsonl_prefix
+from run_journal import RunJournal
+from delta_refresh import PageIndex, content_hash
+from dedup_index import DoctorDedupIndex
+from run_metrics import RunMetrics
+from user_agents import UserAgentPool
+from doctor_record import DoctorRecord, records_to_columns
+from template_scheduler import TemplateScheduler
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
+SUMMARY_FIELD = 'Summary of Pros and Cons (Summary of reviews), and recommendation'
+
+# (min rating, min years of experience, summary), first match wins
+SUMMARY_TIERS = [
+    (4.5, 15, "PROS: Highly experienced specialist with excellent patient ratings | CONS: May have busy schedule | RECOMMENDATION: Highly recommended for complex cases"),
+    (4.0, 0, "PROS: Good patient satisfaction and reasonable experience | CONS: Standard consultation fees | RECOMMENDATION: Recommended for consultation")
+]
+SUMMARY_DEFAULT = "PROS: Available for medical consultation | CONS: Limited patient feedback | RECOMMENDATION: Consider with other options"
+
 class RobustPuneScraper:
-    def __init__(self):
-        self.ua = UserAgent()
+    AREAS = ['aundh', 'baner', 'wakad', 'kothrud', 'viman-nagar', 'hadapsar', 'pune-city', 'camp', 'koregaon-park', 'deccan']
+    SPECIALTIES = ['cardiology', 'dermatology', 'neurology', 'orthopedic', 'pediatric',
+                   'gynecology', 'general-medicine', 'oncology', 'psychiatry', 'ent', 'ophthalmology', 'urology']
+    
+    def __init__(self, concurrency=1, per_host_concurrency=2, rate_limits=None, cache_path=None,
+                 parse_processes=0, stream_path='pune_doctors_stream.jsonl',
+                 journal_path='scrape_journal.jsonl', page_index_path=None, reuse_unchanged=False,
+                 dedupe=True, near_duplicates=False, template_history_path=None, city='pune',
+                 shared_limiter=None, archive_path=None):
+        # Bundled UA strings: no browser-data download on startup
+        self.ua = UserAgentPool()
         self.session = requests.Session()
+        self.dedupe = dedupe
+        self.near_duplicates = near_duplicates
+        self.stats_lock = threading.Lock()
+        self.fetcher = None
+        self.stream_path = stream_path
+        self.journal_path = journal_path
+        
+        self.city = city
+        
+        # Per-source token buckets replace the old fixed sleeps between requests;
+        # shared_limiter (e.g. the work queue) keeps them global across shard workers,
+        # and concurrent runs put URLs of a backing-off source back instead of sleeping
+        self.scheduler = DomainRateScheduler(rates=rate_limits, shared=shared_limiter,
+                                             max_wait=MAX_SOURCE_WAIT if int(concurrency) > 1 else None)
+        
+        # Optional on-disk cache so unchanged pages come back as cheap 304s
+        self.cache = ResponseCache(cache_path) if cache_path else None
+        
+        # Raw pages of every fetch, so parser changes can be replayed without the network
+        self.archive = PageArchive(archive_path) if archive_path else None
+        self.replay_until = None
+        
+        # Content hashes of parsed pages; delta runs reuse records of unchanged pages
+        self.page_index = PageIndex(page_index_path) if page_index_path else None
+        self.reuse_unchanged = reuse_unchanged
+        
+        # Per-template yield history; dead templates are skipped and re-probed now and then
+        self.templates = TemplateScheduler(template_history_path) if template_history_path else None
+        
+        # concurrency=1 keeps the original sequential fetch path
+        self.concurrency = max(1, int(concurrency))
+        self.frontier = None
+        if self.concurrency > 1:
+            adapter = HTTPAdapter(pool_connections=self.concurrency, pool_maxsize=self.concurrency)
+            self.session.mount('https://', adapter)
+            self.session.mount('http://', adapter)
+            if parse_processes:
+                # Threads only download; parsing runs on a process pool alongside them
+                fetcher = ConcurrentFetcher(self.get_html, max_workers=self.concurrency,
+                                            per_host_limit=per_host_concurrency, delay=0)
+                self.fetcher = ParsePipeline(fetcher, self.build_records, processes=parse_processes,
+                                             reuse=self.previous_page_records if self.page_index else None,
+                                             remember=self.remember_page if self.page_index else None,
+                                             carry=self.carried_page_records if self.page_index else None)
+            else:
+                self.fetcher = ConcurrentFetcher(self.safe_get_url, max_workers=self.concurrency,
+                                                 per_host_limit=per_host_concurrency, delay=0)
+        
+        # Per-run state last, once everything it resets exists
+        self.reset()
+    
+    def reset(self):
+        """Clear per-run results and metrics; session, caches and worker pools stay warm"""
         self.doctors = []
+        
+        # Duplicates are merged as they arrive; self.doctors holds the survivors
+        self.dedup = None
+        if self.dedupe:
+            self.dedup = DoctorDedupIndex(near_duplicates=self.near_duplicates)
+            self.doctors = self.dedup.records
         self.failed_urls = []
         self.success_count = 0
+        self.areas_scraped = []
         
-
+        # Fetch latency, status codes, bytes, parse time and per-template yield
+        self.metrics = RunMetrics()
+        if isinstance(self.fetcher, ParsePipeline):
+            self.fetcher.metrics = self.metrics
+        self.scheduler.slept = {}
+        if self.cache:
+            self.cache.hits = self.cache.misses = 0
+        if self.page_index:
+            self.page_index.unchanged = self.page_index.changed = self.page_index.carried = 0
     
     def smart_wait(self, min_time=5, max_time=15):
         wait_time = random.uniform(min_time, max_time)
@@ -44,101 +146,134 @@ class RobustPuneScraper:
     
     def safe_get_url(self, url, max_retries=2):
         for attempt in range(max_retries):
-            try:
-                headers = {
-                    'User-Agent': self.ua.random,
-                    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
-                    'Accept-Language': 'en-US,en;q=0.9',
-                    'Accept-Encoding': 'gzip, deflate, br',
-                    'Connection': 'keep-alive'
-                }
-                
-                response = self.session.get(url, headers=headers, timeout=15)
-                if response.status_code == 200:
-                    doctors = self.parse_response_html(response.text)
-                    if doctors:
-                        logging.info(f"Extracted {len(doctors)} doctors from {url}")
-                        return doctors
-                
-            except Exception as e:
-                logging.warning(f"URL failed: {url} - {e}")
-                time.sleep(1)
+            if attempt:
+                self.metrics.record_retry()
+            html = self.fetch_html(url)
+            if html is not None:
+                digest = content_hash(html) if self.page_index else None
+                doctors = self.previous_page_records(url, digest)
+                if doctors is None:
+                    doctors = self.parse_response_html(html, url)
+                    self.remember_page(url, digest, doctors)
+                if doctors:
+                    logging.info(f"Extracted {len(doctors)} doctors from {url}")
+                    return doctors
         
+        if html is None:
+            self.failed_urls.append(url)
+            return self.carried_page_records(url) or []
         return []
     
-
+    def previous_page_records(self, url, digest):
+        """Last run's records for url when reusing unchanged pages, else None"""
+        if not (self.page_index and self.reuse_unchanged):
+            return None
+        records = self.page_index.lookup(url, digest)
+        return None if records is None else [DoctorRecord.from_mapping(r) for r in records]
     
-
+    def carried_page_records(self, url):
+        """Last run's records for a page that failed to fetch in a delta run.
+        
+        Without them a 5xx or an open circuit would report the page's doctors
+        as removed, and as added again once the source recovers.
+        """
+        if not (self.page_index and self.reuse_unchanged):
+            return None
+        records = self.page_index.previous(url)
+        if records is None:
+            return None
+        logging.info(f"Carrying {len(records)} previous records forward for failed {url}")
+        return [DoctorRecord.from_mapping(r) for r in records]
     
-
+    def remember_page(self, url, digest, doctors):
+        if self.page_index:
+            self.page_index.store(url, digest, doctors)
     
-    def parse_response_html(self, html):
+    def get_html(self, url, max_retries=2):
+        """Fetch-only counterpart of safe_get_url for the process-pool pipeline"""
+        for attempt in range(max_retries):
+            if attempt:
+                self.metrics.record_retry()
+            html = self.fetch_html(url)
+            if html is not None:
+                return html
+        self.failed_urls.append(url)
+        return None
+    
+    def fetch_html(self, url):
+        """One polite request for url; returns the page HTML or None"""
+        if self.replay_until is not None:
+            return self.archived_html(url)
+        
+        source = self.extract_source_from_url(url)
+        if not self.scheduler.acquire(source):
+            logging.info(f"Skipping {url} - {source} circuit is open")
+            return None
+        
+        start = time.perf_counter()
         try:
-            soup = BeautifulSoup(html, 'html.parser')
-            doctors = []
+            headers = {
+                'User-Agent': self.ua.random,
+                'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+                'Accept-Language': 'en-US,en;q=0.9',
+                'Accept-Encoding': 'gzip, deflate, br',
+                'Connection': 'keep-alive'
+            }
+            if self.cache:
+                headers.update(self.cache.conditional_headers(url))
             
-            # Maximum selectors for extraction
-            card_selectors = [
-                '.doctor-card', '.listing-item', '.store-details', '.jcn', '.resultbox',
-                '.doc-card', '.business-card', '.profile-card', '.search-result',
-                '.doctor-profile', '.listing-card', '.provider-card', '.clinic-card',
-                '.listing', '.item', '.result', '.entry', '.box', '.container',
-                'article', 'section', '.row', '.col', 'li', '.list-item', 'div',
-                '[class*="doctor"]', '[class*="card"]', '[class*="profile"]', '[class*="listing"]'
-            ]
+            response = self.session.get(url, headers=headers, timeout=15)
+            self.metrics.record_fetch(source, time.perf_counter() - start, response.status_code,
+                                      len(response.content))
+            self.scheduler.record_response(source, response.status_code,
+                                           response.headers.get('Retry-After'))
             
-            cards = []
-            for selector in card_selectors:
-                cards.extend(soup.select(selector))
-            
-            # Use Groq AI to extract better data
-            for card in cards:
-                try:
-                    # Extract all text and find doctor names
-                    text = card.get_text(strip=True)
-                    lines = text.split('\n')
-                    
-                    for line in lines:
-                        line = line.strip()
-                        if ('dr' in line.lower() or 'doctor' in line.lower()) and len(line) > 5 and len(line) < 80:
-                            # Extract additional info
-                            clinic = ''
-                            address = ''
-                            phone = ''
-                            
-                            # Look for clinic/hospital
-                            for l in lines:
-                                if any(word in l.lower() for word in ['clinic', 'hospital', 'center', 'medical']):
-                                    clinic = l.strip()[:50]
-                                    break
-                            
-                            # Look for address and ensure pincode
-                            for l in lines:
-                                if any(word in l.lower() for word in ['pune', 'road', 'street', 'area']):
-                                    address = l.strip()[:100]
-                                    # Add pincode if missing
-                                    if not re.search(r'\d{6}', address):
-                                        address += f" - {random.choice(['411001', '411007', '411045', '411057'])}"
-                                    break
-                            
-                            # Look for phone
-                            phone_match = re.search(r'\d{10}', text)
-                            if phone_match:
-                                phone = phone_match.group()
-                            
-                            doctors.append(self.create_doctor_record(line, clinic, address, phone))
-                            break
-                        
-                except Exception as e:
-                    logging.debug(f"HTML card parsing error: {e}")
-                    continue
-            
-            return doctors  # No limit - extract all found
+            html = None
+            if response.status_code == 304 and self.cache:
+                html = self.cache.revalidated(url)
+            elif response.status_code == 200:
+                if self.cache:
+                    self.cache.store(url, response)
+                html = response.text
+            if html is not None:
+                if self.archive:
+                    self.archive.append(url, html, response.status_code)
+                with self.stats_lock:
+                    self.success_count += 1
+                return html
             
+        except Exception as e:
+            logging.warning(f"URL failed: {url} - {e}")
+            self.metrics.record_fetch(source, time.perf_counter() - start, 'error')
+            self.scheduler.record_failure(source)
+        
+        return None
+    
+    def archived_html(self, url):
+        """Replay counterpart of fetch_html: the page as archived by replay_until"""
+        html = self.archive.latest(url, until=self.replay_until)
+        if html is not None:
+            with self.stats_lock:
+                self.success_count += 1
+        return html
+    
+    def parse_response_html(self, html, url=None):
+        try:
+            start = time.perf_counter()
+            details = extract_page_details(html, url)
+            self.metrics.record_parse(time.perf_counter() - start)
+            return self.build_records(details)
         except Exception as e:
             logging.error(f"HTML parsing error: {e}")
             return []
     
+    def build_records(self, details):
+        doctors = []
+        for detail in details:
+            # Structured-data tuples also carry rating, experience and specialty
+            doctors.append(self.create_doctor_record(*detail))
+        return doctors  # No limit - extract all found
+    
     def extract_with_groq(self, text):
         """Extract doctor data from text without AI"""
         try:
@@ -162,9 +297,13 @@ class RobustPuneScraper:
             if not clean_name.lower().startswith('dr'):
                 clean_name = f"Dr. {clean_name}"
             
+            # Columns filled with generated stand-ins; dedup must not key on them
+            filled = []
+            
             # Generate phone if missing
             if not phone or len(phone) < 10:
                 phone = f"+91 {random.randint(9000000000, 9999999999)}"
+                filled.append('Contact number')
             else:
                 # Clean phone number
                 import re
@@ -173,9 +312,14 @@ class RobustPuneScraper:
                     phone = f"+91 {''.join(digits[-10:])}"
                 else:
                     phone = f"+91 {random.randint(9000000000, 9999999999)}"
+                    filled.append('Contact number')
+            if not clinic:
+                filled.append('Clinic/Hospital')
+            if not address:
+                filled.append('Complete address')
             
             # Process rating
-            rating_val = round(random.uniform(3.5, 4.8), 1)
+            rating_val = None
             if rating:
                 import re
                 ratings = re.findall(r'\d+\.?\d*', rating)
@@ -184,9 +328,12 @@ class RobustPuneScraper:
                         rating_val = min(float(ratings[0]), 5.0)
                     except:
                         pass
+            if rating_val is None:
+                rating_val = round(random.uniform(3.5, 4.8), 1)
+                filled.append('Ratings')
             
             # Process experience
-            exp_years = random.randint(5, 25)
+            exp_years = None
             if experience:
                 import re
                 years = re.findall(r'\d+', experience)
@@ -195,6 +342,9 @@ class RobustPuneScraper:
                         exp_years = min(int(years[0]), 40)
                     except:
                         pass
+            if exp_years is None:
+                exp_years = random.randint(5, 25)
+                filled.append('Years of experience')
             
             # Generate legitimate email
             name_parts = clean_name.lower().replace('dr.', '').replace('dr', '').strip().split()
@@ -208,19 +358,21 @@ class RobustPuneScraper:
             if not specialty:
                 specialty = random.choice(['Cardiology', 'Dermatology', 'Neurology', 'General Medicine', 'Orthopedics'])
             
-            return {
-                'Complete address': address or self.generate_address(),
-                'Doctors name': clean_name,
-                'Specialty': specialty.title(),
-                'Clinic/Hospital': clinic or f"{clean_name} Clinic",
-                'Years of experience': exp_years,
-                'Contact number': phone,
-                'Ratings': rating_val,
-                'Contact email': email,
-                'Reviews': random.randint(15, 250),
-                'Summary of Pros and Cons (Summary of reviews), and recommendation': self.generate_summary(rating_val, exp_years),
-                'Source': ''
-            }
+            # Compact slots record; it maps back to the column names above on export
+            return DoctorRecord(
+                address=address or self.generate_address(),
+                name=clean_name,
+                specialty=specialty.title(),
+                clinic=clinic or f"{clean_name} Clinic",
+                experience=exp_years,
+                phone=phone,
+                rating=rating_val,
+                email=email,
+                reviews=random.randint(15, 250),
+                summary=self.generate_summary(rating_val, exp_years),
+                source='',
+                filled=tuple(filled)
+            )
             
         except Exception as e:
             logging.error(f"Doctor record creation error: {e}")
@@ -237,12 +389,19 @@ class RobustPuneScraper:
         return f"{street_num}, {area}, Pune, Maharashtra - {areas_pincodes[area]}"
     
     def generate_summary(self, rating, experience):
-        if rating >= 4.5 and experience >= 15:
-            return "PROS: Highly experienced specialist with excellent patient ratings | CONS: May have busy schedule | RECOMMENDATION: Highly recommended for complex cases"
-        elif rating >= 4.0:
-            return "PROS: Good patient satisfaction and reasonable experience | CONS: Standard consultation fees | RECOMMENDATION: Recommended for consultation"
-        else:
-            return "PROS: Available for medical consultation | CONS: Limited patient feedback | RECOMMENDATION: Consider with other options"
+        for min_rating, min_experience, summary in SUMMARY_TIERS:
+            if rating >= min_rating and experience >= min_experience:
+                return summary
+        return SUMMARY_DEFAULT
+    
+    def generate_summary_frame(self, df):
+        """Columnar generate_summary: fills the summary column of a whole DataFrame at once.
+        
+        Missing or unparseable ratings/experience score lowest. Use it to
+        rescore a loaded dataset, e.g. after ratings were edited.
+        """
+        from rule_scoring import score_frame
+        return score_frame(df, SUMMARY_FIELD, SUMMARY_TIERS, SUMMARY_DEFAULT)
     
     def get_smart_urls(self, area, specialty):
         """Generate URLs directly without AI to avoid rate limits"""
@@ -251,115 +410,295 @@ class RobustPuneScraper:
     def get_fallback_urls(self, area, specialty):
         """Maximum URLs for comprehensive scraping"""
         return [
-            f"https://www.practo.com/pune/{area}/{specialty}",
-            f"https://www.practo.com/pune/{specialty}",
-            f"https://www.practo.com/pune/{area}",
-            f"https://www.justdial.com/pune/{specialty}-doctors-in-{area}",
-            f"https://www.justdial.com/pune/{area}-{specialty}",
-            f"https://www.justdial.com/pune/{specialty}-doctors",
-            f"https://www.1mg.com/doctors/pune/{area}",
-            f"https://www.1mg.com/doctors/pune/{specialty}",
-            f"https://www.lybrate.com/pune/{specialty}-doctors",
-            f"https://www.lybrate.com/pune/{area}/{specialty}-doctors",
-            f"https://www.apollohospitals.com/doctors/pune/{area}",
-            f"https://www.apollohospitals.com/doctors/pune/{specialty}"
+            f"https://www.practo.com/{self.city}/{area}/{specialty}",
+            f"https://www.practo.com/{self.city}/{specialty}",
+            f"https://www.practo.com/{self.city}/{area}",
+            f"https://www.justdial.com/{self.city}/{specialty}-doctors-in-{area}",
+            f"https://www.justdial.com/{self.city}/{area}-{specialty}",
+            f"https://www.justdial.com/{self.city}/{specialty}-doctors",
+            f"https://www.1mg.com/doctors/{self.city}/{area}",
+            f"https://www.1mg.com/doctors/{self.city}/{specialty}",
+            f"https://www.lybrate.com/{self.city}/{specialty}-doctors",
+            f"https://www.lybrate.com/{self.city}/{area}/{specialty}-doctors",
+            f"https://www.apollohospitals.com/doctors/{self.city}/{area}",
+            f"https://www.apollohospitals.com/doctors/{self.city}/{specialty}"
         ]
     
+    def tag_page_doctors(self, page_doctors, url, area, specialty):
+        for doctor in page_doctors:
+            doctor['Source'] = self.extract_source_from_url(url)
+            doctor['Specialty'] = specialty.replace('-', ' ').title()
+            # Generated stand-in addresses are Pune ones; give them this area and city instead
+            generated = 'Complete address' in (getattr(doctor, 'filled', None) or ())
+            if generated or not doctor['Complete address'] or len(doctor['Complete address']) < 10:
+                doctor['Complete address'] = self.fix_address_for_area(area)
+    
+    def get_variation_url(self, url, specialty):
+        return url.replace(specialty, specialty + '-specialist')
+    
+    def get_url_templates(self):
+        """get_smart_urls with placeholders, index-aligned with its URLs for per-template metrics"""
+        return self.get_smart_urls('{area}', '{specialty}')
+    
+    def get_variation_template(self, template):
+        return self.get_variation_url(template, '{specialty}')
+    
+    def get_scheduled_urls(self, area, specialty):
+        """(url, template) pairs to fetch for a combination, dead templates left out"""
+        pairs = dict(zip(self.get_url_templates(), self.get_smart_urls(area, specialty)))
+        if not self.templates:
+            return [(url, template) for template, url in pairs.items()]
+        return [(pairs[template], template) for template in self.templates.select(list(pairs), area, specialty)]
+    
+    def has_variation(self, template):
+        """Area-only templates have no -specialist variation: it would be the base URL again"""
+        return self.get_variation_template(template) != template
+    
+    def variation_allowed(self, template, area, specialty):
+        if not self.has_variation(template):
+            return False
+        return not self.templates or self.templates.allowed(self.get_variation_template(template), area, specialty)
+    
+    def get_combination_urls(self, area, specialty):
+        """Every URL a combination may request, including -specialist variations"""
+        scheduled = self.get_scheduled_urls(area, specialty)
+        return [url for url, _ in scheduled] + [
+            self.get_variation_url(url, specialty) for url, template in scheduled
+            if self.variation_allowed(template, area, specialty)
+        ]
+    
+    def fetch_page(self, url):
+        if self.frontier:
+            return self.frontier.get(url, self.safe_get_url)
+        return self.safe_get_url(url)
+    
+    def fetch_pages(self, urls):
+        urls = list(urls)
+        if self.frontier:
+            return self.frontier.get_many(urls, self.fetcher.fetch_all)
+        return self.fetcher.fetch_all(urls)
+    
     def scrape_area_specialty(self, area, specialty):
         """Scrape single area-specialty combination"""
+        if self.fetcher:
+            return self.scrape_area_specialty_concurrent(area, specialty)
+        
         doctors = []
-        urls = self.get_smart_urls(area, specialty)
         
-        for url in urls:
+        for url, template in self.get_scheduled_urls(area, specialty):
             try:
                 logging.info(f"Scraping: {url}")
-                page_doctors = self.safe_get_url(url)
-                
-                for doctor in page_doctors:
-                    doctor['Source'] = self.extract_source_from_url(url)
-                    doctor['Specialty'] = specialty.replace('-', ' ').title()
-                    if not doctor['Complete address'] or len(doctor['Complete address']) < 10:
-                        doctor['Complete address'] = self.fix_address_for_area(area)
+                page_doctors = self.fetch_page(url)
+                self.tag_page_doctors(page_doctors, url, area, specialty)
+                self.metrics.record_template(template, len(page_doctors))
                 
                 doctors.extend(page_doctors)
                 
                 # If we got good results, try variations
-                if len(page_doctors) > 5:
-                    variation_url = url.replace(specialty, specialty + '-specialist')
+                if len(page_doctors) > 5 and self.variation_allowed(template, area, specialty):
+                    variation_url = self.get_variation_url(url, specialty)
                     try:
-                        var_doctors = self.safe_get_url(variation_url)
+                        var_doctors = self.fetch_page(variation_url)
+                        self.metrics.record_template(self.get_variation_template(template), len(var_doctors))
                         doctors.extend(var_doctors[:10])
                     except:
                         pass
                 
-                time.sleep(0.5)  # Minimal delay for maximum speed
-                
             except Exception as e:
                 logging.error(f"URL {url} failed: {e}")
                 continue
         
         return doctors
     
+    def scrape_area_specialty_concurrent(self, area, specialty):
+        """Same records as scrape_area_specialty, fetched through the thread pool"""
+        scheduled = self.get_scheduled_urls(area, specialty)
+        logging.info(f"Scraping {len(scheduled)} URLs concurrently for {area}/{specialty}")
+        pages = self.fetch_pages(url for url, _ in scheduled)
+        
+        # Variations depend on the first round, so they go out as a second batch
+        variations = {}
+        for url, template in scheduled:
+            if len(pages[url]) > 5 and self.variation_allowed(template, area, specialty):
+                variations[url] = self.get_variation_url(url, specialty)
+        var_pages = self.fetch_pages(variations.values())
+        
+        doctors = []
+        for url, template in scheduled:
+            page_doctors = pages[url]
+            self.tag_page_doctors(page_doctors, url, area, specialty)
+            self.metrics.record_template(template, len(page_doctors))
+            doctors.extend(page_doctors)
+            if url in variations:
+                var_doctors = var_pages[variations[url]]
+                self.metrics.record_template(self.get_variation_template(template), len(var_doctors))
+                doctors.extend(var_doctors[:10])
+        
+        return doctors
+    
     def extract_source_from_url(self, url):
         """Extract source name from URL"""
-        if 'practo' in url: return 'Practo'
-        elif 'justdial' in url: return 'JustDial'
-        elif '1mg' in url: return '1mg'
-        elif 'lybrate' in url: return 'Lybrate'
-        elif 'apollo' in url: return 'Apollo'
-        else: return 'Unknown'
-    
-    def scrape_comprehensive(self):
-        areas = ['aundh', 'baner', 'wakad', 'kothrud', 'viman-nagar', 'hadapsar', 'pune-city', 'camp', 'koregaon-park', 'deccan']
-        specialties = ['cardiology', 'dermatology', 'neurology', 'orthopedic', 'pediatric', 
-                      'gynecology', 'general-medicine', 'oncology', 'psychiatry', 'ent', 'ophthalmology', 'urology']
-        
-        # Sequential scraping to avoid hanging
-        total_combinations = len(areas) * len(specialties)
-        current = 0
-        
-        for area in areas:
-            for specialty in specialties:
-                current += 1
-                logging.info(f"Progress: {current}/{total_combinations} - {area}/{specialty}")
-                
-                try:
-                    doctors = self.scrape_area_specialty(area, specialty)
-                    self.doctors.extend(doctors)
-                    logging.info(f"Added {len(doctors)} doctors. Total: {len(self.doctors)}")
+        return source_for_url(url)
+    
+    def scrape_comprehensive(self, resume=False):
+        for _ in self.iter_doctors(resume=resume, retain=True):
+            pass
+        return self.finalize_data()
+    
+    def iter_doctors(self, resume=False, retain=False):
+        """Yield deduplicated records as each area/specialty combination finishes.
+        
+        Records merged within a combination (the same doctor on several
+        sources) are merged before they are yielded. Unless retain is set,
+        yielded records are dropped from self.doctors straight away and
+        only their dedup keys are kept, so memory no longer grows with the
+        full records; later duplicates of them are counted but not merged.
+        """
+        areas = self.AREAS
+        specialties = self.SPECIALTIES
+        
+        # The journal lets a crashed run pick up where it stopped
+        journal = RunJournal(self.journal_path, resume=resume)
+        resumed = []
+        if journal.resumed and os.path.exists(self.stream_path):
+            resumed = self.add_doctors(load_jsonl_prefix(self.stream_path, journal.record_count))
+        
+        if self.templates:
+            templates = self.get_url_templates()
+            variations = [self.get_variation_template(t) for t in templates if self.has_variation(t)]
+            self.templates.begin_run(templates + variations,
+                                     [(a, s) for a in areas for s in specialties if not journal.is_done(a, s)])
+        
+        # Shared URLs are fetched once and fanned out to every combination
+        self.frontier = UrlFrontier(areas, specialties, self.get_combination_urls,
+                                    skip=journal.completed, restored=journal.url_records,
+                                    on_fetched=lambda fetched: journal.record_urls(fetched, set(self.failed_urls)))
+        
+        # Each combination's records are appended here; Excel is written once at the end
+        sink = JsonlSink(self.stream_path, append=journal.resumed)
+        
+        try:
+            yield from resumed
+            if not retain:
+                self.release_doctors()
+            
+            # Sequential scraping to avoid hanging
+            total_combinations = len(areas) * len(specialties)
+            current = 0
+            
+            for area in areas:
+                for specialty in specialties:
+                    current += 1
+                    if journal.is_done(area, specialty):
+                        continue
+                    logging.info(f"Progress: {current}/{total_combinations} - {area}/{specialty}")
                     
-                    # Save frequently
-                    if current % 3 == 0:
-                        self.save_results(self.doctors, 'pune_doctors_1000plus.xlsx')
+                    new_doctors = []
+                    try:
+                        doctors = self.scrape_area_specialty(area, specialty)
                         
-                except Exception as e:
-                    logging.error(f"Error {area}/{specialty}: {e}")
-                    # Always continue, never stop
-                    continue
-        
-        return self.finalize_data()
+                        # Checkpoint only the new records, as scraped
+                        written = sink.write(doctors)
+                        new_doctors = self.add_doctors(doctors)
+                        logging.info(f"Added {len(doctors)} doctors. Total: {len(self.doctors)}")
+                        journal.complete(area, specialty, written)
+                            
+                    except Exception as e:
+                        logging.error(f"Error {area}/{specialty}: {e}")
+                        # Always continue, never stop
+                        continue
+                    finally:
+                        self.frontier.release(area, specialty)
+                    
+                    yield from new_doctors
+                    if not retain:
+                        self.release_doctors()
+            
+            # Areas with at least one finished combination, including resumed ones
+            self.areas_scraped = [area for area in areas
+                                  if any(journal.is_done(area, specialty) for specialty in specialties)]
+            journal.finish()
+            if self.templates:
+                self.templates.end_run(self.metrics.templates, self.extract_source_from_url)
+            logging.info(f"Fetched {self.frontier.fetched} unique URLs")
+        finally:
+            sink.close()
+            journal.close()
+            self.frontier = None
     
-
+    def replay_comprehensive(self, until=None):
+        """Rebuild the dataset from archived pages with the current parsers, without the network.
+        
+        Runs the same combination grid as scrape_comprehensive, so page
+        tagging, variations and dedup match a live run; with concurrency
+        and parse_processes set, pages are parsed on the process pool.
+        Each URL is read as last fetched at or before until (default: now).
+        """
+        if not self.archive:
+            raise ValueError("replay needs an archive_path")
+        saved = (self.templates, self.reuse_unchanged, self.stream_path, self.journal_path)
+        # Replays neither skip dead templates nor feed their yield history,
+        # and checkpoint next to (not over) the live run's journal
+        self.templates = None
+        self.reuse_unchanged = False
+        self.stream_path = f"{os.path.splitext(self.stream_path)[0]}_replay.jsonl"
+        self.journal_path = f"{os.path.splitext(self.journal_path)[0]}_replay.jsonl"
+        self.replay_until = until or time.time()
+        try:
+            logging.info(f"Replaying archived pages from {self.archive.directory}")
+            return self.scrape_comprehensive()
+        finally:
+            self.templates, self.reuse_unchanged, self.stream_path, self.journal_path = saved
+            self.replay_until = None
     
     def fix_address_for_area(self, area):
+        """Placeholder address in area of this scraper's city; pincodes are only known for Pune"""
+        street_num = random.randint(1, 999)
+        area_clean = area.replace('-', ' ').title()
+        if self.city != 'pune':
+            return f"{street_num}, {area_clean}, {self.city.replace('-', ' ').title()}"
         pincodes = {
             'aundh': '411007', 'baner': '411045', 'wakad': '411057',
             'kothrud': '411029', 'viman-nagar': '411014', 'hadapsar': '411028',
             'pune-city': '411001', 'camp': '411001', 'koregaon-park': '411001', 'deccan': '411004'
         }
-        street_num = random.randint(1, 999)
-        area_clean = area.replace('-', ' ').title()
         return f"{street_num}, {area_clean}, Pune, Maharashtra - {pincodes.get(area, '411001')}"
     
+    def add_doctors(self, doctors):
+        """Add records; returns the ones that are new survivors rather than merged duplicates"""
+        # Records reloaded from JSONL on resume arrive as plain dicts
+        doctors = [DoctorRecord.from_mapping(d) for d in doctors if d]
+        if not self.dedup:
+            self.doctors.extend(doctors)
+            return doctors
+        return [doctor for doctor in doctors if self.dedup.add(doctor) is doctor]
+    
+    def release_doctors(self):
+        """Forget records already handed to a streaming consumer"""
+        if self.dedup:
+            self.dedup.release()
+        else:
+            self.doctors.clear()
+    
     def finalize_data(self):
-        # Keep all data including duplicates
+        if self.dedup:
+            logging.info(f"Merged {self.dedup.merged} duplicate records")
         logging.info(f"Total scraped: {len(self.doctors)}")
         return self.doctors
     
+    def metrics_summary(self):
+        """Run metrics plus fetch outcomes, as written to scraping_metadata.json"""
+        summary = self.metrics.to_dict(sleep_seconds=dict(self.scheduler.slept))
+        summary['success_count'] = self.success_count
+        summary['failed_urls'] = list(self.failed_urls)
+        if self.cache:
+            summary['cache'] = self.cache.stats()
+        return summary
+    
     def save_results(self, doctors, filename='robust_pune_doctors.xlsx'):
         try:
             import pandas as pd
-            df = pd.DataFrame(doctors)
+            df = pd.DataFrame(records_to_columns(doctors))
             df.to_excel(filename, index=False)
             logging.info(f"Saved {len(doctors)} doctors to {filename}")
         except ImportError:
@@ -367,60 +706,68 @@ class RobustPuneScraper:
         except Exception as e:
             logging.error(f"Excel save failed: {e}")
         
-        # Save metadata
+        self.save_metadata(len(doctors))
+        logging.info(f"Saved {len(doctors)} doctors to {filename}")
+    
+    def save_metadata(self, total_doctors):
         metadata = {
-            'total_doctors': len(doctors),
+            'total_doctors': total_doctors,
             'scraping_date': datetime.now().isoformat(),
             'success_count': self.success_count,
             'failed_urls': len(self.failed_urls),
-            'areas': ['Aundh', 'Baner', 'Wakad']
+            'areas': [area.replace('-', ' ').title() for area in self.areas_scraped],
+            'metrics': self.metrics_summary()
         }
         
         with open('scraping_metadata.json', 'w') as f:
             json.dump(metadata, f, indent=2)
-        
-        logging.info(f"Saved {len(doctors)} doctors to {filename}")
+    
+    def export_bundle(self, doctors, base_path, fmt='arrow'):
+        """Columnar copy of the results (arrow or parquet) plus precomputed rollups"""
+        try:
+            from columnar_export import write_bundle
+            return write_bundle(doctors, base_path, fmt)
+        except ImportError:
+            logging.error("pyarrow required for columnar export: pip install pyarrow")
+        except Exception as e:
+            logging.error(f"Columnar export failed: {e}")
+        return None, None
     
     def close(self):
         try:
             self.session.close()
+            if isinstance(self.fetcher, ParsePipeline):
+                self.fetcher.close()
+            if self.cache:
+                self.cache.close()
+            if self.page_index:
+                self.page_index.close()
+            if self.archive:
+                self.archive.close()
         except:
             pass
 
 def main():
+    parser = argparse.ArgumentParser(description='Scrape Pune doctor listings')
+    parser.add_argument('--resume', action='store_true', help='continue an interrupted run from its journal')
+    args = parser.parse_args()
+    
     scraper = RobustPuneScraper()
     
     try:
         logging.info("🚀 Starting AI-powered Pune scraping for 1000+ doctors...")
-        doctors = scraper.scrape_comprehensive()
+        doctors = scraper.scrape_comprehensive(resume=args.resume)
         scraper.save_results(doctors, 'pune_doctors_1000plus.xlsx')
         
         print(f"✅ Successfully scraped {len(doctors)} unique doctors")
         
-        # Enhanced statistics
-        area_stats = {}
-        source_stats = {}
-        specialty_stats = {}
-        
-        for doctor in doctors:
-            # Area stats
-            address = doctor.get('Complete address', '')
-            for area in ['Aundh', 'Baner', 'Wakad', 'Kothrud', 'Viman Nagar', 'Hadapsar']:
-                if area in address:
-                    area_stats[area] = area_stats.get(area, 0) + 1
-                    break
-            
-            # Source stats
-            source = doctor.get('Source', 'Unknown')
-            source_stats[source] = source_stats.get(source, 0) + 1
-            
-            # Specialty stats
-            specialty = doctor.get('Specialty', 'Unknown')
-            specialty_stats[specialty] = specialty_stats.get(specialty, 0) + 1
+        # Enhanced statistics, counted from the same indexes the query service uses
+        from query_service import DoctorIndex
+        stats = DoctorIndex(doctors).stats()
         
-        print(f"\n📍 Area Distribution: {dict(area_stats)}")
-        print(f"📊 Source Distribution: {dict(source_stats)}")
-        print(f"🏥 Specialty Distribution: {dict(specialty_stats)}")
+        print(f"\n📍 Area Distribution: {stats['area']}")
+        print(f"📊 Source Distribution: {stats['source']}")
+        print(f"🏥 Specialty Distribution: {stats['specialty']}")
         print(f"🎯 Target Achieved: {len(doctors) >= 1000}")
         
     except Exception as e:
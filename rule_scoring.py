@@ -0,0 +1,25 @@
+import numpy as np
+import pandas as pd
+
+
+def coerce_column(df, column, default):
+    """Column as floats with missing or unparseable values replaced by default"""
+    if column not in df:
+        return pd.Series(default, index=df.index, dtype=float)
+    return pd.to_numeric(df[column], errors='coerce').fillna(default)
+
+
+def select_tiers(ratings, experience, tiers, default):
+    """Vectorised first-match of (min_rating, min_experience, value) tiers"""
+    conditions = [(ratings >= min_rating) & (experience >= min_experience)
+                  for min_rating, min_experience, _ in tiers]
+    choices = [value for _, _, value in tiers]
+    return np.select(conditions, choices, default=default).astype(object)
+
+
+def score_frame(df, column, tiers, default, rating_default=0.0, experience_default=0):
+    """Write the tier text for every row of df into column in one assignment"""
+    ratings = coerce_column(df, 'Ratings', rating_default)
+    experience = coerce_column(df, 'Years of experience', experience_default)
+    df[column] = select_tiers(ratings.to_numpy(), experience.to_numpy(), tiers, default)
+    return df
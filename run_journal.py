@@ -0,0 +1,90 @@
+import json
+import logging
+import os
+from datetime import datetime
+
+from doctor_record import record_state
+
+
+class RunJournal:
+    """Durable JSONL log of a scrape run: fetched URLs and finished combinations.
+
+    Each finished (area, specialty) pair is written with the number of
+    records it streamed, so a resumed run knows which pairs to skip and how
+    many streamed records are complete. Each fetched URL is written with
+    its parsed records, so a resumed run restores pages that unfinished
+    combinations still share instead of fetching them again. A journal
+    whose last run finished is ignored on resume and the next run starts
+    fresh.
+    """
+
+    def __init__(self, path, resume=False):
+        self.path = path
+        self.completed = set()
+        self.url_records = {}
+        self.record_count = 0
+        self.resumed = False
+        self.finished = False
+
+        if resume and os.path.exists(path):
+            self.load()
+            if self.finished:
+                logging.info(f"Previous run in {path} finished - starting a fresh run")
+                self.completed.clear()
+                self.url_records.clear()
+                self.record_count = 0
+            else:
+                self.resumed = True
+                logging.info(f"Resuming run: {len(self.completed)} combinations, "
+                             f"{len(self.url_records)} URLs and {self.record_count} records already done")
+
+        self.file = open(path, 'a' if self.resumed else 'w', encoding='utf-8')
+        if not self.resumed:
+            self.append({'event': 'start'})
+
+    def load(self):
+        self.finished = False
+        with open(self.path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # torn write from a crash
+                event = entry.get('event')
+                if event == 'url' and isinstance(entry.get('records'), list):
+                    self.url_records[entry['url']] = entry['records']
+                elif event == 'combination':
+                    self.completed.add((entry['area'], entry['specialty']))
+                    self.record_count += entry['records']
+                elif event == 'finished':
+                    self.finished = True
+
+    def append(self, entry, sync=False):
+        entry['time'] = datetime.now().isoformat()
+        self.file.write(json.dumps(entry) + '\n')
+        self.file.flush()
+        if sync:
+            os.fsync(self.file.fileno())
+
+    def is_done(self, area, specialty):
+        return (area, specialty) in self.completed
+
+    def record_urls(self, results, failed=()):
+        """Journal each fetched URL's parsed records; failed fetches are left out so a resume retries them"""
+        for url, records in results.items():
+            if url in failed:
+                continue
+            self.url_records[url] = records
+            self.append({'event': 'url', 'url': url, 'records': [record_state(r) for r in records]})
+
+    def complete(self, area, specialty, records):
+        self.completed.add((area, specialty))
+        self.record_count += records
+        self.append({'event': 'combination', 'area': area, 'specialty': specialty, 'records': records}, sync=True)
+
+    def finish(self):
+        self.append({'event': 'finished'}, sync=True)
+
+    def close(self):
+        if not self.file.closed:
+            self.file.close()
@@ -0,0 +1,69 @@
+import threading
+
+# Upper bounds (seconds) of the fetch latency histogram buckets
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1, 2, 5, 10, 15)
+
+
+class RunMetrics:
+    """Thread-safe counters for where a scrape run spends its time"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latency = {}
+        self.status_codes = {}
+        self.bytes_downloaded = 0
+        self.fetch_seconds = 0.0
+        self.pages_parsed = 0
+        self.parse_seconds = 0.0
+        self.slowest_parse = 0.0
+        self.templates = {}
+        self.retries = 0
+
+    def record_fetch(self, source, seconds, status, nbytes=0):
+        with self.lock:
+            buckets = self.latency.setdefault(source, [0] * (len(LATENCY_BUCKETS) + 1))
+            index = len(LATENCY_BUCKETS)
+            for i, bound in enumerate(LATENCY_BUCKETS):
+                if seconds <= bound:
+                    index = i
+                    break
+            buckets[index] += 1
+            key = str(status)
+            self.status_codes[key] = self.status_codes.get(key, 0) + 1
+            self.bytes_downloaded += nbytes
+            self.fetch_seconds += seconds
+
+    def record_parse(self, seconds):
+        with self.lock:
+            self.pages_parsed += 1
+            self.parse_seconds += seconds
+            self.slowest_parse = max(self.slowest_parse, seconds)
+
+    def record_template(self, template, records):
+        with self.lock:
+            stats = self.templates.setdefault(template, {'pages': 0, 'records': 0})
+            stats['pages'] += 1
+            stats['records'] += records
+
+    def record_retry(self):
+        with self.lock:
+            self.retries += 1
+
+    def to_dict(self, sleep_seconds=None):
+        labels = [f"<={bound}s" for bound in LATENCY_BUCKETS] + [f">{LATENCY_BUCKETS[-1]}s"]
+        with self.lock:
+            return {
+                'fetch_latency_histogram': {
+                    source: dict(zip(labels, counts)) for source, counts in self.latency.items()
+                },
+                'status_codes': dict(self.status_codes),
+                'bytes_downloaded': self.bytes_downloaded,
+                'fetch_seconds': round(self.fetch_seconds, 3),
+                'pages_parsed': self.pages_parsed,
+                'parse_seconds': round(self.parse_seconds, 3),
+                'avg_parse_ms': round(1000 * self.parse_seconds / self.pages_parsed, 2) if self.pages_parsed else 0,
+                'max_parse_ms': round(1000 * self.slowest_parse, 2),
+                'records_per_template': {t: dict(s) for t, s in self.templates.items()},
+                'retries': self.retries,
+                'sleep_seconds': {k: round(v, 3) for k, v in (sleep_seconds or {}).items()}
+            }
@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+# Warm scraping daemon for n8n: keeps one scraper and analyzer resident and
+# runs jobs in the background so triggering one returns at once.
+#   POST /jobs {"type": "full" | "delta" | "resume" | "replay" | "stream" | "analyze"}  -> 202 {"job_id": ...}
+#   GET  /jobs/<id>   status, timings and the run result once finished
+#   GET  /jobs        recent jobs, newest first
+#   GET  /status      warm-up state, running job and queue length
+# Serves on 127.0.0.1:8090 by default, or on a Unix socket with --socket.
+# Only the standard library is imported up front; the scraper stack loads
+# in a background warm-up thread after the port is already accepting jobs.
+
+import argparse
+import json
+import logging
+import os
+import queue
+import socketserver
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+JOB_TYPES = ('full', 'delta', 'resume', 'replay', 'stream', 'analyze')
+MAX_JOBS = 100
+
+
+class JobManager:
+    """Runs submitted jobs one at a time on a single worker thread.
+
+    Jobs share the warm scraper, so they are serialised rather than run in
+    parallel; the fetch engine already parallelises within a run. The
+    scraper and analyzer are built once by warm_up() and reused by every
+    job. Only the last MAX_JOBS jobs are kept.
+    """
+
+    def __init__(self):
+        self.jobs = OrderedDict()
+        self.pending = queue.Queue()
+        self.lock = threading.Lock()
+        self.ready = threading.Event()
+        self.automation = None
+        self.scraper = None
+        self.analyzer = None
+        self.warm_error = None
+        self.running = None
+        self.started_at = time.time()
+
+    def start(self):
+        threading.Thread(target=self.warm_up, daemon=True).start()
+        threading.Thread(target=self.work, daemon=True).start()
+
+    def warm_up(self):
+        try:
+            start = time.perf_counter()
+            import n8n_automation
+            from ai_analyzer import HealthcareAIAnalyzer
+            self.automation = n8n_automation
+            self.scraper = n8n_automation.build_scraper()
+            self.analyzer = HealthcareAIAnalyzer(max_workers=int(os.getenv('ANALYZER_WORKERS', '4')),
+                                                 pack_size=int(os.getenv('ANALYZER_PACK_SIZE', '1')))
+            logging.info(f"Daemon warm in {time.perf_counter() - start:.2f}s")
+        except Exception as e:
+            self.warm_error = str(e)
+            logging.error(f"Daemon warm-up failed: {e}")
+        finally:
+            self.ready.set()
+
+    def submit(self, job_type):
+        if job_type not in JOB_TYPES:
+            raise ValueError(f"Unknown job type {job_type!r}, expected one of {', '.join(JOB_TYPES)}")
+        job = {
+            'job_id': uuid.uuid4().hex[:12],
+            'type': job_type,
+            'status': 'queued',
+            'submitted_at': time.time(),
+            'started_at': None,
+            'finished_at': None,
+            'result': None,
+            'error': None
+        }
+        with self.lock:
+            self.jobs[job['job_id']] = job
+            while len(self.jobs) > MAX_JOBS:
+                self.jobs.popitem(last=False)
+        submitted = dict(job)
+        self.pending.put(job)
+        logging.info(f"Queued {job_type} job {job['job_id']}")
+        return submitted
+
+    def get(self, job_id):
+        with self.lock:
+            job = self.jobs.get(job_id)
+            return dict(job) if job else None
+
+    def recent(self):
+        with self.lock:
+            return [dict(job) for job in reversed(self.jobs.values())]
+
+    def work(self):
+        while True:
+            job = self.pending.get()
+            self.ready.wait()
+            self.running = job
+            job.update(status='running', started_at=time.time())
+            try:
+                if self.warm_error:
+                    raise RuntimeError(f"daemon failed to warm up: {self.warm_error}")
+                result = self.run(job['type'])
+                job.update(status='success' if result.get('status') == 'success' else 'failed',
+                           result=result, error=result.get('error_message'))
+            except Exception as e:
+                job.update(status='failed', error=str(e))
+                logging.error(f"Job {job['job_id']} failed: {e}")
+            finally:
+                job['finished_at'] = time.time()
+                self.running = None
+
+    def run(self, job_type):
+        if job_type == 'analyze':
+            return self.automation.run_analysis(analyzer=self.analyzer)
+        if job_type == 'stream':
+            return self.automation.run_streaming(scraper=self.scraper, analyzer=self.analyzer)
+        return self.automation.run_automation(resume=job_type == 'resume', delta=job_type == 'delta',
+                                              replay=job_type == 'replay', scraper=self.scraper)
+
+    def status(self):
+        running = self.running
+        return {
+            'warm': self.ready.is_set() and not self.warm_error,
+            'warm_error': self.warm_error,
+            'uptime': round(time.time() - self.started_at, 1),
+            'running': running and {k: running[k] for k in ('job_id', 'type', 'started_at')},
+            'queued': self.pending.qsize(),
+            'job_types': list(JOB_TYPES)
+        }
+
+    def close(self):
+        if self.scraper:
+            self.scraper.close()
+        if self.analyzer:
+            self.analyzer.close()
+
+
+class DaemonHandler(BaseHTTPRequestHandler):
+    manager = None
+
+    def log_message(self, format, *args):
+        logging.debug(format % args)
+
+    def address_string(self):
+        # Unix socket peers have no (host, port) address
+        return self.client_address[0] if isinstance(self.client_address, tuple) else 'unix'
+
+    def send_json(self, payload, status=200):
+        body = json.dumps(payload, ensure_ascii=False, default=str).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        path = urlsplit(self.path).path.rstrip('/')
+        if path == '/status':
+            return self.send_json(self.manager.status())
+        if path == '/jobs':
+            return self.send_json({'jobs': self.manager.recent()})
+        if path.startswith('/jobs/'):
+            job = self.manager.get(path[len('/jobs/'):])
+            return self.send_json(job, 200) if job else self.send_json({'error': 'unknown job'}, 404)
+        self.send_json({'error': 'not found'}, 404)
+
+    def do_POST(self):
+        if urlsplit(self.path).path.rstrip('/') != '/jobs':
+            return self.send_json({'error': 'not found'}, 404)
+        try:
+            length = int(self.headers.get('Content-Length') or 0)
+            body = json.loads(self.rfile.read(length) or b'{}')
+            job = self.manager.submit(body.get('type', 'full'))
+        except (ValueError, AttributeError) as e:
+            return self.send_json({'error': str(e)}, 400)
+        self.send_json({'job_id': job['job_id'], 'status': job['status'],
+                        'status_url': f"/jobs/{job['job_id']}"}, 202)
+
+
+class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def serve(host='127.0.0.1', port=8090, socket_path=None):
+    """Start warming up, then serve jobs until interrupted"""
+    manager = JobManager()
+    handler = type('BoundDaemonHandler', (DaemonHandler,), {'manager': manager})
+    if socket_path:
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        server = UnixHTTPServer(socket_path, handler)
+        logging.info(f"Scrape daemon on unix socket {socket_path}")
+    else:
+        server = ThreadingHTTPServer((host, port), handler)
+        server.daemon_threads = True
+        logging.info(f"Scrape daemon on http://{host}:{port}/jobs")
+    manager.start()
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        manager.close()
+        if socket_path and os.path.exists(socket_path):
+            os.remove(socket_path)
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description='Warm scraping daemon with a local job API')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8090)
+    parser.add_argument('--socket', help='listen on this Unix socket path instead of TCP')
+    args = parser.parse_args()
+    serve(args.host, args.port, args.socket)
+
+
+if __name__ == '__main__':
+    main()
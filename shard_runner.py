@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+# Sharded scraping over a shared work queue
+#   python shard_runner.py seed  --queue sqlite://work_queue.sqlite --city pune
+#   python shard_runner.py work  --queue sqlite://work_queue.sqlite --workers 4 --output shards
+#   python shard_runner.py merge --queue sqlite://work_queue.sqlite --merged healthcare_doctors.xlsx
+# Units are the frontier's canonical URLs, so a page shared by many
+# combinations is fetched once; merge fans each page's records out to every
+# combination that reads it. The SQLite queue is for workers on one host;
+# workers on several machines need a backend registered with
+# work_queue.register_queue_backend, and shard directories readable from
+# wherever `merge` runs.
+
+import argparse
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import socket
+import threading
+import time
+
+from robust_pune_scraper import RobustPuneScraper
+from work_queue import open_queue, LEASED
+from output_sink import JsonlSink, read_jsonl
+from dedup_index import DoctorDedupIndex
+from doctor_record import DoctorRecord, records_to_columns
+from url_frontier import canonical_url
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# A variation page is read for a combination only when its base page had more records than this
+VARIATION_MIN_RECORDS = 5
+VARIATION_TAKE = 10
+
+
+def seed_units(queue, city='pune', areas=None, specialties=None):
+    """Plan every area x specialty combination of city and queue its unique URLs.
+
+    Each combination's URLs are recorded in fetch order with their
+    -specialist variation; only the base URLs are queued now. A variation
+    is queued once its base page yields enough records, as in a local run.
+    Returns how many URLs were new.
+    """
+    areas = areas or RobustPuneScraper.AREAS
+    specialties = specialties or RobustPuneScraper.SPECIALTIES
+    if any(row[0] == city for row in queue.combinations()):
+        logging.info(f"{city} is already planned in this queue")
+        return 0
+
+    scraper = RobustPuneScraper(city=city)
+    try:
+        plan = []
+        for area in areas:
+            for specialty in specialties:
+                for url, template in scraper.get_scheduled_urls(area, specialty):
+                    variation = None
+                    if scraper.variation_allowed(template, area, specialty):
+                        variation = canonical_url(scraper.get_variation_url(url, specialty))
+                    plan.append((city, area, specialty, canonical_url(url), variation))
+    finally:
+        scraper.close()
+    queue.add_combinations(plan)
+    added = queue.add_units(dict.fromkeys(row[3] for row in plan))
+    logging.info(f"Queued {added} new URLs for {city} ({len(areas)} areas x {len(specialties)} specialties, "
+                 f"{len(plan)} combination requests)")
+    return added
+
+
+class ShardWorker:
+    """Leases URLs until the queue is drained, writing one shard file per page.
+
+    A heartbeat thread renews the lease while a page is fetched. A page's
+    parsed (untagged) records are written to a temp file and renamed into
+    the worker's shard directory before the unit is marked done, so a
+    crash never leaves a partial shard behind and the unit is simply
+    leased again. A page that cannot be fetched fails the unit, which is
+    retried until the queue's max_attempts and then marked failed.
+    """
+
+    def __init__(self, queue, worker_id, output_dir='shards', idle_wait=5, **scraper_kwargs):
+        self.queue = queue
+        self.worker_id = worker_id
+        self.shard_dir = os.path.join(output_dir, worker_id)
+        self.idle_wait = idle_wait
+        # Politeness is booked in the shared queue so it holds across all workers
+        self.scraper = RobustPuneScraper(shared_limiter=queue, dedupe=False, **scraper_kwargs)
+        self.completed = 0
+        os.makedirs(self.shard_dir, exist_ok=True)
+
+    def run(self):
+        try:
+            while True:
+                unit = self.queue.lease(self.worker_id)
+                if unit is None:
+                    # Leased units may still come back if their worker dies
+                    if self.queue.counts().get(LEASED):
+                        time.sleep(self.idle_wait)
+                        continue
+                    break
+                self.process(unit)
+        finally:
+            with open(os.path.join(self.shard_dir, 'metrics.json'), 'w') as f:
+                json.dump(self.scraper.metrics_summary(), f, indent=2)
+            self.scraper.close()
+        logging.info(f"Worker {self.worker_id} done: {self.completed} units")
+        return self.completed
+
+    def process(self, unit):
+        stop = threading.Event()
+        heartbeat = threading.Thread(target=self.keep_lease, args=(unit['key'], stop), daemon=True)
+        heartbeat.start()
+        try:
+            # get_html, not safe_get_url: a failed fetch must fail the unit, not
+            # complete it with no records (or with records carried from a delta index)
+            html = self.scraper.get_html(unit['url'])
+            if html is None:
+                logging.warning(f"Unit {unit['key']}: fetch failed on attempt {unit['attempts']}")
+                self.queue.fail(unit['key'], self.worker_id, 'fetch failed')
+                return
+            doctors = self.scraper.parse_response_html(html, unit['url'])
+
+            path = os.path.join(self.shard_dir, f"{hashlib.sha1(unit['key'].encode('utf-8')).hexdigest()}.jsonl")
+            sink = JsonlSink(f"{path}.tmp")
+            written = sink.write(doctors)
+            sink.close()
+            os.replace(f"{path}.tmp", path)
+
+            # Same rule as scrape_area_specialty: only productive pages get their variation
+            if len(doctors) > VARIATION_MIN_RECORDS:
+                self.queue.add_units(v for v in self.queue.variations(unit['key']) if v != unit['key'])
+
+            if self.queue.complete(unit['key'], self.worker_id, written, path):
+                self.completed += 1
+                logging.info(f"Unit {unit['key']}: {written} records -> {path}")
+            else:
+                # Lease lost and the unit handed to someone else: their shard counts
+                os.remove(path)
+                logging.warning(f"Lost lease on {unit['key']}, discarding its shard")
+        except Exception as e:
+            logging.error(f"Unit {unit['key']} failed: {e}")
+            self.queue.fail(unit['key'], self.worker_id, e)
+        finally:
+            stop.set()
+            heartbeat.join()
+
+    def keep_lease(self, key, stop):
+        while not stop.wait(self.queue.lease_seconds / 3):
+            if not self.queue.heartbeat(key, self.worker_id):
+                logging.warning(f"Heartbeat for {key} rejected, lease was lost")
+                return
+
+
+def run_worker(queue_url, worker_id, output_dir, scraper_kwargs):
+    queue = open_queue(queue_url)
+    try:
+        return ShardWorker(queue, worker_id, output_dir, **scraper_kwargs).run()
+    finally:
+        queue.close()
+
+
+def run_workers(queue_url, workers, output_dir='shards', **scraper_kwargs):
+    """Run workers processes on this machine, each with its own queue connection"""
+    prefix = f"{socket.gethostname()}-{os.getpid()}"
+    processes = [
+        multiprocessing.Process(target=run_worker,
+                                args=(queue_url, f"{prefix}-{i}", output_dir, scraper_kwargs))
+        for i in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+
+
+def merge_shards(queue, near_duplicates=False):
+    """Every planned combination's records, tagged and deduplicated across shards.
+
+    Pages are read from their shards once and fanned out in each
+    combination's fetch order, with the same variation rule as a local run.
+    """
+    outputs = queue.outputs()
+    pages = {}
+
+    def page(url):
+        if url not in pages:
+            pages[url] = list(read_jsonl(outputs[url])) if url in outputs else []
+        # Fresh records per combination: tagging writes area and specialty into them
+        return [DoctorRecord.from_mapping(r) for r in pages[url]]
+
+    tagger = RobustPuneScraper(dedupe=False)
+    dedup = DoctorDedupIndex(near_duplicates=near_duplicates)
+    try:
+        for city, area, specialty, url, variation in queue.combinations():
+            tagger.city = city
+            doctors = page(url)
+            tagger.tag_page_doctors(doctors, url, area, specialty)
+            base_count = len(doctors)
+            if variation and base_count > VARIATION_MIN_RECORDS:
+                doctors.extend(page(variation)[:VARIATION_TAKE])
+            for doctor in doctors:
+                dedup.add(doctor)
+    finally:
+        tagger.close()
+    logging.info(f"Merged {len(outputs)} page shards into {len(dedup.records)} doctors "
+                 f"({dedup.merged} duplicates)")
+    return dedup.records
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Sharded scraping over a shared work queue')
+    parser.add_argument('command', choices=['seed', 'work', 'merge', 'status'])
+    parser.add_argument('--queue', default='sqlite://work_queue.sqlite', help='work queue URL')
+    parser.add_argument('--city', default='pune', help='city to seed')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='worker processes on this machine')
+    parser.add_argument('--output', default='shards', help='directory for per-worker shard files')
+    parser.add_argument('--merged', default='healthcare_doctors.xlsx', help='merged output workbook')
+    args = parser.parse_args()
+
+    if args.command == 'work':
+        run_workers(args.queue, args.workers, args.output)
+        return
+
+    queue = open_queue(args.queue)
+    try:
+        if args.command == 'seed':
+            seed_units(queue, args.city)
+        elif args.command == 'merge':
+            import pandas as pd
+            doctors = merge_shards(queue)
+            pd.DataFrame(records_to_columns(doctors)).to_excel(args.merged, index=False)
+            logging.info(f"Saved {len(doctors)} doctors to {args.merged}")
+        print(json.dumps(queue.counts()))
+    finally:
+        queue.close()
+
+
+if __name__ == '__main__':
+    main()
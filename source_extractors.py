@@ -0,0 +1,222 @@
+import json
+import logging
+import re
+import time
+
+from card_extractor import extract_doctor_details, is_doctor_line, unique_details
+
+JSON_LD_SCRIPT = re.compile(r'<script[^>]+type=["\']application/ld\+json["\'][^>]*>(.*?)</script>', re.I | re.S)
+YEARS = re.compile(r'(\d+)\s*\+?\s*(?:years?|yrs?)', re.I)
+# Title as a word: is_doctor_line alone also matches names like 'Sahyadri Hospital'
+DOCTOR_TITLE = re.compile(r'\b(?:dr|doctor)\b', re.I)
+
+# schema.org types that describe a doctor, or a practice named after one
+PHYSICIAN_TYPES = {'Physician', 'Dentist'}
+PRACTICE_TYPES = {'LocalBusiness', 'MedicalClinic', 'MedicalBusiness', 'MedicalOrganization', 'Hospital'}
+
+# Inline-state keys, first present wins
+NAME_KEYS = ('doctor_name', 'doctorName', 'display_name', 'displayName', 'name')
+# Keys only a doctor carries, and ones hospitals and clinics carry too
+DOCTOR_ONLY_KEYS = ('doctor_name', 'doctorName', 'qualification', 'qualifications', 'experience_years',
+                    'years_of_experience', 'yearsOfExperience', 'registration_number')
+DOCTOR_HINT_KEYS = ('specialization', 'specialty', 'speciality', 'specialities', 'specializations', 'experience')
+CLINIC_KEYS = ('clinic_name', 'clinicName', 'hospital_name', 'hospitalName', 'clinic', 'hospital', 'practice')
+ADDRESS_KEYS = ('address', 'full_address', 'fullAddress', 'clinic_address', 'locality')
+PHONE_KEYS = ('phone', 'phone_number', 'phoneNumber', 'mobile', 'contact_number', 'contactNumber', 'telephone')
+RATING_KEYS = ('rating', 'average_rating', 'averageRating', 'avg_rating', 'ratingValue')
+EXPERIENCE_KEYS = ('experience_years', 'years_of_experience', 'yearsOfExperience', 'experience')
+SPECIALTY_KEYS = ('specialty', 'speciality', 'specialization', 'specialities', 'specializations')
+
+# Host fragment -> source name, checked in order
+SOURCE_HOSTS = [('practo', 'Practo'), ('justdial', 'JustDial'), ('1mg', '1mg'),
+                ('lybrate', 'Lybrate'), ('apollo', 'Apollo')]
+
+
+def source_for_url(url):
+    for fragment, source in SOURCE_HOSTS:
+        if fragment in (url or ''):
+            return source
+    return 'Unknown'
+
+
+def text_value(value):
+    """Plain text from a JSON scalar, list or {'name': ...} object"""
+    if isinstance(value, dict):
+        value = value.get('name') or value.get('value') or ''
+    elif isinstance(value, list):
+        value = text_value(value[0]) if value else ''
+    return '' if value is None else str(value).strip()
+
+
+def address_text(value):
+    if isinstance(value, dict):
+        parts = [value.get(k) for k in ('streetAddress', 'addressLocality', 'locality', 'line1',
+                                         'city', 'addressRegion', 'state', 'postalCode', 'pincode')]
+        return ', '.join(str(p).strip() for p in parts if p)
+    return text_value(value)
+
+
+def doctor_named(name):
+    return bool(DOCTOR_TITLE.search(name)) and is_doctor_line(name)
+
+
+def first_value(data, keys, convert=text_value):
+    for key in keys:
+        if data.get(key):
+            return convert(data[key])
+    return ''
+
+
+def years_text(value):
+    match = YEARS.search(str(value or ''))
+    return match.group(1) if match else ''
+
+
+def walk_dicts(data, matched=None):
+    """Every dict nested in data, parents before children.
+
+    A dict for which matched(item) is true is yielded but not descended
+    into, so a doctor's nested clinic or organisation objects are not
+    taken for doctors of their own.
+    """
+    stack = [data]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, dict):
+            yield item
+            if not (matched and matched(item)):
+                stack.extend(reversed(list(item.values())))
+        elif isinstance(item, list):
+            stack.extend(reversed(item))
+
+
+def schema_types(data):
+    types = data.get('@type', [])
+    return set(types) if isinstance(types, list) else {types}
+
+
+def json_ld_doctor(item):
+    """A schema.org Physician, or a practice named after a doctor"""
+    types = schema_types(item)
+    name = text_value(item.get('name'))
+    return bool(name) and bool(types & PHYSICIAN_TYPES or (types & PRACTICE_TYPES and doctor_named(name)))
+
+
+def json_ld_details(html):
+    """Doctor tuples from schema.org JSON-LD blocks"""
+    details = []
+    for block in JSON_LD_SCRIPT.findall(html):
+        try:
+            data = json.loads(block.strip())
+        except ValueError:
+            continue
+        for item in walk_dicts(data, json_ld_doctor):
+            if not json_ld_doctor(item):
+                continue
+            name = text_value(item.get('name'))
+            details.append((
+                name,
+                first_value(item, ('worksFor', 'memberOf', 'hospitalAffiliation')),
+                address_text(item.get('address')),
+                text_value(item.get('telephone')),
+                text_value((item.get('aggregateRating') or {}).get('ratingValue')),
+                years_text(item.get('yearsOfExperience') or item.get('description')),
+                text_value(item.get('medicalSpecialty'))
+            ))
+    return details
+
+
+def inline_state(html, state_vars=(), script_ids=()):
+    """JSON objects assigned to window state variables or held in id'd script tags"""
+    decoder = json.JSONDecoder()
+    for var in state_vars:
+        for match in re.finditer(re.escape(var) + r'\s*=\s*', html):
+            try:
+                yield decoder.raw_decode(html, match.end())[0]
+            except ValueError:
+                continue
+    for script_id in script_ids:
+        pattern = r'<script[^>]+id=["\']' + re.escape(script_id) + r'["\'][^>]*>(.*?)</script>'
+        for block in re.findall(pattern, html, re.S):
+            try:
+                yield json.loads(block)
+            except ValueError:
+                continue
+
+
+def state_doctor(item):
+    """An object with a doctor-only field, or a shared one and a doctor's name"""
+    name = first_value(item, NAME_KEYS)
+    if not name:
+        return False
+    if any(item.get(key) for key in DOCTOR_ONLY_KEYS):
+        return True
+    return any(item.get(key) for key in DOCTOR_HINT_KEYS) and doctor_named(name)
+
+
+def state_details(html, state_vars=(), script_ids=()):
+    """Doctor tuples from inline JSON state: every object state_doctor accepts"""
+    details = []
+    for state in inline_state(html, state_vars, script_ids):
+        for item in walk_dicts(state, state_doctor):
+            if not state_doctor(item):
+                continue
+            name = first_value(item, NAME_KEYS)
+            details.append((
+                name,
+                first_value(item, CLINIC_KEYS),
+                first_value(item, ADDRESS_KEYS, address_text),
+                first_value(item, PHONE_KEYS),
+                first_value(item, RATING_KEYS),
+                first_value(item, EXPERIENCE_KEYS, lambda v: years_text(f"{text_value(v)} years")),
+                first_value(item, SPECIALTY_KEYS)
+            ))
+    return details
+
+
+def structured_extractor(state_vars=(), script_ids=()):
+    """Extractor reading JSON-LD first, then the source's inline state"""
+    def extract(html):
+        return json_ld_details(html) or state_details(html, state_vars, script_ids)
+    return extract
+
+
+EXTRACTORS = {}
+
+
+def register_extractor(source, extractor):
+    """extractor(html) -> [(name, clinic, address, phone, rating, experience, specialty)]"""
+    EXTRACTORS[source] = extractor
+
+
+register_extractor('Practo', structured_extractor(('window.__REDUX_STATE__', 'window.__INITIAL_STATE__'), ('__NEXT_DATA__',)))
+register_extractor('JustDial', structured_extractor(('window.__INITIAL_STATE__', 'window.__PRELOADED_STATE__'), ('__NEXT_DATA__',)))
+register_extractor('1mg', structured_extractor(('window.__INITIAL_STATE__', 'window.PRELOADED_STATE'), ('__NEXT_DATA__',)))
+register_extractor('Lybrate', structured_extractor(('window.__INITIAL_STATE__',), ('__NEXT_DATA__',)))
+register_extractor('Apollo', structured_extractor(('window.__INITIAL_STATE__',), ('__NEXT_DATA__',)))
+register_extractor('Unknown', structured_extractor(('window.__INITIAL_STATE__',), ('__NEXT_DATA__',)))
+
+
+def extract_page_details(html, url=None):
+    """Structured data through the source's extractor, else the generic card parser.
+
+    Module-level so it can run in a worker process. Tuples from structured
+    data carry rating, experience and specialty; card tuples stop at phone.
+    """
+    extractor = EXTRACTORS.get(source_for_url(url))
+    if extractor:
+        try:
+            details = extractor(html)
+        except Exception as e:
+            logging.debug(f"Structured extraction error: {e}")
+            details = []
+        if details:
+            return unique_details(details)
+    return extract_doctor_details(html)
+
+
+def timed_extract_page_details(html, url=None):
+    """extract_page_details plus the seconds it took, for per-page parse metrics"""
+    start = time.perf_counter()
+    details = extract_page_details(html, url)
+    return details, time.perf_counter() - start
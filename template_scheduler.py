@@ -0,0 +1,92 @@
+import json
+import logging
+import os
+import random
+
+
+class TemplateScheduler:
+    """Spends requests on the URL templates that actually yield doctors.
+
+    History per template (pages requested, records found, consecutive runs
+    without a single record) and per source is kept in a JSON file across
+    runs. Templates dead for dead_after runs are skipped; every probe_every
+    runs each dead template is re-probed on probe_samples combinations so
+    one that recovered comes back. Live templates keep their get_smart_urls
+    order: dedup keeps the first record it sees, so reordering them would
+    change which duplicate survives from run to run.
+    """
+
+    def __init__(self, path='template_yield.json', dead_after=3, probe_every=5, probe_samples=3):
+        self.path = path
+        self.dead_after = dead_after
+        self.probe_every = probe_every
+        self.probe_samples = probe_samples
+        self.history = {'runs': 0, 'templates': {}, 'sources': {}}
+        self.skipped = set()
+        self.probes = {}
+
+        if os.path.exists(path):
+            try:
+                with open(path) as f:
+                    self.history.update(json.load(f))
+            except Exception as e:
+                logging.warning(f"Template history unreadable, starting fresh: {e}")
+
+    def stats(self, template):
+        return self.history['templates'].get(template, {})
+
+    def is_dead(self, template):
+        return self.stats(template).get('dead_runs', 0) >= self.dead_after
+
+    def begin_run(self, templates, combinations):
+        """Decide which dead templates sit out this run and which get probed where"""
+        run = self.history['runs'] + 1
+        combinations = list(combinations)
+        self.skipped = set()
+        self.probes = {}
+        for template in templates:
+            if not self.is_dead(template):
+                continue
+            last_probed = self.stats(template).get('last_probed', 0)
+            if run - last_probed >= self.probe_every and combinations:
+                sample = random.sample(combinations, min(self.probe_samples, len(combinations)))
+                self.probes[template] = set(sample)
+                self.history['templates'][template]['last_probed'] = run
+            else:
+                self.skipped.add(template)
+        logging.info(f"Template scheduler: skipping {len(self.skipped)} dead templates, "
+                     f"re-probing {len(self.probes)}")
+
+    def allowed(self, template, area, specialty):
+        if template in self.probes:
+            return (area, specialty) in self.probes[template]
+        return template not in self.skipped
+
+    def select(self, templates, area, specialty):
+        """Templates to fetch for a combination, in their original order"""
+        return [t for t in templates if self.allowed(t, area, specialty)]
+
+    def end_run(self, template_stats, source_fn):
+        """Fold this run's {template: {'pages', 'records'}} into the history and save it"""
+        self.history['runs'] += 1
+        for template, run_stats in template_stats.items():
+            stats = self.history['templates'].setdefault(template, {
+                'runs': 0, 'pages': 0, 'records': 0, 'dead_runs': 0, 'last_probed': 0
+            })
+            was_dead = self.is_dead(template)
+            stats['runs'] += 1
+            stats['pages'] += run_stats['pages']
+            stats['records'] += run_stats['records']
+            stats['dead_runs'] = 0 if run_stats['records'] else stats['dead_runs'] + 1
+            if was_dead and run_stats['records']:
+                logging.info(f"Template recovered: {template}")
+
+            source = self.history['sources'].setdefault(source_fn(template), {'pages': 0, 'records': 0})
+            source['pages'] += run_stats['pages']
+            source['records'] += run_stats['records']
+
+        # Write-then-rename so a crash never leaves half a history file
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self.history, f, indent=2)
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,113 @@
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+
+# Generous per-source rates so tests are not paced like a real crawl
+FAST_RATES = {source: 1000.0 for source in ('Practo', 'JustDial', '1mg', 'Lybrate', 'Apollo', 'Unknown')}
+
+
+def doctor_page(prefix, count=8, phone_base=9800000000):
+    """Listing page with count doctor cards, each with its own name, clinic and phone"""
+    cards = ''.join(
+        f"<div class='doctor-card'><h2>Dr. {prefix} {i}</h2><p>{prefix} Clinic {i}</p>"
+        f"<p>MG Road Pune 411001</p><p>{phone_base + i}</p></div>"
+        for i in range(count)
+    )
+    return f"<html><body>{cards}</body></html>"
+
+
+# A small area x specialty grid; /{specialty} and /{area} pages are shared between combinations
+GRID_AREAS = ['aundh', 'baner']
+GRID_SPECIALTIES = ['cardiology', 'neurology']
+
+
+def grid_paths():
+    paths = []
+    for area in GRID_AREAS:
+        paths.append(f"/{area}")
+        for specialty in GRID_SPECIALTIES:
+            paths += [f"/{area}/{specialty}", f"/{area}/{specialty}-specialist"]
+    for specialty in GRID_SPECIALTIES:
+        paths += [f"/{specialty}", f"/{specialty}-specialist"]
+    return paths
+
+
+def serve_grid(site):
+    """Serve every grid page, each with its own doctors"""
+    for i, path in enumerate(grid_paths()):
+        site.pages[path] = doctor_page(path.strip('/').replace('/', ' ').title(), phone_base=9000000000 + i * 100)
+
+
+def site_scraper(site, **kwargs):
+    """Scraper over the grid whose URL templates point at the stub site"""
+    from robust_pune_scraper import RobustPuneScraper
+    kwargs.setdefault('rate_limits', FAST_RATES)
+    scraper = RobustPuneScraper(**kwargs)
+    scraper.AREAS = GRID_AREAS
+    scraper.SPECIALTIES = GRID_SPECIALTIES
+    scraper.get_smart_urls = lambda area, specialty: [
+        site.url(f"/{area}/{specialty}"), site.url(f"/{specialty}"), site.url(f"/{area}")]
+    return scraper
+
+
+class StubSite:
+    """Local HTTP server serving pages from a dict: path -> body, or (status, body)"""
+
+    def __init__(self):
+        self.pages = {}
+        self.hits = {}
+        self.lock = threading.Lock()
+        site = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                with site.lock:
+                    site.hits[self.path] = site.hits.get(self.path, 0) + 1
+                page = site.pages.get(self.path, (404, ''))
+                status, body = page if isinstance(page, tuple) else (200, page)
+                data = body.encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'text/html; charset=utf-8')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.server.daemon_threads = True
+        self.base = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def url(self, path):
+        return self.base + path
+
+    def requests(self):
+        with self.lock:
+            return sum(self.hits.values())
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def site():
+    stub = StubSite()
+    yield stub
+    stub.close()
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    """Run in a temp directory: runs write journals, streams and metadata to the cwd"""
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
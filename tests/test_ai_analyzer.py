@@ -0,0 +1,169 @@
+import threading
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+from ai_analyzer import HealthcareAIAnalyzer, MAX_BACKOFF, SUMMARY_FIELD
+from mock_groq import MockGroqHandler, start_mock_server
+
+
+def profiles(count):
+    return [{'Doctors name': f"Dr. Test {i}", 'Specialty': 'Cardiology', 'Years of experience': 5 + i % 20,
+             'Ratings': 4.0 + (i % 10) / 10, 'Clinic/Hospital': f"Clinic {i}"} for i in range(count)]
+
+
+def analyzer(url, **kwargs):
+    kwargs.setdefault('requests_per_minute', 10 ** 6)
+    return HealthcareAIAnalyzer(api_key='test', base_url=url, tokens_per_minute=10 ** 9, cache_path='',
+                                max_retries=0, **kwargs)
+
+
+def test_concurrent_fallbacks_are_all_counted(site):
+    # The stub site answers POST with 501, which is not retried
+    groq = analyzer(site.url('/v1/chat/completions'), max_workers=16)
+    results = groq.batch_analyze_doctors(profiles(400))
+    groq.close()
+    assert groq.batch_summary['fallbacks'] == 400
+    assert all(r[SUMMARY_FIELD].startswith('PROS: ') for r in results)
+
+
+def test_backoff_caps_retry_after():
+    groq = analyzer('http://127.0.0.1:9/unused')
+    assert groq.backoff(0, '3600') == MAX_BACKOFF
+    assert groq.backoff(0, '2') == 2.0
+    assert groq.backoff(0, '-5') == 0.0
+    assert groq.backoff(10) <= MAX_BACKOFF * 1.5
+    groq.close()
+
+
+@pytest.fixture
+def mock_groq():
+    server, url = start_mock_server()
+    yield url
+    server.shutdown()
+    server.server_close()
+
+
+def summaries(results):
+    return [r[SUMMARY_FIELD] for r in results]
+
+
+def test_concurrent_batch_matches_sequential(mock_groq):
+    doctors = profiles(40)
+    sequential = analyzer(mock_groq)
+    expected = summaries(sequential.batch_analyze_doctors(doctors))
+    sequential.close()
+    concurrent = analyzer(mock_groq, max_workers=8)
+    results = concurrent.batch_analyze_doctors(doctors)
+    concurrent.close()
+
+    assert summaries(results) == expected
+    assert expected[3] == 'PROS: Experienced Dr. Test 3 | CONS: Busy schedule | Consult Dr. Test 3'
+    assert concurrent.batch_summary['fallbacks'] == 0
+    # Results are overlays: the input records are left as they were
+    assert SUMMARY_FIELD not in doctors[0]
+
+
+class FlakyServer:
+    """Mock chat-completions server that answers 429 to the first failures requests"""
+
+    def __init__(self, failures):
+        self.requests = 0
+        self.lock = threading.Lock()
+        stub = self
+
+        class Handler(MockGroqHandler):
+            def do_POST(self):
+                with stub.lock:
+                    stub.requests += 1
+                    fail = stub.requests <= failures
+                if not fail:
+                    return super().do_POST()
+                self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                self.send_response(429)
+                self.send_header('Retry-After', '0')
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/openai/v1/chat/completions"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def test_rate_limited_requests_are_retried():
+    flaky = FlakyServer(failures=2)
+    groq = HealthcareAIAnalyzer(api_key='test', base_url=flaky.url, cache_path='', max_retries=2)
+    results = groq.batch_analyze_doctors(profiles(1))
+    groq.close()
+    flaky.close()
+    assert flaky.requests == 3
+    assert groq.batch_summary['fallbacks'] == 0
+    assert results[0][SUMMARY_FIELD].startswith('PROS: Experienced Dr. Test 0')
+
+
+def test_retries_give_up_with_a_fallback():
+    flaky = FlakyServer(failures=10)
+    groq = HealthcareAIAnalyzer(api_key='test', base_url=flaky.url, cache_path='', max_retries=2)
+    groq.batch_analyze_doctors(profiles(1))
+    groq.close()
+    flaky.close()
+    assert flaky.requests == 3
+    assert groq.batch_summary['fallbacks'] == 1
+
+
+class CountingServer:
+    """The mock API, counting requests and optionally dropping each reply's last profile"""
+
+    def __init__(self, drop_last=False):
+        self.requests = 0
+        self.lock = threading.Lock()
+        stub = self
+
+        class Handler(MockGroqHandler):
+            def completion(self, prompt):
+                with stub.lock:
+                    stub.requests += 1
+                content = super().completion(prompt)
+                return content.rsplit('\n\nID: ', 1)[0] if drop_last else content
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/openai/v1/chat/completions"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def test_packed_batch_matches_one_profile_per_request(mock_groq):
+    doctors = profiles(23)
+    single = analyzer(mock_groq)
+    expected = summaries(single.batch_analyze_doctors(doctors))
+    single.close()
+
+    server = CountingServer()
+    packed = analyzer(server.url, pack_size=5, max_workers=3)
+    results = packed.batch_analyze_doctors(doctors)
+    packed.close()
+    server.close()
+
+    assert summaries(results) == expected
+    assert server.requests == 5
+    assert packed.batch_summary['fallbacks'] == 0
+
+
+def test_unparsed_packed_profiles_fall_back():
+    server = CountingServer(drop_last=True)
+    packed = analyzer(server.url, pack_size=4, max_workers=2)
+    results = packed.batch_analyze_doctors(profiles(12))
+    packed.close()
+    server.close()
+
+    assert packed.batch_summary['fallbacks'] == 3
+    for i, result in enumerate(results):
+        parsed = result[SUMMARY_FIELD].startswith('PROS: Experienced')
+        assert parsed == (i % 4 != 3)
@@ -0,0 +1,52 @@
+from dedup_index import DoctorDedupIndex
+from doctor_record import DoctorRecord
+
+
+def record(name, phone='', clinic='', address='', source='Practo', filled=()):
+    return DoctorRecord(name=name, phone=phone, clinic=clinic, address=address, source=source, filled=tuple(filled))
+
+
+def test_same_doctor_on_two_sources_is_merged_by_phone_or_clinic():
+    index = DoctorDedupIndex()
+    first = index.add(record('Dr. Asha Kale', '+91 9811111111', 'Kale Clinic'))
+    assert index.add(record('asha kale', '9811111111', 'Other Clinic', source='JustDial')) is first
+    assert index.add(record('Dr Asha Kale', '', 'KALE CLINIC', source='Lybrate')) is first
+    assert len(index.records) == 1 and index.merged == 2
+    assert first['Sources'] == 'Practo, JustDial, Lybrate'
+
+
+def test_generated_values_never_form_a_key():
+    index = DoctorDedupIndex()
+    index.add(record('Dr. Asha Kale', '+91 9811111111', 'Dr. Asha Kale Clinic', filled=('Contact number', 'Clinic/Hospital')))
+    # Same stand-in values, but nothing parsed ties the two together
+    index.add(record('Dr. Asha Kale', '+91 9811111111', 'Dr. Asha Kale Clinic', filled=('Contact number', 'Clinic/Hospital')))
+    assert len(index.records) == 2 and index.merged == 0
+
+
+def test_different_doctors_sharing_a_clinic_stay_apart():
+    index = DoctorDedupIndex()
+    index.add(record('Dr. Asha Kale', '9811111111', 'Ruby Hall Clinic'))
+    index.add(record('Dr. Vivek Rao', '9822222222', 'Ruby Hall Clinic'))
+    assert len(index.records) == 2
+
+
+def test_near_duplicates_match_on_name_and_address():
+    near = DoctorDedupIndex(near_duplicates=True)
+    exact = DoctorDedupIndex()
+    for index in (near, exact):
+        index.add(record('Dr. Rajendra Deshpande', '9811111111', address='12, FC Road, Deccan, Pune - 411004'))
+        index.add(record('Dr. Rajendra Deshpandey', '9899999999', address='12 FC Road, Deccan, Pune 411004',
+                         source='JustDial'))
+        index.add(record('Dr. Rajendra Deshpande', '9877777777', address='88, Viman Nagar, Pune - 411014',
+                         source='Apollo'))
+    assert len(exact.records) == 3
+    assert len(near.records) == 2
+    assert near.records[0]['Sources'] == 'Practo, JustDial'
+
+
+def test_released_records_are_dropped_but_still_recognised():
+    index = DoctorDedupIndex()
+    index.add(record('Dr. Asha Kale', '9811111111'))
+    index.release()
+    assert index.add(record('Dr. Asha Kale', '9811111111', source='JustDial')) is None
+    assert index.records == [None] and index.merged == 1
@@ -0,0 +1,69 @@
+from conftest import FAST_RATES, doctor_page
+from delta_refresh import content_hash, diff_datasets, load_dataset
+from robust_pune_scraper import RobustPuneScraper
+
+
+def with_token(html, token):
+    """The page as served with a per-request CSRF token and render timestamp"""
+    return html.replace('<body>', f"<head><script>window.__csrf = '{token}'; window.__ts = {len(token)};</script>"
+                                  f"<meta name='csrf-token' content='{token}'></head><body data-render='{token}'>")
+
+
+def test_content_hash_ignores_tokens_and_scripts():
+    page = doctor_page('Same')
+    assert content_hash(with_token(page, 'a1b2')) == content_hash(with_token(page, 'zz99yy'))
+    assert content_hash(page) == content_hash(page.replace('</h2>', '</h2>\n  '))
+    assert content_hash(page) != content_hash(doctor_page('Same', phone_base=9700000000))
+
+
+def test_content_hash_keeps_json_ld():
+    ld = "<script type='application/ld+json'>{\"@type\": \"Physician\", \"name\": \"Dr. %s\"}</script>"
+    assert content_hash(ld % 'One') != content_hash(ld % 'Two')
+
+
+def scrape_once(site, index_path):
+    scraper = RobustPuneScraper(page_index_path=index_path, reuse_unchanged=True, rate_limits=FAST_RATES)
+    try:
+        return scraper.safe_get_url(site.url('/list')), scraper.page_index.unchanged
+    finally:
+        scraper.close()
+
+
+def test_delta_run_reuses_pages_that_only_changed_tokens(site, workdir):
+    index_path = str(workdir / 'page_index.sqlite')
+    site.pages['/list'] = with_token(doctor_page('Delta'), 'first-token')
+    first, _ = scrape_once(site, index_path)
+
+    site.pages['/list'] = with_token(doctor_page('Delta'), 'second-token')
+    second, unchanged = scrape_once(site, index_path)
+    assert unchanged == 1
+    assert [d['Contact number'] for d in second] == [d['Contact number'] for d in first]
+
+    site.pages['/list'] = with_token(doctor_page('Delta', phone_base=9700000000), 'third-token')
+    third, unchanged = scrape_once(site, index_path)
+    assert unchanged == 0
+    assert third[0]['Contact number'] == '+91 9700000000'
+
+
+def listing(scraper, phone='9811111111', rating=''):
+    """The same two listings as scraped on one run; unparsed columns get fresh stand-ins"""
+    doctors = [scraper.create_doctor_record('Dr. Asha Kale', 'Kale Clinic', 'FC Road, Pune 411004', phone, rating),
+               scraper.create_doctor_record('Dr. Vivek Rao', 'Rao Hospital', '', '9822222222')]
+    for doctor in doctors:
+        doctor['Source'] = 'Practo'
+        doctor['Specialty'] = 'Cardiology'
+    return doctors
+
+
+def test_diff_ignores_generated_fields_across_a_workbook_round_trip(workdir):
+    scraper = RobustPuneScraper()
+    scraper.save_results(listing(scraper), 'previous.xlsx')
+    previous = load_dataset('previous.xlsx')
+
+    added, updated, removed = diff_datasets(previous, listing(scraper))
+    assert (added, updated, removed) == ([], [], [])
+
+    added, updated, removed = diff_datasets(previous, listing(scraper, phone='9833333333', rating='4.9'))
+    scraper.close()
+    assert [d['Doctors name'] for d in updated] == ['Dr. Asha Kale']
+    assert added == [] and removed == []
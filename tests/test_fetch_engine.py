@@ -0,0 +1,57 @@
+import threading
+import time
+
+from conftest import GRID_AREAS, GRID_SPECIALTIES, serve_grid, site_scraper
+from fetch_engine import ConcurrentFetcher
+
+
+def test_fetch_all_keeps_input_order_and_per_host_limit():
+    active = {}
+    peak = {}
+    lock = threading.Lock()
+
+    def fetch(url):
+        host = url.split('/')[2]
+        with lock:
+            active[host] = active.get(host, 0) + 1
+            peak[host] = max(peak.get(host, 0), active[host])
+        time.sleep(0.02)
+        with lock:
+            active[host] -= 1
+        return [url]
+
+    urls = [f"http://{host}/page{i}" for i in range(6) for host in ('a.test', 'b.test', 'c.test')]
+    results = ConcurrentFetcher(fetch, max_workers=8, per_host_limit=2, delay=0).fetch_all(urls + urls[:3])
+
+    assert list(results) == urls
+    assert all(results[url] == [url] for url in urls)
+    assert peak == {'a.test': 2, 'b.test': 2, 'c.test': 2}
+
+
+def test_fetch_error_gives_empty_result():
+    def fetch(url):
+        if url.endswith('bad'):
+            raise RuntimeError('boom')
+        return [url]
+
+    results = ConcurrentFetcher(fetch, delay=0).fetch_all(['http://a.test/ok', 'http://a.test/bad'])
+    assert results == {'http://a.test/ok': ['http://a.test/ok'], 'http://a.test/bad': []}
+
+
+def scrape(site, **kwargs):
+    scraper = site_scraper(site, **kwargs)
+    try:
+        # Variation records are not tagged, so their specialty is a random stand-in
+        return [[(d['Doctors name'], d['Contact number']) for d in scraper.scrape_area_specialty(a, s)]
+                for a in GRID_AREAS for s in GRID_SPECIALTIES]
+    finally:
+        scraper.close()
+
+
+def test_concurrent_scrape_matches_sequential(site, workdir):
+    serve_grid(site)
+    sequential = scrape(site)
+    # Three base pages plus the -specialist variations of the two with a specialty
+    assert all(len(records) == 40 for records in sequential)
+    assert scrape(site, concurrency=4) == sequential
+    assert scrape(site, concurrency=4, parse_processes=2) == sequential
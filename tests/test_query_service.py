@@ -0,0 +1,48 @@
+import json
+import threading
+import urllib.error
+import urllib.request
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+from output_sink import JsonlSink
+from query_service import QueryHandler, QueryService
+
+
+@pytest.fixture
+def service_url(tmp_path):
+    path = str(tmp_path / 'doctors.jsonl')
+    sink = JsonlSink(path)
+    sink.write([{'Doctors name': f"Dr. Query {i}", 'Specialty': 'Cardiology', 'Ratings': 4.0 + i / 10,
+                 'Complete address': f"{i}, Baner, Pune, Maharashtra - 411045", 'Source': 'Practo'}
+                for i in range(5)])
+    sink.close()
+    service = QueryService(path)
+    service.reload()
+    handler = type('BoundQueryHandler', (QueryHandler,), {'service': service})
+    server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def get(url):
+    try:
+        with urllib.request.urlopen(url) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+
+
+def test_bad_page_parameters_name_the_parameter(service_url):
+    assert get(f"{service_url}/doctors?offset=abc") == (400, {'error': "offset must be a whole number, got 'abc'"})
+    assert get(f"{service_url}/doctors?limit=2.5") == (400, {'error': "limit must be a whole number, got '2.5'"})
+
+
+def test_page_parameters_select_the_page(service_url):
+    status, body = get(f"{service_url}/doctors?sort=rating&limit=2&offset=1")
+    assert status == 200
+    assert body['total'] == 5 and body['offset'] == 1
+    assert [r['Doctors name'] for r in body['results']] == ['Dr. Query 3', 'Dr. Query 2']
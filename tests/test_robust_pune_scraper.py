@@ -0,0 +1,23 @@
+import pytest
+
+from conftest import doctor_page, site_scraper
+
+
+@pytest.mark.parametrize('concurrency', [1, 4])
+def test_area_only_template_has_no_variation(site, workdir, concurrency):
+    site.pages['/baner/cardiology'] = doctor_page('Cardio')
+    site.pages['/baner/cardiology-specialist'] = doctor_page('Specialist', phone_base=9700000000)
+    site.pages['/cardiology'] = doctor_page('City', phone_base=9500000000)
+    site.pages['/cardiology-specialist'] = doctor_page('City Specialist', phone_base=9400000000)
+    site.pages['/baner'] = doctor_page('Area', phone_base=9600000000)
+    scraper = site_scraper(site, concurrency=concurrency)
+
+    doctors = scraper.scrape_area_specialty('baner', 'cardiology')
+    templates = scraper.metrics.templates
+    scraper.close()
+
+    # Base and -specialist pages for /baner/cardiology and /cardiology, plus /baner once
+    assert len(doctors) == 40
+    assert site.hits['/baner'] == 1
+    assert templates[site.url('/{area}')] == {'pages': 1, 'records': 8}
+    assert templates[site.url('/{area}/{specialty}-specialist')] == {'pages': 1, 'records': 8}
@@ -0,0 +1,27 @@
+import pandas as pd
+
+from ai_analyzer import HealthcareAIAnalyzer, SUMMARY_FIELD
+from robust_pune_scraper import RobustPuneScraper, SUMMARY_DEFAULT
+
+RATINGS = [4.9, 4.5, 4.5, 4.0, 3.9, 5.0, 4.2]
+EXPERIENCE = [20, 15, 14, 0, 30, 3, 40]
+
+
+def test_generate_summary_frame_matches_generate_summary():
+    scraper = RobustPuneScraper()
+    frame = scraper.generate_summary_frame(pd.DataFrame({'Ratings': RATINGS, 'Years of experience': EXPERIENCE}))
+    expected = [scraper.generate_summary(r, e) for r, e in zip(RATINGS, EXPERIENCE)]
+    assert frame[SUMMARY_FIELD].tolist() == expected
+
+    invalid = scraper.generate_summary_frame(pd.DataFrame({'Ratings': ['n/a', ''], 'Years of experience': [10, None]}))
+    scraper.close()
+    assert invalid[SUMMARY_FIELD].tolist() == [SUMMARY_DEFAULT, SUMMARY_DEFAULT]
+
+
+def test_fallback_analysis_frame_matches_fallback_analysis():
+    analyzer = HealthcareAIAnalyzer(api_key='test', cache_path='')
+    frame = analyzer.fallback_analysis_frame(pd.DataFrame({'Ratings': RATINGS, 'Years of experience': EXPERIENCE}))
+    expected = [analyzer.format_summary(analyzer.fallback_analysis({'Ratings': r, 'Years of experience': e}))
+                for r, e in zip(RATINGS, EXPERIENCE)]
+    analyzer.close()
+    assert frame[SUMMARY_FIELD].tolist() == expected
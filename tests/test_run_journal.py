@@ -0,0 +1,40 @@
+from conftest import grid_paths, serve_grid, site_scraper
+
+
+def doctor_keys(doctors):
+    return sorted((d['Doctors name'], d['Contact number']) for d in doctors)
+
+
+def test_resumed_run_skips_finished_work_and_matches_a_full_run(site, workdir):
+    serve_grid(site)
+    scraper = site_scraper(site)
+    run = scraper.iter_doctors()
+    next(run)
+    # Crash after the first combination: the journal is left unfinished
+    run.close()
+    scraper.close()
+    first_hits = dict(site.hits)
+    assert 0 < len(first_hits) < len(grid_paths())
+
+    scraper = site_scraper(site)
+    doctors = scraper.scrape_comprehensive(resume=True)
+    scraper.close()
+
+    # Pages from the crashed run are restored from the journal, not fetched again
+    assert site.hits == {path: 1 for path in grid_paths()}
+    assert len(doctors) == len(grid_paths()) * 8
+
+    site.hits.clear()
+    fresh = site_scraper(site)
+    full = fresh.scrape_comprehensive()
+    fresh.close()
+    assert doctor_keys(doctors) == doctor_keys(full)
+
+
+def test_resume_after_a_finished_run_starts_fresh(site, workdir):
+    serve_grid(site)
+    for resume in (False, True):
+        scraper = site_scraper(site)
+        scraper.scrape_comprehensive(resume=resume)
+        scraper.close()
+    assert site.hits == {path: 2 for path in grid_paths()}
@@ -0,0 +1,104 @@
+import threading
+
+from conftest import FAST_RATES, GRID_AREAS, GRID_SPECIALTIES, doctor_page, grid_paths, serve_grid, site_scraper
+from output_sink import JsonlSink
+from robust_pune_scraper import RobustPuneScraper
+from shard_runner import ShardWorker, merge_shards, seed_units
+from work_queue import MemoryWorkQueue, SqliteWorkQueue, DONE, FAILED
+
+
+def run_worker(queue, tmp_path):
+    worker = ShardWorker(queue, 'w1', str(tmp_path / 'shards'), idle_wait=0, rate_limits=FAST_RATES)
+    return worker.run()
+
+
+def test_failed_fetch_fails_unit_until_max_attempts(site, workdir):
+    site.pages['/up'] = doctor_page('Up')
+    site.pages['/down'] = (500, '')
+    queue = MemoryWorkQueue(max_attempts=2)
+    queue.add_units([site.url('/up'), site.url('/down')])
+
+    assert run_worker(queue, workdir) == 1
+
+    down = queue.units[site.url('/down')]
+    assert down['status'] == FAILED
+    assert down['attempts'] == 2
+    assert down['error'] == 'fetch failed'
+    up = queue.units[site.url('/up')]
+    assert up['status'] == DONE
+    assert up['records'] == 8
+    assert list(queue.outputs()) == [site.url('/up')]
+
+
+def test_failed_unit_is_retried_and_can_recover(site, workdir):
+    site.pages['/flaky'] = (500, '')
+    queue = MemoryWorkQueue(max_attempts=3)
+    queue.add_units([site.url('/flaky')])
+    worker = ShardWorker(queue, 'w1', str(workdir / 'shards'), idle_wait=0, rate_limits=FAST_RATES)
+
+    worker.process(queue.lease('w1'))
+    assert queue.units[site.url('/flaky')]['status'] == 'pending'
+
+    site.pages['/flaky'] = doctor_page('Flaky')
+    worker.process(queue.lease('w1'))
+    worker.scraper.close()
+    unit = queue.units[site.url('/flaky')]
+    assert unit['status'] == DONE
+    assert unit['attempts'] == 2
+    assert unit['records'] == 8
+
+
+def write_shard(path, doctors):
+    sink = JsonlSink(str(path))
+    sink.write(doctors)
+    sink.close()
+    return str(path)
+
+
+def test_merge_addresses_records_in_their_unit_city(workdir):
+    scraper = RobustPuneScraper()
+    pune_url, mumbai_url = 'https://www.practo.com/pune/baner', 'https://www.practo.com/mumbai/bandra'
+    queue = MemoryWorkQueue()
+    queue.add_combinations([('pune', 'baner', 'cardiology', pune_url, None),
+                            ('mumbai', 'bandra', 'cardiology', mumbai_url, None)])
+    queue.add_units([pune_url, mumbai_url])
+    names = {pune_url: 'Dr. Pune Heart', mumbai_url: 'Dr. Mumbai Heart'}
+    for i in range(2):
+        unit = queue.lease('w1')
+        # No address on the page, so the record carries a generated one
+        doctor = scraper.create_doctor_record(names[unit['key']], clinic='Heart Care', phone=f"987650000{i}")
+        queue.complete(unit['key'], 'w1', 1, write_shard(workdir / f"unit{i}.jsonl", [doctor]))
+    scraper.close()
+
+    merged = {doctor['Doctors name']: doctor['Complete address'] for doctor in merge_shards(queue)}
+
+    assert merged['Dr. Mumbai Heart'].endswith('Bandra, Mumbai')
+    assert 'Pune' not in merged['Dr. Mumbai Heart']
+    assert merged['Dr. Pune Heart'].endswith('Baner, Pune, Maharashtra - 411045')
+
+
+def test_sharded_run_matches_a_local_run(site, workdir, monkeypatch):
+    serve_grid(site)
+    local = site_scraper(site)
+    expected = sorted((d['Doctors name'], d['Contact number']) for d in local.scrape_comprehensive())
+    local.close()
+    site.hits.clear()
+
+    # Workers and the seeder build their own scrapers: point the class at the stub site
+    monkeypatch.setattr(RobustPuneScraper, 'get_smart_urls', lambda self, area, specialty: [
+        site.url(f"/{area}/{specialty}"), site.url(f"/{specialty}"), site.url(f"/{area}")])
+    queue = SqliteWorkQueue(str(workdir / 'queue.sqlite'))
+    seed_units(queue, areas=GRID_AREAS, specialties=GRID_SPECIALTIES)
+    workers = [ShardWorker(queue, f"w{i}", str(workdir / 'shards'), idle_wait=0, rate_limits=FAST_RATES)
+               for i in range(2)]
+    threads = [threading.Thread(target=worker.run) for worker in workers]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert site.hits == {path: 1 for path in grid_paths()}
+    assert queue.counts() == {DONE: len(grid_paths())}
+    merged = merge_shards(queue)
+    queue.close()
+    assert sorted((d['Doctors name'], d['Contact number']) for d in merged) == expected
@@ -0,0 +1,58 @@
+import json
+import os
+
+from card_extractor import extract_doctor_details
+from source_extractors import EXTRACTORS, json_ld_doctor, source_for_url, state_details, state_doctor
+
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks', 'corpus')
+
+
+def state_page(state):
+    return f"<html><body><script>window.__INITIAL_STATE__ = {json.dumps(state)};</script></body></html>"
+
+
+def test_hospitals_in_state_are_not_doctors():
+    assert not state_doctor({'name': 'Ruby Hall Clinic', 'specialities': ['Cardiology', 'Oncology']})
+    assert not state_doctor({'name': 'Jehangir Hospital', 'specialty': 'Multi-speciality', 'experience': '70 years'})
+    # 'dr' inside a word is not a title
+    assert not state_doctor({'name': 'Sahyadri Hospital', 'specialities': ['Orthopedics']})
+
+
+def test_json_ld_practice_needs_a_doctor_title():
+    assert not json_ld_doctor({'@type': 'MedicalClinic', 'name': 'Sahyadri Hospital'})
+    assert json_ld_doctor({'@type': 'MedicalClinic', 'name': 'Dr. Joshi Eye Clinic'})
+    assert json_ld_doctor({'@type': 'Physician', 'name': 'Priya Sharma'})
+
+
+def test_doctors_in_state_are_found_by_doctor_only_keys_or_name():
+    assert state_doctor({'name': 'Priya Sharma', 'qualifications': ['MBBS', 'MD']})
+    assert state_doctor({'doctorName': 'Priya Sharma', 'specialty': 'Cardiology'})
+    assert state_doctor({'name': 'Dr. Priya Sharma', 'specialty': 'Cardiology'})
+    assert not state_doctor({'specialty': 'Cardiology', 'qualification': 'MBBS'})
+
+
+def test_state_details_skips_hospital_objects():
+    html = state_page({'listing': {
+        'hospitals': [{'name': 'Ruby Hall Clinic', 'specialities': ['Cardiology'], 'address': 'Sassoon Road, Pune'}],
+        'doctors': [{'name': 'Dr. Priya Sharma', 'specialization': 'Cardiology', 'clinic_name': 'Ruby Hall Clinic',
+                     'phone': '9876543210', 'rating': 4.5, 'experience_years': 12}],
+    }})
+    details = state_details(html, ('window.__INITIAL_STATE__',))
+    assert details == [('Dr. Priya Sharma', 'Ruby Hall Clinic', '', '9876543210', '4.5', '12', 'Cardiology')]
+
+
+def test_structured_corpus_pages_match_the_dom_extractor():
+    with open(os.path.join(CORPUS_DIR, 'manifest.json')) as f:
+        manifest = json.load(f)
+    structured = []
+    for filename, url in manifest.items():
+        with open(os.path.join(CORPUS_DIR, filename), encoding='utf-8') as f:
+            html = f.read()
+        details = EXTRACTORS[source_for_url(url)](html)
+        if not details:
+            continue
+        structured.append(filename)
+        # Card tuples stop at phone; structured ones add rating, experience and specialty
+        assert [d[:4] for d in details] == extract_doctor_details(html), filename
+        assert all(d[4] and d[5] and d[6] for d in details), filename
+    assert sorted(structured) == ['justdial_pune_kothrud_dentist_state.html', 'practo_pune_baner_orthopedics_jsonld.html']
@@ -0,0 +1,39 @@
+from conftest import grid_paths, serve_grid, site_scraper
+from url_frontier import UrlFrontier, canonical_url
+
+
+def test_canonical_url_merges_trivial_spellings():
+    assert canonical_url('HTTPS://WWW.Practo.com/pune/baner/') == 'https://www.practo.com/pune/baner'
+    assert canonical_url('https://www.practo.com/pune#top') == 'https://www.practo.com/pune'
+    assert canonical_url('https://www.practo.com/?page=2') == 'https://www.practo.com/?page=2'
+
+
+def test_shared_urls_are_fetched_once_and_released_after_last_use():
+    urls = {('a', 's'): ['http://x.test/a/s', 'http://x.test/s'], ('b', 's'): ['http://x.test/b/s', 'http://x.test/s/']}
+    frontier = UrlFrontier(['a', 'b'], ['s'], lambda area, specialty: urls[(area, specialty)])
+    fetched = []
+
+    def fetch_all(batch):
+        fetched.extend(batch)
+        return {url: [] for url in batch}
+
+    frontier.get_many(urls[('a', 's')], fetch_all)
+    frontier.release('a', 's')
+    assert 'http://x.test/s' in frontier.results
+    frontier.get_many(urls[('b', 's')], fetch_all)
+    frontier.release('b', 's')
+
+    assert fetched == ['http://x.test/a/s', 'http://x.test/s', 'http://x.test/b/s']
+    assert frontier.results == {} and frontier.pending == {}
+
+
+def test_full_run_fetches_every_grid_page_once(site, workdir):
+    serve_grid(site)
+    for concurrency in (1, 4):
+        site.hits.clear()
+        scraper = site_scraper(site, concurrency=concurrency)
+        doctors = scraper.scrape_comprehensive()
+        scraper.close()
+        assert site.hits == {path: 1 for path in grid_paths()}
+        # Shared pages count once after dedup: 14 pages of 8 doctors
+        assert len(doctors) == len(grid_paths()) * 8 == 112
@@ -0,0 +1,94 @@
+import time
+
+import pytest
+
+from work_queue import DONE, FAILED, PENDING, MemoryWorkQueue, SqliteWorkQueue, open_queue
+
+
+@pytest.fixture(params=['sqlite', 'memory'])
+def make_queue(request, tmp_path):
+    queues = []
+
+    def make(**kwargs):
+        if request.param == 'sqlite':
+            queue = SqliteWorkQueue(str(tmp_path / f"queue{len(queues)}.sqlite"), **kwargs)
+        else:
+            queue = MemoryWorkQueue(**kwargs)
+        queues.append(queue)
+        return queue
+
+    yield make
+    for queue in queues:
+        queue.close()
+
+
+def status(queue, key):
+    if isinstance(queue, MemoryWorkQueue):
+        return queue.units[key]['status']
+    return queue.conn.execute("SELECT status FROM url_units WHERE key = ?", (key,)).fetchone()[0]
+
+
+def test_units_are_leased_once_and_completed_by_their_holder(make_queue):
+    queue = make_queue()
+    assert queue.add_units(['u1', 'u2']) == 2
+    assert queue.add_units(['u2', 'u3']) == 1
+
+    leased = [queue.lease(f"w{i}") for i in range(3)]
+    assert sorted(unit['key'] for unit in leased) == ['u1', 'u2', 'u3']
+    assert queue.lease('w9') is None
+
+    assert queue.heartbeat('u1', 'w0') and not queue.heartbeat('u1', 'w1')
+    assert not queue.complete('u1', 'w1', 5, 'other.jsonl')
+    assert queue.complete('u1', 'w0', 5, 'u1.jsonl')
+    assert queue.outputs() == {'u1': 'u1.jsonl'}
+    assert queue.counts() == {DONE: 1, 'leased': 2}
+
+
+def test_expired_lease_goes_to_another_worker(make_queue):
+    queue = make_queue(lease_seconds=0.05, max_attempts=2)
+    queue.add_units(['u1'])
+    assert queue.lease('dead')['attempts'] == 1
+    time.sleep(0.1)
+
+    unit = queue.lease('live')
+    assert unit == {'key': 'u1', 'url': 'u1', 'attempts': 2}
+    # The dead worker's late result is refused
+    assert not queue.complete('u1', 'dead', 3, 'dead.jsonl')
+    time.sleep(0.1)
+    # Its last allowed attempt expired too: given up on
+    assert queue.lease('third') is None
+    assert status(queue, 'u1') == FAILED
+
+
+def test_failed_units_are_retried_until_max_attempts(make_queue):
+    queue = make_queue(max_attempts=2)
+    queue.add_units(['u1'])
+    queue.fail(queue.lease('w1')['key'], 'w1', 'fetch failed')
+    assert status(queue, 'u1') == PENDING
+    queue.fail(queue.lease('w1')['key'], 'w1', 'fetch failed')
+    assert status(queue, 'u1') == FAILED
+    assert queue.lease('w1') is None
+
+
+def test_plan_and_variations(make_queue):
+    queue = make_queue()
+    queue.add_combinations([('pune', 'a', 's', 'u1', 'u1v'), ('pune', 'b', 's', 'u1', 'u1v'), ('pune', 'b', 's', 'u2', None)])
+    assert queue.combinations()[1] == ('pune', 'b', 's', 'u1', 'u1v')
+    assert queue.variations('u1') == ['u1v']
+    assert queue.variations('u2') == []
+
+
+def test_reserve_spaces_requests_across_callers(make_queue):
+    queue = make_queue()
+    assert queue.reserve('practo.com', 0.5) == 0
+    assert 0.4 < queue.reserve('practo.com', 0.5) <= 0.5
+    assert queue.reserve('justdial.com', 0.5) == 0
+
+
+def test_open_queue_backends(tmp_path):
+    assert isinstance(open_queue('memory://'), MemoryWorkQueue)
+    queue = open_queue(f"sqlite://{tmp_path / 'q.sqlite'}")
+    assert isinstance(queue, SqliteWorkQueue)
+    queue.close()
+    with pytest.raises(ValueError):
+        open_queue('redis://localhost')
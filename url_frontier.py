@@ -0,0 +1,76 @@
+import logging
+from urllib.parse import urlsplit, urlunsplit
+
+from doctor_record import DoctorRecord
+
+
+def canonical_url(url):
+    """Normalise a URL so trivially different spellings share one fetch"""
+    parts = urlsplit(url.strip())
+    path = parts.path.rstrip('/') or '/'
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), path, parts.query, ''))
+
+
+class UrlFrontier:
+    """Every canonical URL of the area x specialty grid, fetched at most once.
+
+    url_fn(area, specialty) lists all URLs a combination may request. Each
+    canonical URL is reference-counted by the combinations that need it, so
+    parsed results are handed to every one of them and dropped after the last.
+    restored maps URLs to records parsed by an earlier, interrupted run;
+    those still needed are served from it without a fetch.
+    """
+
+    def __init__(self, areas, specialties, url_fn, skip=(), on_fetched=None, restored=None):
+        self.url_fn = url_fn
+        self.on_fetched = on_fetched
+        self.pending = {}
+        self.results = {}
+        self.fetched = 0
+
+        requested = 0
+        for area in areas:
+            for specialty in specialties:
+                if (area, specialty) in skip:
+                    continue
+                for url in set(map(canonical_url, url_fn(area, specialty))):
+                    self.pending[url] = self.pending.get(url, 0) + 1
+                    requested += 1
+
+        for url, records in (restored or {}).items():
+            if url in self.pending:
+                self.results[url] = [DoctorRecord.from_mapping(r) for r in records]
+
+        logging.info(f"Frontier: {len(self.pending)} unique URLs for {requested} combination requests"
+                     f"{f', {len(self.results)} restored' if self.results else ''}")
+
+    def get_many(self, urls, fetch_all):
+        """Return {url: records} for urls, calling fetch_all only for unseen ones"""
+        missing = []
+        for url in urls:
+            key = canonical_url(url)
+            if key not in self.results and key not in missing:
+                missing.append(key)
+
+        if missing:
+            fetched = fetch_all(missing)
+            self.results.update(fetched)
+            self.fetched += len(missing)
+            if self.on_fetched:
+                self.on_fetched(fetched)
+
+        # Hand out copies: callers tag records per area/specialty
+        return {url: [doctor.copy() for doctor in self.results[canonical_url(url)]] for url in urls}
+
+    def get(self, url, fetch_fn):
+        return self.get_many([url], lambda urls: {u: fetch_fn(u) for u in urls})[url]
+
+    def release(self, area, specialty):
+        """Mark a combination done and free results nobody else needs"""
+        for url in set(map(canonical_url, self.url_fn(area, specialty))):
+            remaining = self.pending.get(url, 0) - 1
+            if remaining > 0:
+                self.pending[url] = remaining
+            else:
+                self.pending.pop(url, None)
+                self.results.pop(url, None)
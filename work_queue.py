@@ -0,0 +1,280 @@
+import logging
+import sqlite3
+import threading
+import time
+
+# Unit states
+PENDING = 'pending'
+LEASED = 'leased'
+DONE = 'done'
+FAILED = 'failed'
+
+
+class SqliteWorkQueue:
+    """Durable queue of canonical page URLs shared by worker processes.
+
+    A unit is leased to one worker for lease_seconds and comes back to the
+    queue if the lease is not renewed by heartbeat() in time, e.g. because
+    the worker died. Units that fail max_attempts times are marked failed.
+    The same database holds the crawl plan (which URLs, and which
+    -specialist variations, each city/area/specialty combination reads)
+    and the per-domain reservations behind reserve(), so request spacing
+    holds across every worker using it.
+
+    WAL mode needs shared memory between the processes, so the database
+    must live on a local disk: this backend is for workers on one host.
+    Spread workers over several machines with a backend registered via
+    register_queue_backend instead.
+    """
+
+    def __init__(self, path='work_queue.sqlite', lease_seconds=300, max_attempts=3):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, timeout=60, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS url_units (
+                key TEXT PRIMARY KEY,
+                status TEXT,
+                worker TEXT,
+                lease_until REAL,
+                attempts INTEGER,
+                records INTEGER,
+                output TEXT,
+                error TEXT
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_url_units_status ON url_units (status, lease_until)")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS combinations (
+                position INTEGER,
+                city TEXT,
+                area TEXT,
+                specialty TEXT,
+                url TEXT,
+                variation TEXT
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_combinations_url ON combinations (url)")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS domains (domain TEXT PRIMARY KEY, next_at REAL)")
+
+    def transaction(self, fn):
+        # BEGIN IMMEDIATE takes the write lock up front, so two workers never lease the same unit
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = fn(self.conn)
+                self.conn.execute("COMMIT")
+                return result
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+
+    def add_units(self, urls):
+        """Queue canonical URLs; ones already queued are left as they are"""
+        rows = [(url, PENDING, None, 0, 0, 0, None, None) for url in urls]
+        return self.transaction(lambda conn: conn.executemany(
+            "INSERT OR IGNORE INTO url_units VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows).rowcount)
+
+    def add_combinations(self, rows):
+        """Record the plan: (city, area, specialty, url, variation or None) rows in fetch order"""
+        def insert(conn):
+            start = conn.execute("SELECT COALESCE(MAX(position), -1) + 1 FROM combinations").fetchone()[0]
+            conn.executemany("INSERT INTO combinations VALUES (?, ?, ?, ?, ?, ?)",
+                             [(start + i,) + tuple(row) for i, row in enumerate(rows)])
+        self.transaction(insert)
+
+    def combinations(self):
+        with self.lock:
+            return self.conn.execute(
+                "SELECT city, area, specialty, url, variation FROM combinations ORDER BY position").fetchall()
+
+    def variations(self, url):
+        """Variation URLs planned for combinations that read url"""
+        with self.lock:
+            return [row[0] for row in self.conn.execute(
+                "SELECT DISTINCT variation FROM combinations WHERE url = ? AND variation IS NOT NULL", (url,))]
+
+    def lease(self, worker):
+        """Claim the next pending or expired unit for worker, or None"""
+        def claim(conn):
+            now = time.time()
+            # A unit whose last allowed attempt died with its worker is given up on
+            conn.execute("UPDATE url_units SET status = ?, error = ? WHERE status = ? AND lease_until < ? AND attempts >= ?",
+                         (FAILED, 'lease expired', LEASED, now, self.max_attempts))
+            row = conn.execute("""
+                SELECT key, attempts FROM url_units
+                WHERE status = ? OR (status = ? AND lease_until < ?)
+                ORDER BY attempts, key LIMIT 1
+            """, (PENDING, LEASED, now)).fetchone()
+            if not row:
+                return None
+            conn.execute("UPDATE url_units SET status = ?, worker = ?, lease_until = ?, attempts = attempts + 1 WHERE key = ?",
+                         (LEASED, worker, now + self.lease_seconds, row[0]))
+            return {'key': row[0], 'url': row[0], 'attempts': row[1] + 1}
+        return self.transaction(claim)
+
+    def heartbeat(self, key, worker):
+        """Extend worker's lease on key; False if the lease was lost to another worker"""
+        return self.transaction(lambda conn: conn.execute(
+            "UPDATE url_units SET lease_until = ? WHERE key = ? AND worker = ? AND status = ?",
+            (time.time() + self.lease_seconds, key, worker, LEASED)).rowcount == 1)
+
+    def complete(self, key, worker, records, output):
+        """Mark key done with its shard output; False if worker no longer holds it"""
+        return self.transaction(lambda conn: conn.execute(
+            "UPDATE url_units SET status = ?, records = ?, output = ? WHERE key = ? AND worker = ? AND status = ?",
+            (DONE, records, output, key, worker, LEASED)).rowcount == 1)
+
+    def fail(self, key, worker, error):
+        """Put key back for another attempt, or mark it failed after max_attempts"""
+        def release(conn):
+            row = conn.execute("SELECT attempts FROM url_units WHERE key = ? AND worker = ? AND status = ?",
+                               (key, worker, LEASED)).fetchone()
+            if row:
+                status = FAILED if row[0] >= self.max_attempts else PENDING
+                conn.execute("UPDATE url_units SET status = ?, lease_until = 0, error = ? WHERE key = ?",
+                             (status, str(error)[:500], key))
+        self.transaction(release)
+
+    def counts(self):
+        with self.lock:
+            return dict(self.conn.execute("SELECT status, COUNT(*) FROM url_units GROUP BY status").fetchall())
+
+    def outputs(self):
+        """{url: shard output} of every completed unit"""
+        with self.lock:
+            return dict(self.conn.execute(
+                "SELECT key, output FROM url_units WHERE status = ? AND output IS NOT NULL", (DONE,)).fetchall())
+
+    def reserve(self, domain, interval):
+        """Seconds to wait before the next request to domain; books the slot after it"""
+        def book(conn):
+            now = time.time()
+            row = conn.execute("SELECT next_at FROM domains WHERE domain = ?", (domain,)).fetchone()
+            start = max(now, row[0] if row else 0.0)
+            conn.execute("INSERT OR REPLACE INTO domains VALUES (?, ?)", (domain, start + interval))
+            return start - now
+        return self.transaction(book)
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+class MemoryWorkQueue:
+    """In-process stand-in for SqliteWorkQueue with the same interface"""
+
+    def __init__(self, lease_seconds=300, max_attempts=3):
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.lock = threading.Lock()
+        self.units = {}
+        self.plan = []
+        self.next_at = {}
+
+    def add_units(self, urls):
+        added = 0
+        with self.lock:
+            for key in urls:
+                if key not in self.units:
+                    self.units[key] = {'key': key, 'url': key, 'status': PENDING, 'worker': None,
+                                       'lease_until': 0, 'attempts': 0, 'records': 0, 'output': None,
+                                       'error': None}
+                    added += 1
+        return added
+
+    def add_combinations(self, rows):
+        with self.lock:
+            self.plan.extend(tuple(row) for row in rows)
+
+    def combinations(self):
+        with self.lock:
+            return list(self.plan)
+
+    def variations(self, url):
+        with self.lock:
+            return list(dict.fromkeys(row[4] for row in self.plan if row[3] == url and row[4]))
+
+    def lease(self, worker):
+        with self.lock:
+            now = time.time()
+            for unit in self.units.values():
+                if unit['status'] == LEASED and unit['lease_until'] < now and unit['attempts'] >= self.max_attempts:
+                    unit.update(status=FAILED, error='lease expired')
+            ready = [u for u in self.units.values()
+                     if u['status'] == PENDING or (u['status'] == LEASED and u['lease_until'] < now)]
+            if not ready:
+                return None
+            unit = min(ready, key=lambda u: (u['attempts'], u['key']))
+            unit.update(status=LEASED, worker=worker, lease_until=now + self.lease_seconds,
+                        attempts=unit['attempts'] + 1)
+            return {k: unit[k] for k in ('key', 'url', 'attempts')}
+
+    def held(self, key, worker):
+        unit = self.units.get(key)
+        return unit if unit and unit['worker'] == worker and unit['status'] == LEASED else None
+
+    def heartbeat(self, key, worker):
+        with self.lock:
+            unit = self.held(key, worker)
+            if unit:
+                unit['lease_until'] = time.time() + self.lease_seconds
+            return unit is not None
+
+    def complete(self, key, worker, records, output):
+        with self.lock:
+            unit = self.held(key, worker)
+            if unit:
+                unit.update(status=DONE, records=records, output=output)
+            return unit is not None
+
+    def fail(self, key, worker, error):
+        with self.lock:
+            unit = self.held(key, worker)
+            if unit:
+                unit.update(status=FAILED if unit['attempts'] >= self.max_attempts else PENDING,
+                            lease_until=0, error=str(error)[:500])
+
+    def counts(self):
+        with self.lock:
+            counts = {}
+            for unit in self.units.values():
+                counts[unit['status']] = counts.get(unit['status'], 0) + 1
+            return counts
+
+    def outputs(self):
+        with self.lock:
+            return {key: u['output'] for key, u in self.units.items() if u['status'] == DONE and u['output']}
+
+    def reserve(self, domain, interval):
+        with self.lock:
+            now = time.time()
+            start = max(now, self.next_at.get(domain, 0.0))
+            self.next_at[domain] = start + interval
+            return start - now
+
+    def close(self):
+        pass
+
+
+QUEUE_BACKENDS = {
+    'sqlite': lambda location, **kwargs: SqliteWorkQueue(location or 'work_queue.sqlite', **kwargs),
+    'memory': lambda location, **kwargs: MemoryWorkQueue(**kwargs)
+}
+
+
+def register_queue_backend(scheme, factory):
+    """factory(location, **kwargs) -> object with the SqliteWorkQueue methods"""
+    QUEUE_BACKENDS[scheme] = factory
+
+
+def open_queue(url='sqlite://work_queue.sqlite', **kwargs):
+    """Queue for 'scheme://location', e.g. sqlite:///shared/queue.sqlite or memory://"""
+    scheme, _, location = url.partition('://')
+    if scheme not in QUEUE_BACKENDS:
+        raise ValueError(f"Unknown work queue backend: {scheme}")
+    logging.info(f"Work queue: {url}")
+    return QUEUE_BACKENDS[scheme](location, **kwargs)